@@ -29,6 +29,31 @@ class Settings(BaseSettings):
     
     SUPABASE_DB_URL: str = Field(..., description="Connection string PostgreSQL")
 
+    # ========== POOL DE CONEXÕES (SQLAlchemy) ==========
+    DB_POOL_SIZE: int = Field(default=5, description="Conexões mantidas abertas por processo (por engine)")
+    DB_MAX_OVERFLOW: int = Field(default=10, description="Conexões extras permitidas em picos, fechadas ao devolver")
+    DB_POOL_TIMEOUT: float = Field(default=30, description="Espera máxima (s) por uma conexão livre antes de erro")
+    DB_POOL_RECYCLE: int = Field(
+        default=1800,
+        description="Recria conexões mais velhas que isso (s); -1 desliga. Abaixo do idle timeout do pooler/servidor"
+    )
+    DB_POOL_PRE_PING: bool = Field(default=True, description="Testa a conexão ao retirá-la do pool (descarta as mortas)")
+    DB_PGBOUNCER_TRANSACTION_MODE: bool | None = Field(
+        default=None,
+        description="Perfil PgBouncer em modo transação: sem prepared statements (None = detecta pela porta 6543 do pooler do Supabase)"
+    )
+    DB_POOL_WAIT_SAMPLES: int = Field(default=1000, description="Esperas por conexão guardadas para p50/p95 nas métricas")
+
+    # ========== PAGINAÇÃO (listagens da API) ==========
+    PAGE_SIZE_DEFAULT: int = Field(default=100, description="Itens por página quando `limit` não é informado")
+    PAGE_SIZE_MAX: int = Field(default=500, description="Máximo de itens por página, mesmo que `limit` peça mais")
+
+    # ========== ESTATÍSTICAS DO PAINEL ==========
+    ANALYSIS_STATS_CACHE_TTL: int = Field(
+        default=300,
+        description="Validade (s) do cache de /analysis/stats por tenant; nova análise invalida antes. 0 desliga"
+    )
+
     # ========== OPENAI ==========
     OPENAI_API_KEY: str = Field(
         ..., 
@@ -38,12 +63,214 @@ class Settings(BaseSettings):
         default="gpt-4o-mini",  
         description="Modelo OpenAI a ser usado (gpt-4o-mini, gpt-4, etc)"
     )
+    AI_ANALYSIS_MODE: str = Field(
+        default="single",
+        description="Modo da análise: single (1 chamada JSON), multi (3 chamadas) ou parallel (3 chamadas em paralelo)"
+    )
+    AI_ANALYSIS_MAX_TOKENS: int = Field(
+        default=1500,
+        description="Limite de tokens de saída da chamada única de análise"
+    )
+    OPENAI_MAX_CONCURRENCY: int = Field(
+        default=8,
+        description="Máximo de chamadas OpenAI simultâneas por processo (cliente async)"
+    )
+    OPENAI_RATE_LIMIT_ENABLED: bool = Field(
+        default=True,
+        description="Ativa o limitador distribuído (Redis) de chamadas OpenAI"
+    )
+    OPENAI_RPM_LIMIT: int = Field(
+        default=500,
+        description="Requisições por minuto para a OpenAI somando todos os workers (0 = sem limite)"
+    )
+    OPENAI_TPM_LIMIT: int = Field(
+        default=200_000,
+        description="Tokens por minuto para a OpenAI somando todos os workers (0 = sem limite)"
+    )
+    TENANT_RPM_LIMIT: int = Field(
+        default=100,
+        description="Requisições por minuto por tenant (0 = sem limite)"
+    )
+    TENANT_TPM_LIMIT: int = Field(
+        default=60_000,
+        description="Tokens por minuto por tenant (0 = sem limite)"
+    )
+    OPENAI_RATE_LIMIT_MAX_WAIT: float = Field(
+        default=600,
+        description="Tempo máximo (s) que um worker espera por capacidade antes de falhar"
+    )
+    OPENAI_RESILIENCE_ENABLED: bool = Field(
+        default=True,
+        description="Ativa retry com backoff, circuit breaker e concorrência adaptativa (AIMD)"
+    )
+    OPENAI_MAX_RETRIES: int = Field(default=5, description="Tentativas extras em erros transitórios (429/5xx)")
+    OPENAI_BACKOFF_BASE: float = Field(default=1.0, description="Base (s) do backoff exponencial")
+    OPENAI_BACKOFF_MAX: float = Field(default=60.0, description="Teto (s) de espera entre tentativas")
+    CIRCUIT_FAILURE_THRESHOLD: int = Field(default=5, description="Falhas do provedor na janela para abrir o circuito")
+    CIRCUIT_FAILURE_WINDOW: int = Field(default=60, description="Janela (s) de contagem de falhas")
+    CIRCUIT_COOLDOWN: float = Field(default=30.0, description="Tempo (s) com o circuito aberto antes do teste")
+    AIMD_INITIAL_CONCURRENCY: float = Field(default=8, description="Chamadas OpenAI simultâneas iniciais (todos os workers)")
+    AIMD_MIN_CONCURRENCY: float = Field(default=1, description="Piso da concorrência adaptativa")
+    AIMD_MAX_CONCURRENCY: float = Field(default=64, description="Teto da concorrência adaptativa")
+    AIMD_LATENCY_TARGET: float = Field(default=30.0, description="Latência (s) considerada saudável por chamada")
+    AIMD_DECREASE_FACTOR: float = Field(default=0.5, description="Fator multiplicativo de redução em throttling")
+    ANALYSIS_JOB_TIMEOUT: int = Field(
+        default=1800,
+        description="Timeout (s) do job RQ de análise (inclui esperas de rate limit/retry)"
+    )
+    CV_TOKEN_BUDGET: int = Field(
+        default=6000,
+        description="Máximo de tokens do currículo enviados em cada prompt"
+    )
+
+    PDF_MAX_PAGES: int = Field(
+        default=30,
+        description="Páginas lidas de cada PDF (0 = todas); currículos raramente passam de poucas páginas"
+    )
+    PDF_MAX_CHARS: int = Field(
+        default=100_000,
+        description="Caracteres extraídos de cada PDF (0 = sem limite); a extração para ao atingir"
+    )
+    PDF_PARALLEL_WORKERS: int = Field(
+        default=0,
+        description="Processos para extrair páginas de um PDF grande em paralelo (0/1 = desligado; o AsyncWorker já paraleliza entre PDFs)"
+    )
+    PDF_PARALLEL_MIN_PAGES: int = Field(
+        default=40,
+        description="Páginas a partir das quais a extração paralela é usada"
+    )
+
+    TEXT_MIN_CHARS_PER_PAGE: int = Field(
+        default=100,
+        description="Abaixo disso o PDF é tratado como escaneado (status needs_ocr) e não vai para a IA"
+    )
+    TEXT_MIN_PRINTABLE_RATIO: float = Field(
+        default=0.85,
+        description="Fração mínima de caracteres válidos no texto extraído (abaixo: status unreadable)"
+    )
+    TEXT_MIN_COMMON_WORD_RATIO: float = Field(
+        default=0.03,
+        description="Fração mínima de palavras comuns (pt/en/es) no texto extraído (abaixo: status unreadable)"
+    )
+    OCR_LANGUAGE: str = Field(
+        default="por+eng",
+        description="Idiomas do Tesseract no OCR local (tenants com ocr_enabled)"
+    )
+    OCR_DPI: int = Field(
+        default=200,
+        description="Resolução usada ao rasterizar páginas para OCR"
+    )
+    OCR_MAX_PAGES: int = Field(
+        default=5,
+        description="Páginas passadas pelo OCR por PDF (OCR custa segundos por página)"
+    )
 
     # ========== REDIS (Filas Assíncronas) ==========
     REDIS_URL: str = Field(
         default="redis://localhost:6379",  
         description="URL de conexão do Redis para RQ worker"
     )
+    FAIR_SCHEDULING_ENABLED: bool = Field(
+        default=True,
+        description="Sub-fila por tenant servida por deficit round-robin (evita que um lote grande atrase os demais)"
+    )
+    TENANT_PLAN_WEIGHTS: dict[str, float] = Field(
+        default={"free": 1.0, "pro": 3.0, "enterprise": 6.0},
+        description="Peso de cada plano no escalonador (jobs por rodada)"
+    )
+    FAIR_QUEUE_POLL_SECONDS: int = Field(
+        default=5,
+        description="Espera máxima (s) de um worker ocioso antes de consultar as filas de novo"
+    )
+    WORKER_MODE: str = Field(
+        default="prewarmed",
+        description="Worker de backend/tasks/worker.py: prewarmed (supervisor + workers sem fork), rq (FairWorker, fork por job) ou async (AsyncWorker)"
+    )
+    WORKER_PROCESSES: int = Field(
+        default=2,
+        description="Processos PrewarmedWorker mantidos pelo supervisor"
+    )
+    WORKER_MAX_JOBS: int = Field(
+        default=500,
+        description="Jobs por processo antes de reciclá-lo (0 = sem limite)"
+    )
+    WORKER_RESTART_BACKOFF_MAX: float = Field(
+        default=60,
+        description="Espera máxima (s) antes de reiniciar um worker que cai logo após subir"
+    )
+    ASYNC_WORKER_CONCURRENCY: int = Field(
+        default=32,
+        description="Jobs simultâneos no AsyncWorker por fila sem limite próprio (ex.: default)"
+    )
+    ASYNC_WORKER_THREADS: int = Field(
+        default=10,
+        description="Threads do AsyncWorker para banco e jobs síncronos, fora a fila parse (mantenha <= pool do SQLAlchemy)"
+    )
+    ASYNC_WORKER_DRAIN_TIMEOUT: float = Field(
+        default=120,
+        description="Tempo (s) que o AsyncWorker espera os jobs em andamento ao receber SIGTERM"
+    )
+    PARSE_POOL_PROCESSES: int = Field(
+        default=0,
+        description="Processos do pool de extração de PDF do AsyncWorker (0 = nº de CPUs)"
+    )
+    PARSE_QUEUE_CONCURRENCY: int = Field(
+        default=0,
+        description="Jobs simultâneos da fila parse no AsyncWorker (0 = 2x o pool de extração, para cobrir banco/blob)"
+    )
+    LLM_QUEUE_CONCURRENCY: int = Field(
+        default=32,
+        description="Jobs simultâneos da fila llm (chamadas à OpenAI) no AsyncWorker"
+    )
+    STAGE_HANDOFF_MAX: int = Field(
+        default=200,
+        description="Jobs aguardando na fila seguinte (ex.: llm) acima dos quais o AsyncWorker para de retirar jobs da anterior (parse)"
+    )
+    STAGE_METRICS_INTERVAL: float = Field(
+        default=10,
+        description="Intervalo (s) entre publicações da utilização dos pools de cada worker no Redis"
+    )
+
+    # ========== ARMAZENAMENTO DE ARQUIVOS ==========
+    BLOB_STORE_BACKEND: str = Field(
+        default="local",
+        description="Onde gravar os PDFs enviados: local (disco/volume compartilhado) ou s3"
+    )
+    BLOB_STORE_PATH: str = Field(
+        default="storage",
+        description="Diretório raiz do backend local"
+    )
+    S3_BUCKET: str = Field(default="", description="Bucket do backend s3")
+    S3_ENDPOINT_URL: str = Field(default="", description="Endpoint S3 compatível (MinIO, Supabase...); vazio = AWS")
+    S3_REGION: str = Field(default="", description="Região do bucket S3")
+    S3_ACCESS_KEY_ID: str = Field(default="", description="Access key do S3")
+    S3_SECRET_ACCESS_KEY: str = Field(default="", description="Secret key do S3 - NUNCA exponha!")
+    UPLOAD_MAX_BYTES: int = Field(
+        default=20 * 1024 * 1024,
+        description="Tamanho máximo de um PDF enviado (bytes)"
+    )
+    BULK_UPLOAD_MAX_FILES: int = Field(
+        default=1000,
+        description="Máximo de PDFs aceitos em um único envio em lote (/resumes/bulk)"
+    )
+
+    # ========== CACHE DE RESPOSTAS LLM ==========
+    LLM_CACHE_BACKEND: str = Field(
+        default="redis",
+        description="Backend do cache de respostas OpenAI: redis, sqlite, memory ou none"
+    )
+    LLM_CACHE_TTL_SECONDS: int = Field(
+        default=7 * 24 * 3600,
+        description="Tempo de vida de uma resposta em cache (segundos)"
+    )
+    LLM_CACHE_MAX_ENTRIES: int = Field(
+        default=50_000,
+        description="Máximo de respostas em cache (remove as menos usadas)"
+    )
+    LLM_CACHE_SQLITE_PATH: str = Field(
+        default="llm_cache.sqlite3",
+        description="Arquivo do cache quando LLM_CACHE_BACKEND=sqlite"
+    )
 
     # ========== APP ==========
     APP_ENV: str = Field(
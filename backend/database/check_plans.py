@@ -0,0 +1,154 @@
+"""
+Verifica se as consultas quentes das rotas usam índice.
+
+    alembic upgrade head
+    python -m backend.database.check_plans      # sai com código 1 se alguma regrediu
+
+Cada consulta é explicada com `enable_seqscan = off`: com índice
+utilizável o planejador sempre o prefere, então um Seq Scan restante na
+tabela alvo significa que nenhum índice atende o formato da consulta
+(mesmo em um banco de CI vazio, onde o seq scan seria o plano "barato").
+"""
+import sys
+import json
+from datetime import datetime, timezone
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import select, func, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import Select
+
+from backend.database.connection import engine
+from backend.database.models import Analysis, Job, JobStats, Membership, Resume, RANKED_RESUMES
+from backend.utils.pagination import encode_cursor, keyset_page
+from backend.services.analysis_query import SORT_KEYS, filter_analysis
+
+TENANT, JOB, USER, RESUME = "tenant", "job", "user", "resume"
+
+
+@dataclass
+class HotQuery:
+    name: str
+    table: str                  # tabela que não pode ter Seq Scan
+    build: Callable[[], Select]
+    extension: str | None = None  # só verificada se a extensão estiver instalada
+
+
+# Mesmo formato das consultas em routes/, utils/tenant.py e services/prescreen_service.py
+CURSOR = encode_cursor("created_at", datetime(2026, 1, 1, tzinfo=timezone.utc), "id")
+
+HOT_QUERIES = [
+    HotQuery("list_analysis (tenant + vaga)", "analysis", lambda: keyset_page(
+        select(Analysis).where(Analysis.tenant_id == TENANT, Analysis.job_id == JOB), Analysis, None, 100,
+    )),
+    HotQuery("list_analysis (tenant + vaga, cursor)", "analysis", lambda: keyset_page(
+        select(Analysis).where(Analysis.tenant_id == TENANT, Analysis.job_id == JOB), Analysis, CURSOR, 100,
+    )),
+    HotQuery("list_analysis (tenant)", "analysis", lambda: keyset_page(
+        select(Analysis).where(Analysis.tenant_id == TENANT), Analysis, None, 100,
+    )),
+    HotQuery("list_analysis (tenant, cursor)", "analysis", lambda: keyset_page(
+        select(Analysis).where(Analysis.tenant_id == TENANT), Analysis, CURSOR, 100,
+    )),
+    HotQuery("list_analysis (busca por nome)", "analysis", lambda: keyset_page(
+        filter_analysis(select(Analysis).where(Analysis.tenant_id == TENANT), search="silva"),
+        Analysis, None, 100,
+    ), extension="pg_trgm"),
+    HotQuery("list_analysis (vaga, por score)", "analysis", lambda: keyset_page(
+        filter_analysis(select(Analysis).where(Analysis.tenant_id == TENANT), job_id=[JOB], score_min=7),
+        Analysis, None, 100, sort=SORT_KEYS["score"],
+    )),
+    HotQuery("analysis_stats (job_stats)", "job_stats", lambda: (
+        select(JobStats).where(JobStats.tenant_id == TENANT)
+    )),
+    HotQuery("job_ranking (top-K)", "resumes", lambda: (
+        select(Resume.id, Resume.candidate_name, Resume.score, Resume.created_at)
+        .where(Resume.tenant_id == TENANT, Resume.job_id == JOB, RANKED_RESUMES)
+        .order_by(Resume.score.desc(), Resume.created_at, Resume.id)
+        .limit(20)
+    )),
+    HotQuery("list_jobs", "jobs", lambda: keyset_page(
+        select(Job).where(Job.tenant_id == TENANT), Job, None, 100,
+    )),
+    HotQuery("list_jobs (cursor)", "jobs", lambda: keyset_page(
+        select(Job).where(Job.tenant_id == TENANT), Job, CURSOR, 100,
+    )),
+    HotQuery("get_tenant_id (admin)", "memberships", lambda: (
+        select(Membership).where(Membership.user_id == USER, Membership.role == "admin").limit(1)
+    )),
+    HotQuery("get_tenant_id (membro)", "memberships", lambda: (
+        select(Membership).where(Membership.tenant_id == TENANT, Membership.user_id == USER).limit(1)
+    )),
+    HotQuery("user-info", "memberships", lambda: (
+        select(Membership).where(Membership.user_id == USER)
+    )),
+    HotQuery("passes_prescreen (top-K)", "resumes", lambda: (
+        select(func.count(Resume.id)).where(
+            Resume.tenant_id == TENANT,
+            Resume.job_id == JOB,
+            Resume.id != RESUME,
+            Resume.prescreen_score > 0.5,
+        )
+    )),
+    HotQuery("prescreen_job", "resumes", lambda: (
+        select(Resume.id, Resume.raw_text, Resume.status).where(
+            Resume.tenant_id == TENANT,
+            Resume.job_id == JOB,
+            Resume.raw_text.isnot(None),
+        )
+    )),
+]
+
+
+def _scans(node: dict, table: str) -> list[dict]:
+    """Nós do plano que leem a tabela (Seq Scan, Index Scan, Bitmap...)."""
+    found = []
+    if node.get("Relation Name") == table or (
+        node.get("Index Name") and node.get("Node Type", "").startswith("Bitmap Index")
+    ):
+        found.append(node)
+    for child in node.get("Plans", []):
+        found.extend(_scans(child, table))
+    return found
+
+
+def explain(conn: Connection, stmt: Select) -> dict:
+    sql = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    result = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]["Plan"]
+
+
+def check(conn: Connection, queries: list[HotQuery] = HOT_QUERIES) -> list[str]:
+    """Nomes das consultas cujo plano ainda tem Seq Scan na tabela alvo."""
+    failures = []
+    with conn.begin():
+        installed = set(conn.execute(text("SELECT extname FROM pg_extension")).scalars())
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        for query in queries:
+            if query.extension and query.extension not in installed:
+                print(f"⏭️  {query.name}: extensão {query.extension} não instalada")
+                continue
+            plan = explain(conn, query.build())
+            scans = _scans(plan, query.table)
+            if any(node["Node Type"] == "Seq Scan" for node in scans):
+                failures.append(query.name)
+                print(f"❌ {query.name}: Seq Scan em {query.table}")
+            else:
+                indexes = sorted({node["Index Name"] for node in scans if node.get("Index Name")})
+                print(f"✅ {query.name}: {', '.join(indexes) or plan['Node Type']}")
+    return failures
+
+
+def main():
+    with engine.connect() as conn:
+        failures = check(conn)
+    if failures:
+        print(f"\n{len(failures)} consulta(s) sem índice: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,211 @@
 import os
-from sqlalchemy import create_engine
+import time
+import uuid
+import threading
+from collections import deque
+from typing import AsyncIterator
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
+from backend.config import settings
+
 load_dotenv()
 
 DB_URL = os.getenv("SUPABASE_DB_URL")
 
-engine = create_engine(DB_URL)
+
+# ======================================================
+# 📊 Métricas do pool (espera por conexão, em uso, overflow)
+# ======================================================
+class PoolMetrics:
+    """Tempo de espera de cada checkout (amostras recentes) e nº de timeouts."""
+
+    def __init__(self, samples: int):
+        self._waits = deque(maxlen=samples)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self._waits.append(seconds)
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, pool: QueuePool) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+
+        def pct(p: float) -> float | None:
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 2) if waits else None
+
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_p50_ms": pct(0.5),
+            "wait_p95_ms": pct(0.95),
+            "wait_max_ms": round(self.wait_max * 1000, 2),
+        }
+
+
+class _TimedPool:
+    """Mede quanto cada checkout esperou por uma conexão livre (inclui abrir uma nova)."""
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return conn
+
+
+def _timed_pool_class(base: type) -> type:
+    # Uma classe por engine: o pool recriado (dispose/invalidação) mantém as métricas
+    return type(f"Timed{base.__name__}", (_TimedPool, base), {
+        "metrics": PoolMetrics(settings.DB_POOL_WAIT_SAMPLES),
+    })
+
+
+# ======================================================
+# 🏭 Fábrica de engines (parâmetros do pool via Settings)
+# ======================================================
+def pgbouncer_transaction_mode(url) -> bool:
+    """Perfil PgBouncer em modo transação: explícito ou porta 6543 (pooler do Supabase)."""
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE is not None:
+        return settings.DB_PGBOUNCER_TRANSACTION_MODE
+    return make_url(url).port == 6543
+
+
+def async_db_url(url: str):
+    """
+    Converte a URL do banco para o driver asyncpg. O asyncpg não aceita
+    `sslmode` na URL: vira o argumento `ssl` da conexão.
+    """
+    parsed = make_url(url).set(drivername="postgresql+asyncpg")
+    sslmode = parsed.query.get("sslmode")
+    connect_args = {}
+    if sslmode:
+        parsed = parsed.difference_update_query(["sslmode"])
+        connect_args["ssl"] = sslmode  # asyncpg aceita os mesmos valores do libpq
+    return parsed, connect_args
+
+
+def _pool_kwargs(url) -> dict:
+    if not make_url(url).get_backend_name().startswith("postgresql"):
+        return {}  # ex.: sqlite em scripts locais
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def create_db_engine(url: str | None = None) -> Engine:
+    """Engine síncrono (psycopg2) com o pool configurado em Settings."""
+    url = url or DB_URL
+    kwargs = _pool_kwargs(url)
+    if kwargs:
+        kwargs["poolclass"] = _timed_pool_class(QueuePool)
+    # psycopg2 não usa prepared statements no servidor: o perfil PgBouncer não muda nada aqui
+    return create_engine(url, **kwargs)
+
+
+def create_async_db_engine(url: str | None = None):
+    """
+    Engine asyncpg com o mesmo pool. No perfil PgBouncer (modo transação)
+    os prepared statements ficam desligados: o pooler troca a conexão do
+    servidor entre transações e eles não existiriam na seguinte.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = url or DB_URL
+    parsed, connect_args = async_db_url(url)
+    kwargs = _pool_kwargs(url)
+    kwargs["poolclass"] = _timed_pool_class(AsyncAdaptedQueuePool)
+    if pgbouncer_transaction_mode(url):
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        parsed = parsed.update_query_dict({"prepared_statement_cache_size": "0"})
+    return create_async_engine(parsed, connect_args=connect_args, **kwargs)
+
+
+# Engine síncrono (psycopg2): tarefas do RQ, scripts e serviços síncronos
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+# ======================================================
+# ⚡ Engine assíncrono (asyncpg) — rotas do FastAPI
+# ======================================================
+_async_engine = None
+_async_sessionmaker = None
+_async_lock = threading.Lock()
+
+
+def get_async_sessionmaker():
+    """
+    Cria o engine asyncpg na primeira chamada (o worker não usa e não
+    precisa ter o asyncpg instalado).
+    """
+    global _async_engine, _async_sessionmaker
+    if _async_sessionmaker is None:
+        with _async_lock:
+            if _async_sessionmaker is None:
+                from sqlalchemy.ext.asyncio import async_sessionmaker
+
+                _async_engine = create_async_db_engine()
+                _async_sessionmaker = async_sessionmaker(
+                    _async_engine, autoflush=False, expire_on_commit=False
+                )
+    return _async_sessionmaker
+
+
+async def get_async_db() -> AsyncIterator:
+    """Dependência do FastAPI: AsyncSession por requisição."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+def pool_stats() -> dict:
+    """Métricas dos pools deste processo (None para engines sem pool medido)."""
+    def stats(pool):
+        metrics = getattr(pool, "metrics", None)
+        return metrics.snapshot(pool) if metrics else None
+
+    return {
+        "sync": stats(engine.pool),
+        "async": stats(_async_engine.sync_engine.pool) if _async_engine is not None else None,
+    }
+
+
 if __name__ == "__main__":
     try:
         conn = engine.connect()
         print("✅ Conexão com o banco estabelecida com sucesso!")
         conn.close()
     except Exception as e:
-        print(f"❌ Erro ao conectar no banco: {e}")
\ No newline at end of file
+        print(f"❌ Erro ao conectar no banco: {e}")
@@ -0,0 +1,76 @@
+"""Esquema inicial (tenants, memberships, jobs, resumes, analysis)
+
+Bancos criados antes do Alembic já têm estas tabelas: marque-os com
+`alembic stamp 0001_baseline` e rode `alembic upgrade head` a partir daí.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tenants",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "memberships",
+        sa.Column("tenant_id", sa.String(), sa.ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("user_id", sa.String(), primary_key=True),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text()),
+        sa.Column("main_activities", sa.Text()),
+        sa.Column("prerequisites", sa.Text()),
+        sa.Column("differentials", sa.Text()),
+        sa.Column("criteria", sa.JSON()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "resumes",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("job_id", sa.String(), sa.ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("candidate_name", sa.String()),
+        sa.Column("file_url", sa.Text()),
+        sa.Column("raw_text", sa.Text()),
+        sa.Column("summary", sa.Text()),
+        sa.Column("opinion", sa.Text()),
+        sa.Column("score", sa.Float()),
+        sa.Column("status", sa.String()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_table(
+        "analysis",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), sa.ForeignKey("tenants.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("job_id", sa.String(), sa.ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("resume_id", sa.String(), sa.ForeignKey("resumes.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("candidate_name", sa.String()),
+        sa.Column("skills", sa.JSON()),
+        sa.Column("education", sa.JSON()),
+        sa.Column("languages", sa.JSON()),
+        sa.Column("score", sa.Float()),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade():
+    for table in ("analysis", "resumes", "jobs", "memberships", "tenants"):
+        op.drop_table(table)
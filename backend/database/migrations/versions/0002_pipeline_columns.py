@@ -0,0 +1,56 @@
+"""Colunas e tabelas do pipeline de análise (fingerprint, pré-triagem, filas, OCR)
+
+Idempotente (IF NOT EXISTS): parte destas colunas pode ter sido criada à
+mão antes do Alembic.
+
+Revision ID: 0002_pipeline_columns
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0002_pipeline_columns"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("ALTER TABLE tenants ADD COLUMN IF NOT EXISTS plan VARCHAR NOT NULL DEFAULT 'free'")
+    op.execute("ALTER TABLE tenants ADD COLUMN IF NOT EXISTS ocr_enabled BOOLEAN NOT NULL DEFAULT false")
+    op.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prescreen_threshold DOUBLE PRECISION")
+    op.execute("ALTER TABLE jobs ADD COLUMN IF NOT EXISTS prescreen_top_k INTEGER")
+    op.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)")
+    op.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS tokens_raw INTEGER")
+    op.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS tokens_prompt INTEGER")
+    op.execute("ALTER TABLE resumes ADD COLUMN IF NOT EXISTS prescreen_score DOUBLE PRECISION")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_resumes_content_hash ON resumes (content_hash)")
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS resume_fingerprints (
+            tenant_id VARCHAR NOT NULL REFERENCES tenants (id) ON DELETE CASCADE,
+            content_hash VARCHAR(64) NOT NULL,
+            raw_text TEXT,
+            summary TEXT,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            PRIMARY KEY (tenant_id, content_hash)
+        )
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS resume_fingerprints")
+    op.execute("DROP INDEX IF EXISTS ix_resumes_content_hash")
+    for table, column in (
+        ("resumes", "prescreen_score"),
+        ("resumes", "tokens_prompt"),
+        ("resumes", "tokens_raw"),
+        ("resumes", "content_hash"),
+        ("jobs", "prescreen_top_k"),
+        ("jobs", "prescreen_threshold"),
+        ("tenants", "ocr_enabled"),
+        ("tenants", "plan"),
+    ):
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS {column}")
@@ -0,0 +1,40 @@
+"""Índices compostos para as consultas quentes das rotas (ver check_plans.py)
+
+Criados com CONCURRENTLY (fora de transação) para não travar escritas em
+tabelas já grandes.
+
+Revision ID: 0003_hot_query_indexes
+Revises: 0002_pipeline_columns
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0003_hot_query_indexes"
+down_revision = "0002_pipeline_columns"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    # list_analysis: tenant (+ vaga), mais recentes primeiro
+    "ix_analysis_tenant_job_created": "analysis (tenant_id, job_id, created_at DESC)",
+    "ix_analysis_tenant_created": "analysis (tenant_id, created_at DESC)",
+    # list_jobs: vagas do tenant, mais recentes primeiro
+    "ix_jobs_tenant_created": "jobs (tenant_id, created_at DESC)",
+    # get_tenant_id (admin) e /auth/user-info: memberships do usuário
+    # (tenant_id, user_id) já é a chave primária
+    "ix_memberships_user_role": "memberships (user_id, role)",
+    # pré-triagem: currículos da vaga por pré-score (top-K e recálculo em lote)
+    "ix_resumes_tenant_job_prescreen": "resumes (tenant_id, job_id, prescreen_score DESC)",
+}
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, target in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
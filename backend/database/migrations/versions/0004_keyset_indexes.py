@@ -0,0 +1,47 @@
+"""Índices de listagem com `id` como desempate da paginação por cursor
+
+A paginação de /analysis e /jobs ordena por (created_at DESC, id DESC);
+com o `id` no índice, a continuação a partir do cursor é uma busca direta
+no índice, sem ordenar as linhas de mesmo created_at. Substituem os
+índices (…, created_at DESC) da 0003.
+
+Revision ID: 0004_keyset_indexes
+Revises: 0003_hot_query_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0004_keyset_indexes"
+down_revision = "0003_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_analysis_tenant_job_created_id": "analysis (tenant_id, job_id, created_at DESC, id DESC)",
+    "ix_analysis_tenant_created_id": "analysis (tenant_id, created_at DESC, id DESC)",
+    "ix_jobs_tenant_created_id": "jobs (tenant_id, created_at DESC, id DESC)",
+}
+
+# Índices da 0003 substituídos (recriados no downgrade)
+REPLACED = {
+    "ix_analysis_tenant_job_created": "analysis (tenant_id, job_id, created_at DESC)",
+    "ix_analysis_tenant_created": "analysis (tenant_id, created_at DESC)",
+    "ix_jobs_tenant_created": "jobs (tenant_id, created_at DESC)",
+}
+
+
+def _swap(create: dict, drop: dict):
+    # cria antes de remover: as listagens nunca ficam sem índice
+    with op.get_context().autocommit_block():
+        for name, target in create.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        for name in drop:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def upgrade():
+    _swap(INDEXES, REPLACED)
+
+
+def downgrade():
+    _swap(REPLACED, INDEXES)
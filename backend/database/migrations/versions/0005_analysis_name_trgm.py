@@ -0,0 +1,41 @@
+"""Índice trigram para a busca por nome do candidato em /analysis
+
+`search` vira `candidate_name ILIKE '%termo%'`, que um btree não atende;
+o GIN com gin_trgm_ops atende (termos de 3+ caracteres). Sem a extensão
+pg_trgm disponível no servidor a migração só avisa: a busca continua
+funcionando, com leitura das análises do tenant.
+
+Revision ID: 0005_analysis_name_trgm
+Revises: 0004_keyset_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+from sqlalchemy import text
+
+revision = "0005_analysis_name_trgm"
+down_revision = "0004_keyset_indexes"
+branch_labels = None
+depends_on = None
+
+INDEX = "ix_analysis_candidate_name_trgm"
+
+
+def upgrade():
+    available = op.get_bind().scalar(
+        text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    )
+    if not available:
+        print(f"⚠️  pg_trgm indisponível neste servidor: {INDEX} não foi criado")
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} "
+            "ON analysis USING gin (candidate_name gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    # a extensão fica: outros objetos do banco podem usá-la
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX}")
@@ -0,0 +1,59 @@
+"""Rollup job_stats: contagens, somas e histograma de scores por vaga
+
+Preenchida aqui a partir das análises existentes; depois, mantida pelo
+worker a cada análise gravada (services/job_stats.py). Para reparar:
+`python -m backend.database.rebuild_job_stats`.
+
+Revision ID: 0006_job_stats
+Revises: 0005_analysis_name_trgm
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0006_job_stats"
+down_revision = "0005_analysis_name_trgm"
+branch_labels = None
+depends_on = None
+
+BINS = 20
+SCORE_BIN = "CASE WHEN score IS NOT NULL THEN GREATEST(1, LEAST(width_bucket(score, 0, 10.0, 20), 20)) END"
+
+
+def upgrade():
+    op.execute(
+        """
+        CREATE TABLE job_stats (
+            tenant_id VARCHAR NOT NULL REFERENCES tenants (id) ON DELETE CASCADE,
+            job_id VARCHAR NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+            analyses INTEGER NOT NULL DEFAULT 0,
+            resumes INTEGER NOT NULL DEFAULT 0,
+            score_count INTEGER NOT NULL DEFAULT 0,
+            score_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            score_sumsq DOUBLE PRECISION NOT NULL DEFAULT 0,
+            score_min DOUBLE PRECISION,
+            score_max DOUBLE PRECISION,
+            histogram INTEGER[] NOT NULL,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+            PRIMARY KEY (tenant_id, job_id)
+        )
+        """
+    )
+    bins = ", ".join(f"count(*) FILTER (WHERE {SCORE_BIN} = {i})" for i in range(1, BINS + 1))
+    op.execute(
+        f"""
+        INSERT INTO job_stats (
+            tenant_id, job_id, analyses, resumes, score_count, score_sum, score_sumsq,
+            score_min, score_max, histogram
+        )
+        SELECT
+            tenant_id, job_id, count(*), count(DISTINCT resume_id), count(score),
+            COALESCE(sum(score), 0), COALESCE(sum(score * score), 0), min(score), max(score),
+            ARRAY[{bins}]::int[]
+        FROM analysis
+        GROUP BY tenant_id, job_id
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS job_stats")
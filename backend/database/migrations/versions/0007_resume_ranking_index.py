@@ -0,0 +1,31 @@
+"""Índice parcial para o top-K de currículos por vaga (GET /jobs/{id}/ranking)
+
+Só os currículos analisados (status 'done' com score) entram no índice,
+na ordem do ranking: a consulta lê as K primeiras entradas e para.
+
+Revision ID: 0007_resume_ranking_index
+Revises: 0006_job_stats
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "0007_resume_ranking_index"
+down_revision = "0006_job_stats"
+branch_labels = None
+depends_on = None
+
+INDEX = "ix_resumes_job_ranking"
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} "
+            "ON resumes (tenant_id, job_id, score DESC, created_at, id) "
+            "WHERE status = 'done' AND score IS NOT NULL"
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX}")
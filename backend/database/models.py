@@ -1,6 +1,7 @@
-from sqlalchemy import Column, String, Text, Float, JSON, ForeignKey, DateTime
+from sqlalchemy import Column, String, Text, Float, Integer, JSON, ForeignKey, DateTime, Boolean, Index, false, and_, literal_column
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from backend.database.connection import Base
 
 
@@ -12,6 +13,8 @@ class Tenant(Base):
 
     id = Column(String, primary_key=True)
     name = Column(String, nullable=False)
+    plan = Column(String, nullable=False, default="free", server_default="free")  # peso no escalonador de filas
+    ocr_enabled = Column(Boolean, nullable=False, default=False, server_default=false())  # OCR local de PDFs escaneados
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     # Relacionamentos
@@ -30,6 +33,11 @@ class Membership(Base):
     role = Column(String, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Índices das consultas quentes: migração 0003_hot_query_indexes
+    __table_args__ = (
+        Index("ix_memberships_user_role", user_id, role),
+    )
+
     # Relação reversa
     tenant = relationship("Tenant", back_populates="memberships")
 
@@ -48,8 +56,14 @@ class Job(Base):
     prerequisites = Column(Text, nullable=True)
     differentials = Column(Text, nullable=True)
     criteria = Column(JSON, default=list)
+    prescreen_threshold = Column(Float, nullable=True)      # pré-score mínimo (0-1) para ir à IA
+    prescreen_top_k = Column(Integer, nullable=True)        # só os K melhores pré-scores vão à IA
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_jobs_tenant_created_id", tenant_id, created_at.desc(), id.desc()),
+    )
+
     # Relações
     tenant = relationship("Tenant", back_populates="jobs")
     resumes = relationship("Resume", back_populates="job", cascade="all, delete-orphan")
@@ -66,19 +80,55 @@ class Resume(Base):
     job_id = Column(String, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False)
     candidate_name = Column(String, nullable=True)          # 🔹 ADICIONADO
     file_url = Column(Text, nullable=True)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 do PDF
     raw_text = Column(Text, nullable=True)
+    tokens_raw = Column(Integer, nullable=True)             # tokens do texto extraído
+    tokens_prompt = Column(Integer, nullable=True)          # tokens após pré-processamento
     summary = Column(Text, nullable=True)
     opinion = Column(Text, nullable=True)
+    prescreen_score = Column(Float, nullable=True)          # similaridade BM25 local (0-1)
     score = Column(Float, nullable=True)
     status = Column(String, default="queued")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_resumes_tenant_job_prescreen", tenant_id, job_id, prescreen_score.desc()),
+        # GET /jobs/{id}/ranking: top-K analisados por score (empate: mais antigo)
+        Index(
+            "ix_resumes_job_ranking", tenant_id, job_id, score.desc(), created_at, id,
+            postgresql_where=text("status = 'done' AND score IS NOT NULL"),
+        ),
+    )
+
     # Relações
     tenant = relationship("Tenant")
     job = relationship("Job", back_populates="resumes")
     analysis = relationship("Analysis", back_populates="resume", cascade="all, delete-orphan")
 
 
+# Currículos que entram no ranking: o mesmo predicado do índice parcial
+# ix_resumes_job_ranking. Em SQL literal, não parâmetro: com `status = $1`
+# o plano genérico (prepared statement do asyncpg) não usaria o índice.
+RANKED_RESUMES = and_(Resume.status == literal_column("'done'"), Resume.score.isnot(None))
+
+
+# ======================================================
+# 🧬 Tabela ResumeFingerprint (PDFs idênticos por tenant)
+# ======================================================
+class ResumeFingerprint(Base):
+    """
+    Resultado independente da vaga de um PDF, por (tenant, SHA-256).
+    Reutilizado quando o mesmo arquivo é enviado para outras vagas.
+    """
+    __tablename__ = "resume_fingerprints"
+
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    raw_text = Column(Text, nullable=True)
+    summary = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 
 # ======================================================
 # 📊 Tabela Analysis (resultado detalhado da IA)
@@ -97,5 +147,40 @@ class Analysis(Base):
     score = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_analysis_tenant_job_created_id", tenant_id, job_id, created_at.desc(), id.desc()),
+        Index("ix_analysis_tenant_created_id", tenant_id, created_at.desc(), id.desc()),
+        # busca por nome (ILIKE); exige pg_trgm, ver migração 0005
+        Index(
+            "ix_analysis_candidate_name_trgm", candidate_name,
+            postgresql_using="gin", postgresql_ops={"candidate_name": "gin_trgm_ops"},
+        ),
+    )
+
     # Relações
     resume = relationship("Resume", back_populates="analysis")
+
+
+# ======================================================
+# 📈 Tabela JobStats (agregados por vaga, mantidos a cada análise)
+# ======================================================
+class JobStats(Base):
+    """
+    Rollup das análises de uma vaga, atualizado na mesma transação que
+    grava cada análise (services/job_stats.py). O painel lê uma linha por
+    vaga em vez de agregar todas as análises. Reconstruível do zero com
+    `python -m backend.database.rebuild_job_stats`.
+    """
+    __tablename__ = "job_stats"
+
+    tenant_id = Column(String, ForeignKey("tenants.id", ondelete="CASCADE"), primary_key=True)
+    job_id = Column(String, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    analyses = Column(Integer, nullable=False, default=0)
+    resumes = Column(Integer, nullable=False, default=0)       # currículos distintos analisados
+    score_count = Column(Integer, nullable=False, default=0)   # análises com score
+    score_sum = Column(Float, nullable=False, default=0)
+    score_sumsq = Column(Float, nullable=False, default=0)     # soma dos quadrados (desvio padrão)
+    score_min = Column(Float, nullable=True)
+    score_max = Column(Float, nullable=True)
+    histogram = Column(ARRAY(Integer), nullable=False)         # contagem por faixa de score (HISTOGRAM_BINS)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
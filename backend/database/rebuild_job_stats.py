@@ -0,0 +1,43 @@
+"""
+Reconstrói o rollup job_stats a partir da tabela analysis (reparo).
+
+    python -m backend.database.rebuild_job_stats              # todos os tenants
+    python -m backend.database.rebuild_job_stats --tenant ID  # só um tenant
+
+Pode rodar com o worker ativo: a tabela fica travada para escrita durante
+a reconstrução e as análises gravadas nesse meio tempo entram em seguida.
+"""
+import argparse
+
+from sqlalchemy import select
+
+from backend.database.connection import SessionLocal
+from backend.database.models import Tenant
+from backend.services.analysis_stats import invalidate_stats
+from backend.services.job_stats import rebuild
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói a tabela job_stats")
+    parser.add_argument("--tenant", help="Reconstrói só este tenant")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        jobs = rebuild(db, args.tenant)
+        db.commit()
+        tenants = [args.tenant] if args.tenant else list(db.scalars(select(Tenant.id)))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    # o cache de /analysis/stats ainda tem os números antigos
+    for tenant_id in tenants:
+        invalidate_stats(tenant_id)
+    print(f"✅ job_stats reconstruída: {jobs} vaga(s)" + (f" do tenant {args.tenant}" if args.tenant else ""))
+
+
+if __name__ == "__main__":
+    main()
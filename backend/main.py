@@ -14,7 +14,9 @@ logging.basicConfig(
 )
 
 # Importa rotas
-from .routes import jobs, resumes, analysis, auth
+from .routes import jobs, resumes, analysis, auth, metrics
+from .database.connection import dispose_async_engine
+from .services.storage_service import get_blob_store
 
 # Inicializa app FastAPI
 app = FastAPI(
@@ -37,6 +39,18 @@ app.include_router(jobs.router)
 app.include_router(resumes.router)
 app.include_router(analysis.router)
 app.include_router(auth.router)
+app.include_router(metrics.router)
+
+# Cria o blob store na subida: BLOB_STORE_BACKEND inválido ou s3 sem boto3
+# derrubam o processo aqui, e não no primeiro upload
+@app.on_event("startup")
+def check_blob_store():
+    get_blob_store()
+
+# Fecha o pool asyncpg das rotas ao encerrar
+@app.on_event("shutdown")
+async def close_async_db():
+    await dispose_async_engine()
 
 # Healthcheck
 @app.get("/")
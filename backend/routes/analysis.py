@@ -1,55 +1,77 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session
-from backend.database.connection import SessionLocal
+from datetime import datetime
+from typing import Literal
+from fastapi import APIRouter, Depends, Request, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import get_async_db
 from backend.database.models import Analysis
+from backend.services.analysis_query import SORT_KEYS, filter_analysis
+from backend.services.analysis_stats import get_stats_cache
+from backend.services.job_stats import read_stats
 from backend.utils.auth import get_current_user_claims
 from backend.utils.tenant import get_tenant_id
+from backend.utils.pagination import page_size, keyset_page, split_page
 import json
+import logging
 
-router = APIRouter(prefix="/analysis", tags=["Analysis"])
-
+logger = logging.getLogger(__name__)
 
-# ======================================================
-# 🧩 Dependência padrão do banco
-# ======================================================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
 
 # ======================================================
 # 🔹 LISTAR ANÁLISES (seguro por tenant e job)
 # ======================================================
 @router.get("/")
-def list_analysis(
+async def list_analysis(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     claims: dict = Depends(get_current_user_claims),
     tenant_id: str = Depends(get_tenant_id),
-    job_id: str | None = None,
-    limit: int = 500,
-    offset: int = 0,
+    job_id: list[str] | None = Query(default=None),
+    status: list[str] | None = Query(default=None),
+    score_min: float | None = None,
+    score_max: float | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    search: str | None = None,
+    sort: Literal["created_at", "score", "candidate_name"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int | None = None,
+    cursor: str | None = None,
 ):
+    """
+    Análises do tenant em páginas de até PAGE_SIZE_MAX itens, filtradas e
+    ordenadas no banco. `job_id` e `status` aceitam vários valores
+    (?job_id=a&job_id=b); `search` procura no nome do candidato;
+    `created_to` é exclusivo. Para a próxima página, repita a chamada com
+    os mesmos filtros e `cursor=next_cursor` (None na última).
+    """
     if not tenant_id:
         raise HTTPException(status_code=400, detail="Tenant ID inválido ou ausente.")
     
     try:
-        # Base query
-        q = db.query(Analysis).filter(Analysis.tenant_id == tenant_id)
-
-        # Filtro opcional por vaga
-        if job_id:
-            q = q.filter(Analysis.job_id == job_id)
+        q = filter_analysis(
+            select(Analysis).where(Analysis.tenant_id == tenant_id),
+            job_id=job_id,
+            status=status,
+            score_min=score_min,
+            score_max=score_max,
+            created_from=created_from,
+            created_to=created_to,
+            search=search,
+        )
 
-        # Ordenação e paginação
-        q = q.order_by(Analysis.created_at.desc()).offset(offset).limit(limit)
+        # Ordenação e paginação (keyset)
+        limit = page_size(limit)
+        sort_key = SORT_KEYS[sort]
+        q = keyset_page(q, Analysis, cursor, limit, sort=sort_key, descending=order == "desc")
+        rows, next_cursor = split_page((await db.scalars(q)).all(), limit, sort=sort_key)
 
         # Serialização segura
         items = []
-        for a in q.all():
+        for a in rows:
             def safe_json(value):
                 if isinstance(value, str):
                     try:
@@ -73,9 +95,52 @@ def list_analysis(
 
         return {
             "items": items,
-            "count": len(items)
+            "count": len(items),
+            "next_cursor": next_cursor,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR][analysis]: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro ao listar análises: {e}")
+
+
+# ======================================================
+# 📊 ESTATÍSTICAS DO PAINEL (agregadas no banco)
+# ======================================================
+@router.get("/stats")
+async def analysis_stats(
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id),
+    job_id: list[str] | None = Query(default=None),
+):
+    """
+    KPIs e histograma de scores do tenant (ou das vagas em `job_id`) em uma
+    chamada, lidos do rollup job_stats (uma linha por vaga, não por
+    análise). Fica em cache por tenant até a próxima análise gravada (ou
+    ANALYSIS_STATS_CACHE_TTL).
+    """
+    cache = get_stats_cache()
+    version = None
+    if cache:
+        try:
+            version, stats = await run_in_threadpool(cache.get, tenant_id, job_id)
+            if stats is not None:
+                return {"tenant_id": tenant_id, "cached": True, **stats}
+        except Exception as e:
+            logger.warning(f"⚠️ [stats] Cache indisponível, calculando direto: {e}")
+
+    try:
+        stats = await read_stats(db, tenant_id, job_id)
+    except Exception as e:
+        logger.error(f"❌ Erro ao calcular estatísticas (tenant={tenant_id}): {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao calcular estatísticas: {e}")
+
+    if cache and version is not None:
+        try:
+            await run_in_threadpool(cache.set, tenant_id, version, job_id, stats)
+        except Exception as e:
+            logger.warning(f"⚠️ [stats] Falha ao gravar cache: {e}")
+    return {"tenant_id": tenant_id, "cached": False, **stats}
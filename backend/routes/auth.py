@@ -1,7 +1,8 @@
 import logging
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from backend.database.connection import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import get_async_db
 from backend.database.models import Tenant, Membership
 from backend.schemas.user import UserRegister
 import uuid
@@ -11,23 +12,11 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-# ========================================
-# 🔧 Dependency de sessão DB
-# ========================================
-def get_db():
-    """Cria e fecha sessão do banco automaticamente."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # ========================================
 # 📝 POST /auth/register - Criar Tenant
 # ========================================
 @router.post("/register")
-def register(data: UserRegister, db: Session = Depends(get_db)):
+async def register(data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """
     Cria tenant e membership após registro no Supabase Auth.
     
@@ -50,9 +39,9 @@ def register(data: UserRegister, db: Session = Depends(get_db)):
         # ========================================
         # 1️⃣ Verificar se usuário já tem tenant
         # ========================================
-        existing = db.query(Membership).filter(
-            Membership.user_id == data.user_id
-        ).first()
+        existing = await db.scalar(
+            select(Membership).where(Membership.user_id == data.user_id).limit(1)
+        )
         
         if existing:
             logger.warning(f"⚠️ Usuário {data.user_id} já possui tenant")
@@ -90,7 +79,7 @@ def register(data: UserRegister, db: Session = Depends(get_db)):
         # ========================================
         # 4️⃣ Commit no banco
         # ========================================
-        db.commit()
+        await db.commit()
         
         logger.info(f"🎉 Registro completo: tenant_id={tenant_id}")
         
@@ -101,7 +90,7 @@ def register(data: UserRegister, db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"❌ Erro ao criar tenant: {e}")
         raise HTTPException(
             status_code=500,
@@ -113,7 +102,7 @@ def register(data: UserRegister, db: Session = Depends(get_db)):
 # 🔍 GET /auth/user-info - Info do Usuário
 # ========================================
 @router.get("/user-info/{user_id}")
-def get_user_info(user_id: str, db: Session = Depends(get_db)):
+async def get_user_info(user_id: str, db: AsyncSession = Depends(get_async_db)):
     """
     Retorna informações do usuário e seus tenants.
     
@@ -124,9 +113,9 @@ def get_user_info(user_id: str, db: Session = Depends(get_db)):
         dict: {"user_id": "...", "tenants": [...]}
     """
     try:
-        memberships = db.query(Membership).filter(
-            Membership.user_id == user_id
-        ).all()
+        memberships = (await db.scalars(
+            select(Membership).where(Membership.user_id == user_id)
+        )).all()
         
         if not memberships:
             raise HTTPException(
@@ -134,9 +123,16 @@ def get_user_info(user_id: str, db: Session = Depends(get_db)):
                 detail="Usuário não possui tenants"
             )
         
+        # Uma consulta para todos os tenants (em vez de uma por membership)
+        by_id = {
+            t.id: t
+            for t in (await db.scalars(
+                select(Tenant).where(Tenant.id.in_([m.tenant_id for m in memberships]))
+            )).all()
+        }
         tenants = []
         for m in memberships:
-            tenant = db.query(Tenant).filter(Tenant.id == m.tenant_id).first()
+            tenant = by_id.get(m.tenant_id)
             if tenant:
                 tenants.append({
                     "tenant_id": tenant.id,
@@ -1,10 +1,15 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from sqlalchemy.orm import Session
-from backend.database.connection import SessionLocal
-from backend.database.models import Job
+from fastapi import APIRouter, Depends, Request, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import SessionLocal, get_async_db
+from backend.database.models import Job, Resume, RANKED_RESUMES
 from backend.utils.auth import get_current_user_claims
 from backend.utils.tenant import get_tenant_id
+from backend.utils.pagination import page_size, keyset_page, split_page
 from backend.schemas.job import JobCreate
+from backend.services.prescreen_service import prescreen_job
+from backend.tasks.tasks import requeue_analysis
 import uuid, json
 import logging
 
@@ -12,13 +17,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 def serialize_json_field(value):
     """
     Garante que campos JSON sejam sempre listas/dicts.
@@ -32,19 +30,20 @@ def serialize_json_field(value):
     return value if isinstance(value, (list, dict)) else []
 
 @router.get("/")
-def list_jobs(
+async def list_jobs(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     claims: dict = Depends(get_current_user_claims),
-    tenant_id: str = Depends(get_tenant_id)
+    tenant_id: str = Depends(get_tenant_id),
+    limit: int | None = None,
+    cursor: str | None = None,
 ):
+    """Vagas do tenant, mais recentes primeiro, paginadas por cursor (`next_cursor`)."""
     try:
-        jobs = (
-            db.query(Job)
-            .filter(Job.tenant_id == tenant_id)
-            .order_by(Job.created_at.desc())
-            .all()
-        )
+        limit = page_size(limit)
+        jobs, next_cursor = split_page((await db.scalars(
+            keyset_page(select(Job).where(Job.tenant_id == tenant_id), Job, cursor, limit)
+        )).all(), limit)
         return {
             "tenant_id": tenant_id,
             "jobs": [
@@ -56,19 +55,24 @@ def list_jobs(
                     "prerequisites": j.prerequisites,
                     "differentials": j.differentials,
                     "criteria": serialize_json_field(j.criteria),
+                    "prescreen_threshold": j.prescreen_threshold,
+                    "prescreen_top_k": j.prescreen_top_k,
                     "created_at": j.created_at.isoformat() if getattr(j, "created_at", None) else None,
                 }
                 for j in jobs
             ],
+            "next_cursor": next_cursor,
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao listar vagas (tenant={tenant_id}): {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao listar vagas: {e}")
 
 @router.post("/")
-def create_job(
+async def create_job(
     job: JobCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     claims: dict = Depends(get_current_user_claims),
     tenant_id: str = Depends(get_tenant_id)
 ):
@@ -93,10 +97,12 @@ def create_job(
             prerequisites=job.prerequisites or "",
             differentials=job.differentials or "",
             criteria=criteria_safe,
+            prescreen_threshold=job.prescreen_threshold,
+            prescreen_top_k=job.prescreen_top_k,
         )
         db.add(job_obj)
-        db.commit()
-        db.refresh(job_obj)
+        await db.commit()
+        await db.refresh(job_obj)
 
         logger.info(f"✅ Vaga criada: {job_obj.id} (tenant={tenant_id})")
         
@@ -113,11 +119,113 @@ def create_job(
                 "prerequisites": job_obj.prerequisites,
                 "differentials": job_obj.differentials,
                 "criteria": job_obj.criteria,
+                "prescreen_threshold": job_obj.prescreen_threshold,
+                "prescreen_top_k": job_obj.prescreen_top_k,
                 "created_at": job_obj.created_at.isoformat() if job_obj.created_at else None,
             },
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"❌ Erro ao criar vaga (tenant={tenant_id}): {e}")
         raise HTTPException(status_code=500, detail=f"Erro ao criar vaga: {e}")
 
+
+def _prescreen(job_id: str, tenant_id: str) -> dict:
+    """BM25 em lote (CPU) com sessão síncrona, fora do event loop."""
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.id == job_id, Job.tenant_id == tenant_id).first()
+        result = prescreen_job(db, job)
+        db.commit()
+        return result
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@router.post("/{job_id}/prescreen")
+async def run_prescreen(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    Recalcula em lote o pré-score (BM25 local) de todos os currículos da
+    vaga, aplica limiar/top-K e reenfileira a IA dos que voltaram a passar.
+    """
+    job_exists = await db.scalar(
+        select(Job.id).where(Job.id == job_id, Job.tenant_id == tenant_id)
+    )
+    if not job_exists:
+        raise HTTPException(404, "Vaga não encontrada ou não pertence ao seu tenant")
+    try:
+        result = await run_in_threadpool(_prescreen, job_id, tenant_id)
+    except Exception as e:
+        logger.error(f"❌ Erro na pré-triagem (job={job_id}, tenant={tenant_id}): {e}")
+        raise HTTPException(status_code=500, detail=f"Erro na pré-triagem: {e}")
+
+    await run_in_threadpool(requeue_analysis, result["readmitted"], tenant_id)
+    return {
+        "job_id": job_id,
+        "count": len(result["ranking"]),
+        "ranking": result["ranking"],
+        "readmitted": result["readmitted"],
+    }
+
+
+# ======================================================
+# 🏆 RANKING DA VAGA (top-K por score)
+# ======================================================
+@router.get("/{job_id}/ranking")
+async def job_ranking(
+    job_id: str,
+    k: int = Query(default=20, ge=1),
+    include_summary: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id)
+):
+    """
+    Os K currículos analisados (status "done") de maior score da vaga;
+    empates pelo envio mais antigo. Lê só as K primeiras entradas do índice
+    parcial ix_resumes_job_ranking; `raw_text` nunca é carregado e o resumo
+    da IA só vem com `include_summary=true`. K é limitado a PAGE_SIZE_MAX.
+    """
+    job_exists = await db.scalar(
+        select(Job.id).where(Job.id == job_id, Job.tenant_id == tenant_id)
+    )
+    if not job_exists:
+        raise HTTPException(404, "Vaga não encontrada ou não pertence ao seu tenant")
+
+    k = page_size(k)
+    columns = [Resume.id, Resume.candidate_name, Resume.score, Resume.prescreen_score, Resume.created_at]
+    if include_summary:
+        columns.append(Resume.summary)
+    try:
+        rows = (await db.execute(
+            select(*columns)
+            .where(Resume.tenant_id == tenant_id, Resume.job_id == job_id, RANKED_RESUMES)
+            .order_by(Resume.score.desc(), Resume.created_at, Resume.id)
+            .limit(k)
+        )).all()
+    except Exception as e:
+        logger.error(f"❌ Erro ao montar ranking (job={job_id}, tenant={tenant_id}): {e}")
+        raise HTTPException(status_code=500, detail=f"Erro ao montar ranking: {e}")
+
+    ranking = []
+    for position, r in enumerate(rows, start=1):
+        item = {
+            "rank": position,
+            "resume_id": r.id,
+            "candidate_name": r.candidate_name,
+            "score": r.score,
+            "prescreen_score": r.prescreen_score,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+        }
+        if include_summary:
+            item["summary"] = r.summary
+        ranking.append(item)
+    return {"job_id": job_id, "k": k, "count": len(ranking), "ranking": ranking}
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends
+from backend.database.connection import pool_stats
+from backend.services.llm_cache import get_llm_cache
+from backend.services.rate_limiter import get_rate_limiter
+from backend.services.resilience import get_resilience
+from backend.tasks.fair_queue import get_fair_scheduler
+from backend.tasks.pools import read_utilisation
+from backend.tasks.stages import WORKER_QUEUES
+from backend.utils.auth import get_current_user_claims
+from backend.utils.tenant import get_tenant_id
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+# ======================================================
+# 📈 Métricas da camada de IA (cache e limitador)
+# ======================================================
+@router.get("/llm")
+def llm_metrics(
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id),
+):
+    """
+    Contadores do cache de respostas, nível dos token buckets (global e do
+    tenant atual), estado do circuit breaker e concorrência AIMD.
+    """
+    cache = get_llm_cache()
+    limiter = get_rate_limiter()
+    resilience = get_resilience()
+    return {
+        "tenant_id": tenant_id,
+        "cache": cache.stats() if cache else None,
+        "rate_limiter": limiter.fill_levels(tenant_id) if limiter else None,
+        "resilience": resilience.snapshot() if resilience else None,
+    }
+
+
+# ======================================================
+# ⚖️ Métricas das filas por tenant
+# ======================================================
+@router.get("/queues")
+def queue_metrics(
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id),
+):
+    """
+    Profundidade e tempo de espera das sub-filas do tenant atual (job mais
+    antigo e média na retirada), peso do plano e nº de tenants ativos, por
+    fila (parse, llm, default), e utilização dos pools de cada AsyncWorker.
+    """
+    scheduler = get_fair_scheduler()
+    if not scheduler:
+        return {"tenant_id": tenant_id, "fair_scheduling": False}
+    try:
+        pools = read_utilisation(scheduler.redis)
+    except Exception:
+        pools = None
+    return {
+        "tenant_id": tenant_id,
+        "fair_scheduling": True,
+        "queues": {base: scheduler.stats(base, tenant_id) for base in WORKER_QUEUES},
+        "stage_pools": pools,
+    }
+
+
+# ======================================================
+# 🗄️ Métricas do pool de conexões do banco
+# ======================================================
+@router.get("/db")
+def db_pool_metrics(
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id),
+):
+    """
+    Pools deste processo da API (sync = psycopg2, async = asyncpg):
+    conexões em uso, overflow, checkouts, timeouts e espera por conexão
+    (p50/p95/máx em ms, sobre as amostras recentes).
+    """
+    return pool_stats()
@@ -1,9 +1,13 @@
+from typing import List
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from backend.database.connection import SessionLocal
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import SessionLocal, get_async_db
 from backend.database.models import Job
 from backend.services.pipeline import process_resume  # versão síncrona (para debug)
-from backend.tasks.tasks import enqueue_analysis       # nova versão assíncrona
+from backend.tasks.tasks import enqueue_analysis, enqueue_bulk_analysis  # nova versão assíncrona
+from backend.services.storage_service import save_upload, save_bulk_uploads, BlobTooLarge
 from backend.utils.auth import get_current_user_claims
 from backend.utils.tenant import get_tenant_id
 
@@ -11,14 +15,15 @@ router = APIRouter(prefix="/resumes", tags=["Resumes"])
 
 
 # ======================================================
-# 🧩 Função padrão para abrir e fechar sessão do banco
+# 🧩 Vaga do tenant (consulta assíncrona)
 # ======================================================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def _get_job(db: AsyncSession, job_id: str, tenant_id: str) -> Job:
+    job = await db.scalar(
+        select(Job).where(Job.id == job_id, Job.tenant_id == tenant_id)
+    )
+    if not job:
+        raise HTTPException(404, "Vaga não encontrada ou não pertence ao seu tenant")
+    return job
 
 
 # ======================================================
@@ -29,24 +34,73 @@ async def upload_resume(
     request: Request,
     job_id: str = Form(...),
     pdf: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     claims: dict = Depends(get_current_user_claims),
     tenant_id: str = Depends(get_tenant_id),
 ):
     """
-    Enfileira o processamento do currículo no Redis.
+    Grava o PDF no blob store (em blocos) e enfileira o processamento no Redis
+    apenas com a referência do arquivo.
     O tenant_id é validado automaticamente pelo contexto do usuário.
     """
-    job = db.query(Job).filter(Job.id == job_id, Job.tenant_id == tenant_id).first()
-    if not job:
-        raise HTTPException(404, "Vaga não encontrada ou não pertence ao seu tenant")
+    await _get_job(db, job_id, tenant_id)
+
+    try:
+        blob = await run_in_threadpool(save_upload, tenant_id, pdf.file)
+    except BlobTooLarge as e:
+        raise HTTPException(413, str(e))
 
-    pdf_bytes = await pdf.read()
-    resume_id = enqueue_analysis(job_id, tenant_id, pdf_bytes)
+    # INSERT (engine síncrono) + Redis: fora do event loop
+    resume_id = await run_in_threadpool(enqueue_analysis, job_id, tenant_id, blob.ref, blob.sha256)
 
     return {"status": "queued", "resume_id": resume_id, "tenant_id": tenant_id}
 
 
+# ======================================================
+# 🔹 ENVIO EM LOTE — Vários PDFs e/ou ZIPs em uma requisição
+# ======================================================
+@router.post("/bulk")
+async def upload_resumes_bulk(
+    request: Request,
+    job_id: str = Form(...),
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_async_db),
+    claims: dict = Depends(get_current_user_claims),
+    tenant_id: str = Depends(get_tenant_id),
+):
+    """
+    Aceita vários PDFs e/ou arquivos ZIP (descompactados em streaming).
+    Todos os currículos são criados com um INSERT em lote e enfileirados
+    em um único pipeline do Redis.
+    """
+    await _get_job(db, job_id, tenant_id)
+
+    result = await run_in_threadpool(
+        save_bulk_uploads, tenant_id, [(f.filename, f.file) for f in files]
+    )
+    if not result["stored"]:
+        raise HTTPException(400, {"message": "Nenhum PDF válido no envio", "rejected": result["rejected"]})
+
+    resume_ids = await run_in_threadpool(
+        enqueue_bulk_analysis,
+        job_id,
+        tenant_id,
+        result["stored"],
+    )
+
+    return {
+        "status": "queued",
+        "tenant_id": tenant_id,
+        "count": len(resume_ids),
+        "resume_ids": resume_ids,
+        "files": [
+            {"filename": f["filename"], "resume_id": rid}
+            for f, rid in zip(result["stored"], resume_ids)
+        ],
+        "rejected": result["rejected"],
+    }
+
+
 # ======================================================
 # 🔹 ENDPOINT SÍNCRONO — Para debug local (sem Redis)
 # ======================================================
@@ -55,30 +109,36 @@ async def analyse_resume_sync(
     request: Request,
     job_id: str = Form(...),
     pdf: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     claims: dict = Depends(get_current_user_claims),
     tenant_id: str = Depends(get_tenant_id),
 ):
     """
     Processamento completo (sincrônico) — útil para testes locais.
     """
-    job = db.query(Job).filter(Job.id == job_id, Job.tenant_id == tenant_id).first()
-    if not job:
-        raise HTTPException(404, "Vaga não encontrada ou não pertence ao seu tenant")
+    job = await _get_job(db, job_id, tenant_id)
 
     content = await pdf.read()
-    res = process_resume(
-        db,
-        tenant_id=tenant_id,
-        job={
-            "id": job.id,
-            "main_activities": job.main_activities,
-            "prerequisites": job.prerequisites,
-            "differentials": job.differentials,
-            "criteria": job.criteria or [],
-        },
-        file_url="",  # se ainda não usa Supabase Storage
-        raw_bytes=content,
-    )
+    job_data = {
+        "id": job.id,
+        "main_activities": job.main_activities,
+        "prerequisites": job.prerequisites,
+        "differentials": job.differentials,
+        "criteria": job.criteria or [],
+    }
+
+    def _process():
+        # pipeline síncrono (PDF + OpenAI + sessão psycopg2) em thread
+        with SessionLocal() as sync_db:
+            res = process_resume(
+                sync_db,
+                tenant_id=tenant_id,
+                job=job_data,
+                file_url="",  # se ainda não usa Supabase Storage
+                raw_bytes=content,
+            )
+            # lido com a sessão aberta: após o commit os atributos expiram
+            # e não podem ser recarregados depois que ela fecha
+            return {"id": res.id, "score": res.score, "status": res.status, "tenant_id": tenant_id}
 
-    return {"id": res.id, "score": res.score, "status": res.status, "tenant_id": tenant_id}
+    return await run_in_threadpool(_process)
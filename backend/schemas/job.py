@@ -14,3 +14,5 @@ class JobCreate(BaseModel):
     prerequisites: str = ""
     differentials: str = ""
     criteria: List[JobCriteria] = Field(default_factory=list)
+    prescreen_threshold: Optional[float] = Field(None, ge=0, le=1)
+    prescreen_top_k: Optional[int] = Field(None, ge=1)
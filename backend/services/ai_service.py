@@ -1,33 +1,39 @@
 import re
 import json
+import asyncio
 import logging
 import os
-from openai import OpenAI
+import weakref
+from typing import Callable
+from openai import OpenAI, AsyncOpenAI
 from backend.config import settings
+from backend.services.llm_cache import cache_key, get_llm_cache
+from backend.services.rate_limiter import estimate_tokens, get_rate_limiter
+from backend.services.resilience import get_resilience
 
 logger = logging.getLogger(__name__)
 
-class OpenAIClient:
-    def __init__(self, model_id: str = None):
-        self.model_id = model_id or settings.OPENAI_MODEL
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        logger.info(f"✅ OpenAI Client inicializado (model={self.model_id})")
 
-    def _chat(self, messages: list, temperature: float = 0.3, max_tokens: int = 500) -> str:
-        try:
-            resp = self.client.chat.completions.create(
-                model=self.model_id,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            return resp.choices[0].message.content.strip()
-        except Exception as e:
-            logger.error(f"❌ Erro na chamada OpenAI: {e}")
-            raise
+# ======================================================
+# 🧩 Helpers de prompt e parsing (compartilhados)
+# ======================================================
+def _job_text(job: dict) -> str:
+    return (
+        f"{job.get('main_activities', '')}\n"
+        f"{job.get('prerequisites', '')}\n"
+        f"{job.get('differentials', '')}"
+    )
 
-    def resume_cv(self, cv: str) -> str:
-        prompt = f"""
+
+def _criteria_text(job: dict) -> str:
+    return "\n".join(
+        f"- {c.get('criterio','Sem nome')} ({int(c.get('peso',0))}%): {c.get('descricao','')}"
+        for c in job.get("criteria", [])
+    )
+
+
+def summary_messages(cv: str) -> list:
+    prompt = f"""
 Resuma o currículo abaixo em Markdown com as seções:
 ## Nome Completo
 ## Experiência
@@ -38,22 +44,18 @@ Resuma o currículo abaixo em Markdown com as seções:
 Currículo:
 {cv}
 """
-        return self._chat([
-            {"role":"system","content":"Você resume currículos de forma objetiva."},
-            {"role":"user","content":prompt}
-        ])
+    return [
+        {"role":"system","content":"Você resume currículos de forma objetiva."},
+        {"role":"user","content":prompt}
+    ]
 
-    def generate_opinion(self, cv: str, job: dict) -> str:
-        job_text = (
-            f"{job.get('main_activities', '')}\n"
-            f"{job.get('prerequisites', '')}\n"
-            f"{job.get('differentials', '')}"
-        )
-        prompt = f"""
+
+def opinion_messages(cv: str, job: dict) -> list:
+    prompt = f"""
 Analise criticamente o currículo versus a vaga.
 
 Vaga:
-{job_text}
+{_job_text(job)}
 
 Currículo:
 {cv}
@@ -64,31 +66,21 @@ Entregue com títulos:
 ## Pontos de Atenção
 ## Recomendação Final
 """
-        return self._chat([
-            {"role":"system","content":"Você é um recrutador sênior e escreve análises objetivas."},
-            {"role":"user","content":prompt}
-        ])
+    return [
+        {"role":"system","content":"Você é um recrutador sênior e escreve análises objetivas."},
+        {"role":"user","content":prompt}
+    ]
 
-    def generate_score(self, cv: str, job: dict) -> float:
-        criterios = job.get("criteria", [])
-        criterios_txt = "\n".join(
-            f"- {c.get('criterio','Sem nome')} ({int(c.get('peso',0))}%): {c.get('descricao','')}"
-            for c in criterios
-        )
-        job_text = (
-            f"{job.get('main_activities', '')}\n"
-            f"{job.get('prerequisites', '')}\n"
-            f"{job.get('differentials', '')}"
-        )
 
-        prompt = f"""
+def score_messages(cv: str, job: dict) -> list:
+    prompt = f"""
 Avalie o currículo conforme os critérios e pesos da vaga abaixo.
 
 Critérios:
-{criterios_txt}
+{_criteria_text(job)}
 
 Descrição da vaga:
-{job_text}
+{_job_text(job)}
 
 Currículo:
 {cv}
@@ -99,32 +91,494 @@ Instruções:
 - Retorne APENAS um JSON no formato: {{"score": 7.5, "justificativa": "resumo"}}
 - OU no formato texto: Pontuação Final: X.X
 """
-        content = self._chat([
-            {"role": "system", "content": "Você calcula pontuações de forma rigorosa e padronizada."},
-            {"role": "user", "content": prompt}
-        ], max_tokens=300)
+    return [
+        {"role": "system", "content": "Você calcula pontuações de forma rigorosa e padronizada."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def analysis_messages(cv: str, job: dict, include_summary: bool = True) -> list:
+    """
+    Prompt único (resumo + parecer + notas por critério + score final).
+    O currículo é enviado uma única vez. Com include_summary=False o resumo
+    já é conhecido (PDF repetido) e não é pedido ao modelo.
+    """
+    summary_instruction = (
+        '- "summary": resumo em Markdown com as seções ## Nome Completo, ## Experiência,\n'
+        '  ## Habilidades, ## Educação e ## Idiomas\n'
+        if include_summary else ""
+    )
+    prompt = f"""
+Analise o currículo abaixo em relação à vaga e responda no JSON solicitado.
+
+Critérios (nome, peso e descrição):
+{_criteria_text(job)}
+
+Descrição da vaga:
+{_job_text(job)}
+
+Currículo:
+{cv}
+
+Instruções:
+{summary_instruction}- "opinion": análise crítica em Markdown com as seções ## Pontos de Alinhamento,
+  ## Pontos de Desalinhamento, ## Pontos de Atenção e ## Recomendação Final
+- "criteria_scores": uma nota de 0 a 10 para cada critério, com o peso informado
+- "score": nota final de 0 a 10 aplicando os pesos
+- "justificativa": uma frase explicando a nota final
+"""
+    return [
+        {"role": "system", "content": "Você é um recrutador sênior: resume currículos, escreve análises objetivas e calcula pontuações de forma rigorosa e padronizada."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+# JSON Schema (structured outputs) da chamada única
+ANALYSIS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "resume_analysis",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "additionalProperties": False,
+            "required": ["summary", "opinion", "criteria_scores", "score", "justificativa"],
+            "properties": {
+                "summary": {"type": "string"},
+                "opinion": {"type": "string"},
+                "criteria_scores": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "additionalProperties": False,
+                        "required": ["criterio", "peso", "nota"],
+                        "properties": {
+                            "criterio": {"type": "string"},
+                            "peso": {"type": "number"},
+                            "nota": {"type": "number"},
+                        },
+                    },
+                },
+                "score": {"type": "number"},
+                "justificativa": {"type": "string"},
+            },
+        },
+    },
+}
+
+
+def analysis_response_format(include_summary: bool = True) -> dict:
+    if include_summary:
+        return ANALYSIS_RESPONSE_FORMAT
+    fmt = json.loads(json.dumps(ANALYSIS_RESPONSE_FORMAT))
+    schema = fmt["json_schema"]["schema"]
+    schema["required"].remove("summary")
+    del schema["properties"]["summary"]
+    fmt["json_schema"]["name"] = "resume_analysis_no_summary"
+    return fmt
+
+
+def _clamp_score(score: float) -> float:
+    return max(0.0, min(10.0, score))
+
+
+def parse_score(content: str) -> float:
+    """
+    Extrai o score (0 a 10) da resposta do prompt de pontuação.
+    Tenta JSON, depois "Pontuação Final: X.X" e por fim o primeiro número.
+    """
+    try:
+        # 1️⃣ Tenta JSON primeiro
+        data = json.loads(content)
+        score = float(data.get("score", 0))
+        logger.info(f"✅ Score extraído via JSON: {score}")
+        return _clamp_score(score)
+
+    except (json.JSONDecodeError, ValueError, AttributeError):
+
+        match = re.search(r"(?i)Pontuação Final[:\s]*([\d.,]+)", content)
+        if match:
+            score = float(match.group(1).replace(",", "."))
+            logger.info(f"✅ Score extraído via regex: {score}")
+            return _clamp_score(score)
+
+
+        match = re.search(r"[\d.,]+", content)
+        if match:
+            score = float(match.group(0).replace(",", "."))
+            logger.warning(f"⚠️ Score extraído via fallback genérico: {score}")
+            return _clamp_score(score)
+
+
+        logger.error(f"❌ Falha ao extrair score. Resposta da IA: {content[:200]}")
+        return 0.0
+
+
+def _criterion_key(name) -> str:
+    return " ".join(str(name or "").split()).casefold()
+
+
+def _configured_weights(criteria: list | None) -> dict[str, float]:
+    """Pesos da vaga por nome de critério (normalizado), só os positivos."""
+    weights = {}
+    for c in criteria or []:
+        try:
+            peso = float(c.get("peso", 0))
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if peso > 0:
+            weights[_criterion_key(c.get("criterio"))] = peso
+    return weights
+
+
+def parse_analysis(content: str, summary: str | None = None, criteria: list | None = None) -> dict:
+    """
+    Valida a resposta JSON da chamada única e normaliza o score.
+    Se `summary` for informado, ele substitui o resumo da resposta.
+    Com `criteria` (os critérios da vaga), o score final é recalculado
+    localmente: cada nota é ponderada pelo peso configurado na vaga,
+    casado pelo nome do critério; o peso que o modelo devolve é ignorado.
+    Só quando algum critério da vaga não aparece na resposta vale o
+    score do próprio modelo.
+
+    Raises:
+        ValueError: Se o JSON for inválido ou faltar campos obrigatórios
+    """
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Resposta da análise não é JSON válido: {e}")
+
+    if not isinstance(data, dict):
+        raise ValueError("Resposta da análise não é um objeto JSON")
+    if summary is None:
+        summary = (data.get("summary") or "").strip()
+    if not summary or not data.get("opinion"):
+        raise ValueError("Resposta da análise sem summary/opinion")
+
+    weights = _configured_weights(criteria)
+    criteria_scores = []
+    notas = {}
+    for c in data.get("criteria_scores") or []:
+        try:
+            name = str(c.get("criterio", ""))
+            nota = _clamp_score(float(c.get("nota", 0)))
+            peso = weights.get(_criterion_key(name))
+            if peso is None:
+                peso = float(c.get("peso", 0))
+        except (TypeError, ValueError, AttributeError):
+            continue
+        criteria_scores.append({"criterio": name, "peso": peso, "nota": nota})
+        notas.setdefault(_criterion_key(name), nota)
+
+    if weights and all(key in notas for key in weights):
+        score = sum(notas[key] * peso for key, peso in weights.items()) / sum(weights.values())
+    else:
+        if weights:
+            logger.warning("⚠️ Critérios da resposta não batem com os da vaga, usando o score do modelo")
         try:
-            # 1️⃣ Tenta JSON primeiro
-            data = json.loads(content)
             score = float(data.get("score", 0))
-            logger.info(f"✅ Score extraído via JSON: {score}")
-            return max(0.0, min(10.0, score))
-    
-        except (json.JSONDecodeError, ValueError):
-            
-            match = re.search(r"(?i)Pontuação Final[:\s]*([\d.,]+)", content)
-            if match:
-                score = float(match.group(1).replace(",", "."))
-                logger.info(f"✅ Score extraído via regex: {score}")
-                return max(0.0, min(10.0, score))
-            
-            
-            match = re.search(r"[\d.,]+", content)
-            if match:
-                score = float(match.group(0).replace(",", "."))
-                logger.warning(f"⚠️ Score extraído via fallback genérico: {score}")
-                return max(0.0, min(10.0, score))
-            
-            
-            logger.error(f"❌ Falha ao extrair score. Resposta da IA: {content[:200]}")
-            return 0.0
+        except (TypeError, ValueError):
+            score = 0.0
+
+    return {
+        "summary": summary,
+        "opinion": data["opinion"].strip(),
+        "criteria_scores": criteria_scores,
+        "score": round(_clamp_score(score), 2),
+        "justificativa": data.get("justificativa", ""),
+    }
+
+
+class OpenAIClient:
+    def __init__(self, model_id: str = None):
+        self.model_id = model_id or settings.OPENAI_MODEL
+        # Com a camada de resiliência ativa, os retries são feitos por ela
+        self.client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0 if settings.OPENAI_RESILIENCE_ENABLED else 2,
+        )
+        logger.info(f"✅ OpenAI Client inicializado (model={self.model_id})")
+
+    def _chat(
+        self,
+        messages: list,
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        response_format: dict | None = None,
+        validate: Callable[[str], object] | None = None,
+    ) -> str:
+        """`validate` (levanta ValueError) decide se a resposta pode ir para o cache."""
+        def call() -> str:
+            try:
+                kwargs = {}
+                if response_format:
+                    kwargs["response_format"] = response_format
+                limiter = get_rate_limiter()
+                resilience = get_resilience()
+                estimated = estimate_tokens(messages, max_tokens, self.model_id)
+
+                def request():
+                    return self.client.chat.completions.create(
+                        model=self.model_id,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        **kwargs
+                    )
+
+                # Capacidade obtida uma vez, antes das vagas AIMD: a espera no
+                # bucket não conta como latência nem segura lease, e os retries
+                # usam a mesma reserva (devolvida se a chamada falhar de vez)
+                if limiter:
+                    limiter.acquire(estimated)
+                try:
+                    resp = resilience.call(request) if resilience else request()
+                except Exception:
+                    if limiter:
+                        limiter.release(estimated)
+                    raise
+                if limiter and resp.usage:
+                    limiter.reconcile(estimated, resp.usage.total_tokens)
+                return resp.choices[0].message.content.strip()
+            except Exception as e:
+                logger.error(f"❌ Erro na chamada OpenAI: {e}")
+                raise
+
+        cache = get_llm_cache()
+        if cache is None:
+            return call()
+        key = cache_key(self.model_id, messages, temperature, max_tokens, response_format)
+        return cache.get_or_compute(key, call, validate)
+
+    def resume_cv(self, cv: str) -> str:
+        return self._chat(summary_messages(cv))
+
+    def generate_opinion(self, cv: str, job: dict) -> str:
+        return self._chat(opinion_messages(cv, job))
+
+    def generate_score(self, cv: str, job: dict) -> float:
+        content = self._chat(score_messages(cv, job), max_tokens=300)
+        return parse_score(content)
+
+    # ======================================================
+    # 🎯 Análise completa (resumo + parecer + score)
+    # ======================================================
+    def analyse(
+        self,
+        cv: str,
+        job: dict,
+        mode: str | None = None,
+        summary: str | None = None,
+    ) -> dict:
+        """
+        Executa a análise completa do currículo para a vaga.
+        Se `summary` for informado (PDF já resumido antes), o resumo não é
+        gerado de novo: só o parecer e o score dependem da vaga.
+
+        Modos (settings.AI_ANALYSIS_MODE):
+          - "single": uma chamada com saída JSON Schema (padrão)
+          - "multi": três chamadas (resume_cv, generate_opinion, generate_score)
+          - "parallel": as três chamadas em paralelo via AsyncOpenAIClient
+
+        Se a resposta da chamada única vier inválida, cai para o modo "multi".
+
+        Returns:
+            dict: {"summary", "opinion", "criteria_scores", "score"}
+        """
+        mode = mode or settings.AI_ANALYSIS_MODE
+
+        include_summary = summary is None
+
+        if mode == "single":
+            content = self._chat(
+                analysis_messages(cv, job, include_summary=include_summary),
+                max_tokens=settings.AI_ANALYSIS_MAX_TOKENS,
+                response_format=analysis_response_format(include_summary),
+                validate=lambda c: parse_analysis(c, summary=summary, criteria=job.get("criteria")),
+            )
+            try:
+                result = parse_analysis(content, summary=summary, criteria=job.get("criteria"))
+                logger.info(f"✅ Análise em chamada única (score={result['score']})")
+                return result
+            except ValueError as e:
+                logger.warning(f"⚠️ Chamada única inválida, usando modo multi: {e}")
+
+        if mode == "parallel":
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return run_async_analysis(cv, job, model_id=self.model_id, summary=summary)
+            # Já existe um event loop (ex.: rota async) → executa em série
+            logger.warning("⚠️ Event loop ativo, modo parallel executado em série")
+
+        return {
+            "summary": summary if summary is not None else self.resume_cv(cv),
+            "opinion": self.generate_opinion(cv, job),
+            "criteria_scores": [],
+            "score": self.generate_score(cv, job),
+        }
+
+
+# ======================================================
+# ⚡ Cliente assíncrono (prompts em paralelo)
+# ======================================================
+# Um semáforo por event loop do processo: asyncio.Semaphore não pode ser
+# compartilhado entre loops diferentes (ex.: chamadas sucessivas de asyncio.run)
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_semaphore(limit: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _semaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(limit)
+        _semaphores[loop] = sem
+    return sem
+
+
+class AsyncOpenAIClient:
+    """
+    Variante assíncrona do OpenAIClient (AsyncOpenAI).
+    Usa os mesmos prompts e o mesmo parsing de score; o número de chamadas
+    simultâneas por processo é limitado por settings.OPENAI_MAX_CONCURRENCY.
+    """
+
+    def __init__(self, model_id: str = None, max_concurrency: int | None = None):
+        self.model_id = model_id or settings.OPENAI_MODEL
+        self.max_concurrency = max_concurrency or settings.OPENAI_MAX_CONCURRENCY
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            max_retries=0 if settings.OPENAI_RESILIENCE_ENABLED else 2,
+        )
+        logger.info(
+            f"✅ AsyncOpenAI Client inicializado (model={self.model_id}, "
+            f"concorrência={self.max_concurrency})"
+        )
+
+    async def aclose(self):
+        await self.client.close()
+
+    async def _chat(
+        self,
+        messages: list,
+        temperature: float = 0.3,
+        max_tokens: int = 500,
+        response_format: dict | None = None,
+        validate: Callable[[str], object] | None = None,
+    ) -> str:
+        async def call() -> str:
+            try:
+                kwargs = {}
+                if response_format:
+                    kwargs["response_format"] = response_format
+                limiter = get_rate_limiter()
+                resilience = get_resilience()
+                estimated = estimate_tokens(messages, max_tokens, self.model_id)
+
+                async def request():
+                    return await self.client.chat.completions.create(
+                        model=self.model_id,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        **kwargs
+                    )
+
+                # Mesma ordem do cliente síncrono: bucket antes das vagas AIMD
+                if limiter:
+                    await limiter.aacquire(estimated)
+                try:
+                    async with _get_semaphore(self.max_concurrency):
+                        resp = await resilience.acall(request) if resilience else await request()
+                except Exception:
+                    if limiter:
+                        await asyncio.to_thread(limiter.release, estimated)
+                    raise
+                if limiter and resp.usage:
+                    await asyncio.to_thread(limiter.reconcile, estimated, resp.usage.total_tokens)
+                return resp.choices[0].message.content.strip()
+            except Exception as e:
+                logger.error(f"❌ Erro na chamada OpenAI (async): {e}")
+                raise
+
+        cache = get_llm_cache()
+        if cache is None:
+            return await call()
+        key = cache_key(self.model_id, messages, temperature, max_tokens, response_format)
+        return await cache.aget_or_compute(key, call, validate)
+
+    async def resume_cv(self, cv: str) -> str:
+        return await self._chat(summary_messages(cv))
+
+    async def generate_opinion(self, cv: str, job: dict) -> str:
+        return await self._chat(opinion_messages(cv, job))
+
+    async def generate_score(self, cv: str, job: dict) -> float:
+        content = await self._chat(score_messages(cv, job), max_tokens=300)
+        return parse_score(content)
+
+    async def analyse(
+        self,
+        cv: str,
+        job: dict,
+        mode: str | None = None,
+        summary: str | None = None,
+    ) -> dict:
+        """
+        Mesmo contrato de OpenAIClient.analyse. Nos modos "multi"/"parallel"
+        os três prompts rodam em paralelo com asyncio.gather, então a latência
+        é a do prompt mais lento.
+        """
+        mode = mode or settings.AI_ANALYSIS_MODE
+
+        include_summary = summary is None
+
+        if mode == "single":
+            content = await self._chat(
+                analysis_messages(cv, job, include_summary=include_summary),
+                max_tokens=settings.AI_ANALYSIS_MAX_TOKENS,
+                response_format=analysis_response_format(include_summary),
+                validate=lambda c: parse_analysis(c, summary=summary, criteria=job.get("criteria")),
+            )
+            try:
+                return parse_analysis(content, summary=summary, criteria=job.get("criteria"))
+            except ValueError as e:
+                logger.warning(f"⚠️ Chamada única inválida, usando modo parallel: {e}")
+
+        async def known_summary() -> str:
+            return summary
+
+        summary, opinion, score = await asyncio.gather(
+            self.resume_cv(cv) if summary is None else known_summary(),
+            self.generate_opinion(cv, job),
+            self.generate_score(cv, job),
+        )
+        return {
+            "summary": summary,
+            "opinion": opinion,
+            "criteria_scores": [],
+            "score": score,
+        }
+
+
+def run_async_analysis(
+    cv: str,
+    job: dict,
+    model_id: str | None = None,
+    summary: str | None = None,
+) -> dict:
+    """
+    Executa os três prompts em paralelo a partir de código síncrono
+    (ex.: tasks RQ). Não pode ser chamada com um event loop ativo.
+    """
+    async def _run():
+        client = AsyncOpenAIClient(model_id=model_id)
+        try:
+            return await client.analyse(cv, job, mode="parallel", summary=summary)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(_run())
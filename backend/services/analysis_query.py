@@ -0,0 +1,59 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.sql import Select
+
+from backend.database.models import Analysis, Resume
+from backend.utils.pagination import SortKey, by_created_at
+
+
+# ======================================================
+# 🔍 Filtros e ordenação da listagem
+# ======================================================
+# Ordenações aceitas em `sort`. NULLs viram um valor fixo para o keyset
+# comparar (score sem valor fica abaixo de 0; nome vazio antes de "A").
+SORT_KEYS = {
+    "created_at": by_created_at(Analysis),
+    "score": SortKey(
+        "score", func.coalesce(Analysis.score, -1.0),
+        lambda a: a.score if a.score is not None else -1.0,
+    ),
+    "candidate_name": SortKey(
+        "candidate_name", func.coalesce(Analysis.candidate_name, ""),
+        lambda a: a.candidate_name or "",
+    ),
+}
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def filter_analysis(
+    q: Select,
+    job_id: list[str] | None = None,
+    status: list[str] | None = None,
+    score_min: float | None = None,
+    score_max: float | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    search: str | None = None,
+) -> Select:
+    """Aplica os filtros da listagem em SQL (o painel não filtra mais em memória)."""
+    if job_id:
+        q = q.where(Analysis.job_id.in_(job_id))
+    if status:
+        # status do processamento fica no currículo
+        q = q.join(Resume, Resume.id == Analysis.resume_id).where(Resume.status.in_(status))
+    if score_min is not None:
+        q = q.where(Analysis.score >= score_min)
+    if score_max is not None:
+        q = q.where(Analysis.score <= score_max)
+    if created_from is not None:
+        q = q.where(Analysis.created_at >= created_from)
+    if created_to is not None:
+        q = q.where(Analysis.created_at < created_to)
+    if search and search.strip():
+        # ILIKE '%termo%': com 3+ caracteres usa o índice trigram (migração 0005)
+        q = q.where(Analysis.candidate_name.ilike(f"%{_escape_like(search.strip())}%", escape="\\"))
+    return q
@@ -0,0 +1,80 @@
+import json
+import logging
+import threading
+from typing import Optional
+
+from redis import Redis
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 📦 Cache por tenant (Redis), invalidado por nova análise
+# ======================================================
+class StatsCache:
+    """
+    Cada tenant tem um contador de versão; o resultado fica em cache sob a
+    versão atual. Gravar uma análise incrementa o contador (depois do
+    commit), e as leituras seguintes passam a procurar outra chave: um
+    cálculo concorrente feito antes do commit nunca é servido depois dele.
+    """
+    prefix = "analysis_stats:"
+
+    def __init__(self, redis_conn: Redis, ttl: int):
+        self.redis = redis_conn
+        self.ttl = ttl
+
+    def _version_key(self, tenant_id: str) -> str:
+        return f"{self.prefix}{tenant_id}:version"
+
+    def version(self, tenant_id: str) -> int:
+        return int(self.redis.get(self._version_key(tenant_id)) or 0)
+
+    def _key(self, tenant_id: str, version: int, job_ids: list[str] | None) -> str:
+        scope = ",".join(sorted(job_ids)) if job_ids else "*"
+        return f"{self.prefix}{tenant_id}:{version}:{scope}"
+
+    def get(self, tenant_id: str, job_ids: list[str] | None) -> tuple[int, Optional[dict]]:
+        """(versão atual, estatísticas em cache ou None)."""
+        version = self.version(tenant_id)
+        raw = self.redis.get(self._key(tenant_id, version, job_ids))
+        return version, (json.loads(raw) if raw else None)
+
+    def set(self, tenant_id: str, version: int, job_ids: list[str] | None, stats: dict):
+        self.redis.set(self._key(tenant_id, version, job_ids), json.dumps(stats), ex=self.ttl)
+
+    def invalidate(self, tenant_id: str):
+        # as entradas da versão anterior expiram sozinhas pelo TTL
+        self.redis.incr(self._version_key(tenant_id))
+
+
+_cache: Optional[StatsCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_stats_cache() -> Optional[StatsCache]:
+    """Cache das estatísticas ou None se desativado (ANALYSIS_STATS_CACHE_TTL=0)."""
+    global _cache
+    if settings.ANALYSIS_STATS_CACHE_TTL <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = StatsCache(
+                    Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2),
+                    settings.ANALYSIS_STATS_CACHE_TTL,
+                )
+    return _cache
+
+
+def invalidate_stats(tenant_id: str):
+    """Chamado depois de gravar análises do tenant; sem Redis, só avisa (o TTL cobre)."""
+    cache = get_stats_cache()
+    if cache is None:
+        return
+    try:
+        cache.invalidate(tenant_id)
+    except Exception as e:
+        logger.warning(f"⚠️ [stats] Falha ao invalidar cache (tenant={tenant_id}): {e}")
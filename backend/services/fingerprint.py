@@ -0,0 +1,60 @@
+import hashlib
+import logging
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from backend.database.models import ResumeFingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_fingerprint(pdf_bytes: bytes) -> str:
+    """SHA-256 (hex) do conteúdo do PDF."""
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+def get_fingerprint(db: Session, tenant_id: str, content_hash: str | None) -> ResumeFingerprint | None:
+    """Busca o resultado reaproveitável de um PDF dentro do tenant."""
+    if not content_hash:
+        return None
+    return (
+        db.query(ResumeFingerprint)
+        .filter(
+            ResumeFingerprint.tenant_id == tenant_id,
+            ResumeFingerprint.content_hash == content_hash,
+        )
+        .first()
+    )
+
+
+def save_fingerprint(
+    db: Session,
+    tenant_id: str,
+    content_hash: str | None,
+    *,
+    raw_text: str | None = None,
+    summary: str | None = None,
+):
+    """
+    Upsert atômico (INSERT ... ON CONFLICT): dois uploads simultâneos do
+    mesmo PDF não conflitam, e campos já preenchidos não são apagados.
+    """
+    if not content_hash:
+        return
+
+    stmt = insert(ResumeFingerprint).values(
+        tenant_id=tenant_id,
+        content_hash=content_hash,
+        raw_text=raw_text,
+        summary=summary,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ResumeFingerprint.tenant_id, ResumeFingerprint.content_hash],
+        set_={
+            "raw_text": func.coalesce(stmt.excluded.raw_text, ResumeFingerprint.raw_text),
+            "summary": func.coalesce(stmt.excluded.summary, ResumeFingerprint.summary),
+            "updated_at": func.now(),
+        },
+    )
+    db.execute(stmt)
+    logger.info(f"🧬 [fingerprint] Atualizado {content_hash[:12]}… (tenant={tenant_id})")
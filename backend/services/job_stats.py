@@ -0,0 +1,179 @@
+import math
+from typing import TYPE_CHECKING
+
+from sqlalchemy import select, exists, text
+from sqlalchemy.orm import Session
+
+from backend.database.models import Analysis, JobStats, Resume
+
+if TYPE_CHECKING:
+    # só para anotação: o worker importa este módulo e roda sem o stack async
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+HISTOGRAM_BINS = 20      # faixas de 0.5 ponto na escala 0-10
+SCORE_MAX = 10.0
+
+
+def score_bin_sql(column: str) -> str:
+    """
+    Faixa (1..HISTOGRAM_BINS) do score; 10 e valores fora da escala vão para
+    as pontas. NULL continua NULL (LEAST/GREATEST ignoram NULLs por conta própria).
+    """
+    return (
+        f"CASE WHEN {column} IS NOT NULL THEN "
+        f"GREATEST(1, LEAST(width_bucket({column}, 0, {SCORE_MAX}, {HISTOGRAM_BINS}), {HISTOGRAM_BINS})) END"
+    )
+
+
+# ======================================================
+# ➕ Atualização incremental (na transação que grava a análise)
+# ======================================================
+# Upsert atômico: a linha da vaga fica travada até o commit, então análises
+# concorrentes da mesma vaga somam em sequência. O histograma da nova
+# análise (um 1 na faixa do score) é somado elemento a elemento.
+_RECORD_SQL = text(f"""
+    WITH v AS (SELECT CAST(:score AS double precision) AS score)
+    INSERT INTO job_stats AS s (
+        tenant_id, job_id, analyses, resumes, score_count, score_sum, score_sumsq,
+        score_min, score_max, histogram, updated_at
+    )
+    SELECT
+        :tenant_id, :job_id, 1, :new_resume, (v.score IS NOT NULL)::int,
+        COALESCE(v.score, 0), COALESCE(v.score * v.score, 0), v.score, v.score,
+        ARRAY(
+            SELECT COALESCE((i = {score_bin_sql("v.score")})::int, 0)
+            FROM generate_series(1, {HISTOGRAM_BINS}) AS i ORDER BY i
+        ),
+        now()
+    FROM v
+    ON CONFLICT (tenant_id, job_id) DO UPDATE SET
+        analyses = s.analyses + 1,
+        resumes = s.resumes + EXCLUDED.resumes,
+        score_count = s.score_count + EXCLUDED.score_count,
+        score_sum = s.score_sum + EXCLUDED.score_sum,
+        score_sumsq = s.score_sumsq + EXCLUDED.score_sumsq,
+        score_min = LEAST(s.score_min, EXCLUDED.score_min),
+        score_max = GREATEST(s.score_max, EXCLUDED.score_max),
+        histogram = ARRAY(
+            SELECT a + b
+            FROM unnest(s.histogram, EXCLUDED.histogram) WITH ORDINALITY AS u(a, b, i)
+            ORDER BY i
+        ),
+        updated_at = now()
+""")
+
+
+def record_analysis(db: Session, tenant_id: str, job_id: str, resume_id: str, score: float | None):
+    """
+    Soma uma análise ao rollup da vaga. Chamar antes de adicionar a
+    análise à sessão (o currículo conta como novo se ainda não tiver
+    nenhuma) e commitar junto com ela.
+
+    A linha do currículo fica travada até o commit: duas gravações
+    concorrentes do mesmo currículo verificam "já tem análise?" em
+    sequência, e só a primeira o conta em `resumes`.
+    """
+    db.execute(select(Resume.id).where(Resume.id == resume_id).with_for_update())
+    new_resume = not db.scalar(
+        select(exists().where(Analysis.tenant_id == tenant_id, Analysis.resume_id == resume_id))
+    )
+    db.execute(_RECORD_SQL, {
+        "tenant_id": tenant_id,
+        "job_id": job_id,
+        "new_resume": int(new_resume),
+        "score": score,
+    })
+
+
+# ======================================================
+# 🔁 Reconstrução a partir das análises (reparo)
+# ======================================================
+def rebuild(db: Session, tenant_id: str | None = None) -> int:
+    """
+    Recalcula o rollup do zero (de um tenant ou de todos) e devolve o nº de
+    vagas gravadas. A tabela fica travada para escrita até o commit: as
+    análises gravadas durante a reconstrução esperam e entram depois, sem
+    contar duas vezes nem se perder.
+    """
+    where = "WHERE tenant_id = :tenant_id" if tenant_id else ""
+    params = {"tenant_id": tenant_id} if tenant_id else {}
+    bins = ",\n            ".join(
+        f"count(*) FILTER (WHERE {score_bin_sql('score')} = {i})" for i in range(1, HISTOGRAM_BINS + 1)
+    )
+    db.execute(text("LOCK TABLE job_stats IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(text(f"DELETE FROM job_stats {where}"), params)
+    result = db.execute(text(f"""
+        INSERT INTO job_stats (
+            tenant_id, job_id, analyses, resumes, score_count, score_sum, score_sumsq,
+            score_min, score_max, histogram, updated_at
+        )
+        SELECT
+            tenant_id, job_id, count(*), count(DISTINCT resume_id), count(score),
+            COALESCE(sum(score), 0), COALESCE(sum(score * score), 0), min(score), max(score),
+            ARRAY[
+            {bins}
+            ]::int[],
+            now()
+        FROM analysis
+        {where}
+        GROUP BY tenant_id, job_id
+    """), params)
+    return result.rowcount
+
+
+# ======================================================
+# 📊 Leitura (uma linha por vaga)
+# ======================================================
+def _mean_std(count: int, total: float, sumsq: float) -> tuple[float | None, float | None]:
+    if not count:
+        return None, None
+    mean = total / count
+    # desvio padrão populacional; max() evita -0.0000001 por arredondamento
+    return mean, math.sqrt(max(sumsq / count - mean * mean, 0.0))
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 2) if value is not None else None
+
+
+async def read_stats(db: "AsyncSession", tenant_id: str, job_ids: list[str] | None = None) -> dict:
+    """Totais, por vaga e histograma somando as linhas de job_stats do tenant."""
+    q = select(JobStats).where(JobStats.tenant_id == tenant_id)
+    if job_ids:
+        q = q.where(JobStats.job_id.in_(job_ids))
+    rows = (await db.scalars(q.order_by(JobStats.resumes.desc(), JobStats.job_id))).all()
+
+    scored = sum(r.score_count for r in rows)
+    avg, std = _mean_std(scored, sum(r.score_sum for r in rows), sum(r.score_sumsq for r in rows))
+    maxima = [r.score_max for r in rows if r.score_max is not None]
+    minima = [r.score_min for r in rows if r.score_min is not None]
+    histogram = [sum(bins) for bins in zip(*(r.histogram for r in rows))] or [0] * HISTOGRAM_BINS
+
+    by_job = []
+    for r in rows:
+        job_avg, job_std = _mean_std(r.score_count, r.score_sum, r.score_sumsq)
+        by_job.append({
+            "job_id": r.job_id,
+            "analyses": r.analyses,
+            "resumes": r.resumes,
+            "avg_score": _round(job_avg),
+            "std_score": _round(job_std),
+            "min_score": r.score_min,
+            "max_score": r.score_max,
+        })
+
+    width = SCORE_MAX / HISTOGRAM_BINS
+    return {
+        "total": sum(r.analyses for r in rows),
+        "resumes": sum(r.resumes for r in rows),
+        "scored": scored,
+        "avg_score": _round(avg),
+        "std_score": _round(std),
+        "min_score": _round(min(minima)) if minima else None,
+        "max_score": _round(max(maxima)) if maxima else None,
+        "by_job": by_job,
+        "histogram": [
+            {"start": round(i * width, 2), "end": round((i + 1) * width, 2), "count": count}
+            for i, count in enumerate(histogram)
+        ],
+    }
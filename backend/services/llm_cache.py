@@ -0,0 +1,497 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 🔑 Chave endereçada por conteúdo
+# ======================================================
+def cache_key(
+    model: str,
+    messages: list,
+    temperature: float,
+    max_tokens: int,
+    response_format: dict | None = None,
+) -> str:
+    """
+    SHA-256 de (model, messages, temperature, max_tokens, response_format).
+    Prompts idênticos geram sempre a mesma chave.
+    """
+    payload = json.dumps(
+        {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "response_format": response_format,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ======================================================
+# 🧠 Backend em memória (LRU + TTL)
+# ======================================================
+class MemoryLRUBackend:
+    distributed = False
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+# ======================================================
+# 🗂️ Backend SQLite local (persistente entre processos da máquina)
+# ======================================================
+class SQLiteBackend:
+    distributed = False
+
+    def __init__(self, path: str, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            self._writes += 1
+            # Poda periódica: expirados + excedente pelo LRU
+            if self._writes % 50 == 0:
+                self._prune(now)
+            self._conn.commit()
+
+    def _prune(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN "
+                "(SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+
+# ======================================================
+# 📦 Backend Redis (compartilhado entre workers)
+# ======================================================
+# Só apaga o lock se ainda for do mesmo dono: quem passou do timeout não
+# derruba o lock que outro worker obteve depois.
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBackend:
+    """
+    Valores com TTL nativo do Redis; um ZSET (chave → último acesso)
+    limita o número de entradas removendo as menos usadas.
+    Também oferece lock distribuído para coalescer chamadas entre workers.
+    """
+    distributed = True
+    prefix = "llmcache:"
+
+    def __init__(self, url: str, max_entries: int, ttl: int):
+        from redis import Redis
+
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.redis = Redis.from_url(url, decode_responses=True)
+        self._index = f"{self.prefix}index"
+        self._stats = f"{self.prefix}stats"
+        self._release = self.redis.register_script(_RELEASE_LOCK_LUA)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}v:{key}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.prefix}lock:{key}"
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.redis.get(self._key(key))
+        if value is not None:
+            self.redis.zadd(self._index, {key: time.time()})
+        return value
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        pipe = self.redis.pipeline()
+        pipe.set(self._key(key), value, ex=self.ttl)
+        pipe.zadd(self._index, {key: now})
+        pipe.zremrangebyscore(self._index, "-inf", now - self.ttl)
+        pipe.zcard(self._index)
+        size = pipe.execute()[-1]
+
+        excess = size - self.max_entries
+        if excess > 0:
+            evicted = [k for k, _ in self.redis.zpopmin(self._index, excess)]
+            if evicted:
+                self.redis.delete(*[self._key(k) for k in evicted])
+
+    def size(self) -> int:
+        return self.redis.zcard(self._index)
+
+    def acquire_lock(self, key: str, timeout: float) -> Optional[str]:
+        """Token do dono se obteve o lock, None se outro worker já o tem."""
+        token = uuid.uuid4().hex
+        if self.redis.set(self._lock_key(key), token, nx=True, px=int(timeout * 1000)):
+            return token
+        return None
+
+    def release_lock(self, key: str, token: str):
+        self._release(keys=[self._lock_key(key)], args=[token])
+
+    def is_locked(self, key: str) -> bool:
+        return bool(self.redis.exists(self._lock_key(key)))
+
+    def incr_stat(self, name: str):
+        self.redis.hincrby(self._stats, name, 1)
+
+    def shared_stats(self) -> dict:
+        return {k: int(v) for k, v in self.redis.hgetall(self._stats).items()}
+
+
+# ======================================================
+# ♻️ Cache com singleflight
+# ======================================================
+class LLMCache:
+    """
+    Cache de respostas na frente de OpenAIClient._chat.
+
+    - hit: devolve a resposta gravada
+    - miss: apenas uma chamada por chave fica em voo; chamadas idênticas
+      concorrentes (threads, tasks asyncio e, no Redis, outros workers)
+      aguardam o resultado dela
+    - falhas do backend nunca quebram a chamada à OpenAI
+    - com `validate`, só respostas que passam na validação são gravadas:
+      uma resposta truncada ou fora do schema não é servida durante o TTL
+    """
+
+    def __init__(self, backend, lock_timeout: float = 120.0, poll_interval: float = 0.25):
+        self.backend = backend
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        self._counters_lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._ainflight: dict[str, asyncio.Future] = {}
+
+    # ---------- contadores ----------
+    def _count(self, name: str):
+        with self._counters_lock:
+            self.counters[name] += 1
+        if hasattr(self.backend, "incr_stat"):
+            try:
+                self.backend.incr_stat(name)
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            data = dict(self.counters)
+        lookups = data["hits"] + data["misses"] + data["coalesced"]
+        data["hit_ratio"] = round((data["hits"] + data["coalesced"]) / lookups, 4) if lookups else 0.0
+        try:
+            data["size"] = self.backend.size()
+            if hasattr(self.backend, "shared_stats"):
+                data["shared"] = self.backend.shared_stats()
+        except Exception:
+            pass
+        return data
+
+    # ---------- acesso tolerante a falhas ----------
+    def _safe_get(self, key: str) -> Optional[str]:
+        try:
+            return self.backend.get(key)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"⚠️ [llm_cache] Falha ao ler cache: {e}")
+            return None
+
+    def _safe_set(self, key: str, value: str):
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"⚠️ [llm_cache] Falha ao gravar cache: {e}")
+
+    def _store(self, key: str, value: str, validate: Optional[Callable[[str], Any]]):
+        if validate is not None:
+            try:
+                validate(value)
+            except ValueError as e:
+                logger.warning(f"⚠️ [llm_cache] Resposta inválida não foi gravada: {e}")
+                return
+        self._safe_set(key, value)
+
+    def _safe_acquire(self, key: str) -> tuple[bool, Optional[str]]:
+        """(pode calcular, token do lock distribuído a liberar depois)."""
+        if not self.backend.distributed:
+            return True, None
+        try:
+            token = self.backend.acquire_lock(key, self.lock_timeout)
+            return token is not None, token
+        except Exception as e:
+            self._count("errors")
+            logger.warning(f"⚠️ [llm_cache] Falha ao obter lock: {e}")
+            return True, None
+
+    def _safe_release(self, key: str, token: Optional[str]):
+        if token is None:
+            return
+        try:
+            self.backend.release_lock(key, token)
+        except Exception:
+            pass
+
+    def _peek_remote(self, key: str) -> tuple[Optional[str], bool]:
+        """Retorna (valor, ainda_travado) para quem espera outro worker."""
+        value = self._safe_get(key)
+        if value is not None:
+            return value, False
+        try:
+            return None, self.backend.is_locked(key)
+        except Exception:
+            return None, False
+
+    # ---------- API síncrona ----------
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], str],
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        value = self._safe_get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            value = self._compute_once(key, compute, validate)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _compute_once(
+        self,
+        key: str,
+        compute: Callable[[], str],
+        validate: Optional[Callable[[str], Any]],
+    ) -> str:
+        acquired, token = self._safe_acquire(key)
+        if not acquired:
+            # Outro worker já está chamando a OpenAI com este prompt
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                value, locked = self._peek_remote(key)
+                if value is not None:
+                    self._count("coalesced")
+                    return value
+                if not locked:
+                    break
+                time.sleep(self.poll_interval)
+
+        try:
+            self._count("misses")
+            value = compute()
+            self._store(key, value, validate)
+            return value
+        finally:
+            self._safe_release(key, token)
+
+    # ---------- API assíncrona ----------
+    async def aget_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[str]],
+        validate: Optional[Callable[[str], Any]] = None,
+    ) -> str:
+        value = await asyncio.to_thread(self._safe_get, key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        loop = asyncio.get_running_loop()
+        future = self._ainflight.get(key)
+        if future is not None and future.get_loop() is loop:
+            self._count("coalesced")
+            return await asyncio.shield(future)
+
+        future = loop.create_future()
+        self._ainflight[key] = future
+        try:
+            value = await self._acompute_once(key, compute, validate)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # evita "exception was never retrieved" sem esperas
+            raise
+        finally:
+            if self._ainflight.get(key) is future:
+                del self._ainflight[key]
+
+    async def _acompute_once(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[str]],
+        validate: Optional[Callable[[str], Any]],
+    ) -> str:
+        acquired, token = await asyncio.to_thread(self._safe_acquire, key)
+        if not acquired:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                value, locked = await asyncio.to_thread(self._peek_remote, key)
+                if value is not None:
+                    self._count("coalesced")
+                    return value
+                if not locked:
+                    break
+                await asyncio.sleep(self.poll_interval)
+
+        try:
+            self._count("misses")
+            value = await compute()
+            await asyncio.to_thread(self._store, key, value, validate)
+            return value
+        finally:
+            await asyncio.to_thread(self._safe_release, key, token)
+
+
+# ======================================================
+# 🏭 Instância por processo
+# ======================================================
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def build_llm_cache(backend: str | None = None) -> Optional[LLMCache]:
+    backend = (backend or settings.LLM_CACHE_BACKEND).lower()
+    ttl = settings.LLM_CACHE_TTL_SECONDS
+    max_entries = settings.LLM_CACHE_MAX_ENTRIES
+
+    if backend in ("", "none", "off"):
+        return None
+    if backend == "memory":
+        return LLMCache(MemoryLRUBackend(max_entries, ttl))
+    if backend == "sqlite":
+        return LLMCache(SQLiteBackend(settings.LLM_CACHE_SQLITE_PATH, max_entries, ttl))
+    if backend == "redis":
+        return LLMCache(RedisBackend(settings.REDIS_URL, max_entries, ttl))
+    raise ValueError(f"LLM_CACHE_BACKEND inválido: {backend}")
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Retorna o cache configurado (criado uma vez por processo)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = build_llm_cache()
+                except Exception as e:
+                    logger.error(f"❌ [llm_cache] Cache desativado: {e}")
+                    return None
+                if _cache:
+                    logger.info(f"✅ [llm_cache] Cache ativo ({settings.LLM_CACHE_BACKEND})")
+    return _cache
@@ -1,15 +1,186 @@
-import fitz, io
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator
+
+import fitz
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 📄 Resultado da extração
+# ======================================================
+# Separador de páginas em PdfText.text (e no raw_text gravado): permite ao
+# pré-processamento reconhecer cabeçalhos/rodapés por página
+PAGE_BREAK = "\f"
+
+
+@dataclass
+class PdfText:
+    text: str
+    pages: int          # páginas lidas
+    total_pages: int    # páginas do documento
+    truncated: bool     # parou no limite de páginas ou de caracteres
+    seconds: float
+
+
+def _open(source: bytes | str) -> fitz.Document:
+    # bytes vão direto para o PyMuPDF (sem cópia em BytesIO)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+
+def iter_pages(doc: fitz.Document, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    """Texto de cada página de [start, stop), uma por vez."""
+    stop = doc.page_count if stop is None else min(stop, doc.page_count)
+    for number in range(start, stop):
+        yield doc.load_page(number).get_text()
+
+
+def _collect(pages: Iterator[str], max_chars: int | None) -> tuple[list[str], int, bool]:
+    """Junta páginas até `max_chars`; retorna (partes, páginas lidas, cortou)."""
+    parts, size, count = [], 0, 0
+    for text in pages:
+        count += 1
+        if max_chars is not None and size + len(text) > max_chars:
+            parts.append(text[: max_chars - size])
+            return parts, count, True
+        parts.append(text)
+        size += len(text)
+    return parts, count, False
+
+
+def _extract_range(source: bytes | str, start: int, stop: int, max_chars: int | None) -> tuple[str, int, bool]:
+    """Trecho de páginas (roda em um processo do pool de extração paralela)."""
+    with _open(source) as doc:
+        parts, count, cut = _collect(iter_pages(doc, start, stop), max_chars)
+    return PAGE_BREAK.join(parts), count, cut
+
+
+# ======================================================
+# ⚡ Extração paralela (PDFs grandes)
+# ======================================================
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _executor
+
+
+def _extract_parallel(source: bytes | str, last: int, max_chars: int | None, workers: int) -> tuple[list[str], int, bool]:
+    """
+    Divide as páginas em `workers` trechos contíguos extraídos em processos
+    separados (o PyMuPDF não é thread-safe e segura a GIL). Os trechos são
+    reunidos em ordem, respeitando o limite de caracteres.
+    """
+    step = -(-last // workers)
+    futures = [
+        _get_executor(workers).submit(_extract_range, source, start, min(start + step, last), max_chars)
+        for start in range(0, last, step)
+    ]
+    parts, count, size = [], 0, 0
+    for future in futures:
+        text, pages, cut = future.result()
+        if max_chars is not None and (cut or size + len(text) > max_chars):
+            parts.append(text[: max_chars - size])
+            # páginas até onde o texto foi cortado (aproximação pelo trecho)
+            return parts, count + pages, True
+        parts.append(text)
+        size += len(text)
+        count += pages
+    return parts, count, False
+
+
+# ======================================================
+# 🚀 Extração com limites
+# ======================================================
+def extract_text(
+    source: bytes | str,
+    max_pages: int | None = None,
+    max_chars: int | None = None,
+    parallel: int | None = None,
+) -> PdfText:
+    """
+    Extrai o texto do PDF (bytes ou caminho) página a página, parando em
+    `max_pages` páginas ou `max_chars` caracteres (padrões PDF_MAX_PAGES e
+    PDF_MAX_CHARS; 0 = sem limite). Com `parallel` > 1 (padrão
+    PDF_PARALLEL_WORKERS), documentos com PDF_PARALLEL_MIN_PAGES páginas ou
+    mais são extraídos em processos paralelos.
+    """
+    max_pages = settings.PDF_MAX_PAGES if max_pages is None else max_pages
+    max_chars = (settings.PDF_MAX_CHARS if max_chars is None else max_chars) or None
+    parallel = settings.PDF_PARALLEL_WORKERS if parallel is None else parallel
+
+    started = time.perf_counter()
+    with _open(source) as doc:
+        total = doc.page_count
+        last = min(total, max_pages) if max_pages else total
+        use_parallel = parallel > 1 and last >= settings.PDF_PARALLEL_MIN_PAGES
+        if not use_parallel:
+            parts, count, cut = _collect(iter_pages(doc, 0, last), max_chars)
+    if use_parallel:
+        parts, count, cut = _extract_parallel(source, last, max_chars, parallel)
+
+    result = PdfText(
+        text=PAGE_BREAK.join(parts),
+        pages=count,
+        total_pages=total,
+        truncated=cut or last < total,
+        seconds=time.perf_counter() - started,
+    )
+    logger.debug(
+        f"📄 [pdf] {result.pages}/{result.total_pages} páginas, {len(result.text)} caracteres "
+        f"em {result.seconds * 1000:.0f}ms" + (" (truncado)" if result.truncated else "")
+    )
+    return result
+
+
+# ======================================================
+# 🔠 OCR local (PDFs escaneados)
+# ======================================================
+def ocr_text(source: bytes | str, max_pages: int | None = None) -> PdfText:
+    """
+    Extrai o texto por OCR (Tesseract via PyMuPDF) das primeiras `max_pages`
+    páginas (padrão OCR_MAX_PAGES). Exige o Tesseract instalado no worker;
+    sem ele, o PyMuPDF levanta RuntimeError.
+    """
+    max_pages = settings.OCR_MAX_PAGES if max_pages is None else max_pages
+    started = time.perf_counter()
+    parts = []
+    with _open(source) as doc:
+        total = doc.page_count
+        last = min(total, max_pages) if max_pages else total
+        for number in range(last):
+            page = doc.load_page(number)
+            textpage = page.get_textpage_ocr(language=settings.OCR_LANGUAGE, dpi=settings.OCR_DPI, full=True)
+            parts.append(page.get_text(textpage=textpage))
+    return PdfText(
+        text=PAGE_BREAK.join(parts),
+        pages=last,
+        total_pages=total,
+        truncated=last < total,
+        seconds=time.perf_counter() - started,
+    )
+
 
 def read_pdf(path: str) -> str:
-    text = ""
-    with fitz.open(path) as pdf:
-        for p in pdf:
-            text += p.get_text()
-    return text
+    return extract_text(path).text
+
 
 def read_pdf_bytes(b: bytes) -> str:
-    text = ""
-    with fitz.open(stream=io.BytesIO(b), filetype="pdf") as pdf:
-        for p in pdf:
-            text += p.get_text()
-    return text
+    return extract_text(b).text
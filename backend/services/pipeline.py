@@ -1,5 +1,12 @@
 from backend.services.ai_service import OpenAIClient
-from backend.services.pdf_service import read_pdf, read_pdf_bytes
+from backend.services.pdf_service import extract_text
+from backend.services.preprocess_service import preprocess_cv
+from backend.services.prescreen_service import score_resume
+from backend.services.text_quality import classify_text
+from backend.services.analysis_stats import invalidate_stats
+from backend.services.job_stats import record_analysis
+from backend.services.rate_limiter import tenant_scope
+from backend.services.fingerprint import pdf_fingerprint, get_fingerprint, save_fingerprint
 from sqlalchemy.orm import Session
 from backend.database.models import Resume, Analysis
 import uuid
@@ -20,7 +27,7 @@ def process_resume(
     """
     Pipeline síncrono de análise de currículo.
     1️⃣ Extrai texto do PDF
-    2️⃣ Gera resumo, opinião e score com IA
+    2️⃣ Pré-processa o texto e gera resumo, opinião e score com IA
     3️⃣ Persiste no banco (Resume + Analysis)
     """
     resume_id = str(uuid.uuid4())
@@ -31,18 +38,49 @@ def process_resume(
         # 1) Extração do texto
         # ==============================
         if raw_bytes:
-            raw_text = read_pdf_bytes(raw_bytes)
+            content_hash = pdf_fingerprint(raw_bytes)
         elif local_path:
-            raw_text = read_pdf(local_path)
+            with open(local_path, "rb") as f:
+                content_hash = pdf_fingerprint(f.read())
         else:
             raise ValueError("Nem raw_bytes nem local_path foram fornecidos.")
 
+        fingerprint = get_fingerprint(db, tenant_id, content_hash)
+        if fingerprint and fingerprint.raw_text:
+            raw_text = fingerprint.raw_text
+        else:
+            extracted = extract_text(raw_bytes or local_path)
+            raw_text = extracted.text
+            # PDF escaneado ou texto ilegível: não vai para a IA
+            quality = classify_text(raw_text, extracted.pages)
+            if not quality.ok:
+                resume = Resume(
+                    id=resume_id,
+                    tenant_id=tenant_id,
+                    job_id=job["id"],
+                    file_url=file_url or (local_path or ""),
+                    content_hash=content_hash,
+                    raw_text=raw_text,
+                    opinion=f"Texto do PDF inutilizável ({quality.status}): {quality.reason}",
+                    status=quality.status,
+                )
+                db.add(resume)
+                db.commit()
+                print(f"[process_resume] ⚠️ Currículo {resume_id} sem texto utilizável ({quality.status})")
+                return resume
+
+        prescreen_score = score_resume(job, raw_text)
+
         # ==============================
-        # 2) Análise com IA
+        # 2) Pré-processamento + análise com IA
         # ==============================
-        summary = ai.resume_cv(raw_text)
-        opinion = ai.generate_opinion(raw_text, job)
-        score = ai.generate_score(raw_text, job)
+        prepared = preprocess_cv(raw_text)
+        cached_summary = fingerprint.summary if fingerprint else None
+        with tenant_scope(tenant_id):
+            result = ai.analyse(prepared.text, job, summary=cached_summary)
+        summary = result["summary"]
+        opinion = result["opinion"]
+        score = result["score"]
 
         # ==============================
         # 3) Criar registro do Resume
@@ -52,7 +90,11 @@ def process_resume(
             tenant_id=tenant_id,
             job_id=job["id"],
             file_url=file_url or (local_path or ""),
+            content_hash=content_hash,
             raw_text=raw_text,
+            tokens_raw=prepared.tokens_before,
+            tokens_prompt=prepared.tokens_after,
+            prescreen_score=prescreen_score,
             summary=summary,
             opinion=opinion,
             score=score,
@@ -63,6 +105,7 @@ def process_resume(
         # ==============================
         # 4) Criar registro do Analysis
         # ==============================
+        record_analysis(db, tenant_id, job["id"], resume_id, score)
         analysis = Analysis(
             id=str(uuid.uuid4()),
             tenant_id=tenant_id,
@@ -76,7 +119,9 @@ def process_resume(
         )
         db.add(analysis)
 
+        save_fingerprint(db, tenant_id, content_hash, raw_text=raw_text, summary=summary)
         db.commit()
+        invalidate_stats(tenant_id)
         db.refresh(resume)
 
         print(f"[process_resume] ✅ Currículo {resume_id} processado com sucesso (tenant={tenant_id})")
@@ -0,0 +1,269 @@
+import re
+import logging
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+from backend.config import settings
+from backend.services.pdf_service import PAGE_BREAK
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # contagem aproximada (4 caracteres ≈ 1 token)
+    tiktoken = None
+
+
+# ======================================================
+# 🔢 Contagem de tokens (local)
+# ======================================================
+_encodings = {}
+
+
+def _get_encoding(model: str | None):
+    if tiktoken is None:
+        return None
+    model = model or settings.OPENAI_MODEL
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    enc = _get_encoding(model)
+    if enc is None:
+        return (len(text) + 3) // 4
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str | None = None) -> str:
+    if max_tokens <= 0:
+        return ""
+    enc = _get_encoding(model)
+    if enc is None:
+        return text[: max_tokens * 4]
+    tokens = enc.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
+
+
+# ======================================================
+# 🧹 Limpeza do texto extraído do PDF
+# ======================================================
+_PAGE_NUMBER_RE = re.compile(
+    r"^\s*(?:(?:p[áa]gina|page|p[áa]g\.?)\s*)?\d{1,3}\s*(?:(?:/|de|of)\s*\d{1,3})?\s*$",
+    re.IGNORECASE,
+)
+_BOILERPLATE_RE = re.compile(
+    r"(curr[ií]culo\s+(?:gerado|criado)\s+(?:por|com|no|em)|generated\s+(?:by|with)|"
+    r"powered\s+by|^\s*(?:cv|curriculum vitae|curr[ií]culo)\s*$)",
+    re.IGNORECASE,
+)
+# Cabeçalho/rodapé: bloco de até _EDGE_LINES linhas, colado ao topo ou ao
+# rodapé, que se repete na mesma posição em mais da metade das páginas
+_EDGE_LINES = 3
+_EDGE_LINE_MAX_LEN = 80
+
+
+def _normalise_line(line: str) -> str:
+    line = unicodedata.normalize("NFKC", line)
+    line = line.replace("\u00ad", "")  # hífen "soft"
+    return re.sub(r"\s+", " ", line).strip()
+
+
+def _edge_lines(lines: list[str], side: str) -> list[tuple[int, tuple]]:
+    """[(índice, chave)] das primeiras linhas não vazias a partir do topo ou do rodapé."""
+    filled = [i for i, line in enumerate(lines) if line]
+    edge = filled[:_EDGE_LINES] if side == "top" else filled[::-1][:_EDGE_LINES]
+    out = []
+    for n, i in enumerate(edge):
+        if len(lines[i]) > _EDGE_LINE_MAX_LEN:
+            break
+        # números variam entre páginas ("Página 2", "05/2024"): comparados como #
+        out.append((i, (side, n, re.sub(r"\d+", "#", lines[i].casefold()))))
+    return out
+
+
+def _page_headers(pages: list[list[str]]) -> set:
+    """
+    Chaves (lado, posição, linha) de cabeçalho/rodapé. A posição n só conta
+    nas páginas em que as linhas antes dela (mais perto da borda) também são
+    cabeçalho, então conteúdo logo abaixo do cabeçalho não entra no bloco.
+    """
+    if len(pages) < 2:
+        return set()
+    headers = set()
+    for side in ("top", "bottom"):
+        edges = [_edge_lines(lines, side) for lines in pages]
+        active = list(range(len(pages)))
+        for n in range(_EDGE_LINES):
+            counts = Counter(edges[p][n][1] for p in active if len(edges[p]) > n)
+            found = {key for key, count in counts.items() if count > len(pages) / 2}
+            if not found:
+                break
+            headers |= found
+            active = [p for p in active if len(edges[p]) > n and edges[p][n][1] in found]
+    return headers
+
+
+def _header_lines(lines: list[str], headers: set) -> dict[int, tuple]:
+    """Índice → chave das linhas da página que formam o cabeçalho/rodapé."""
+    found = {}
+    for side in ("top", "bottom"):
+        for i, key in _edge_lines(lines, side):
+            if key not in headers:
+                break
+            found[i] = key
+    return found
+
+
+def clean_text(text: str) -> str:
+    """
+    Normaliza espaços/Unicode, remove números de página, boilerplate e
+    cabeçalhos/rodapés, e colapsa linhas em branco consecutivas.
+    Cabeçalhos/rodapés são detectados por página (o texto extraído separa
+    as páginas com PAGE_BREAK): só a primeira ocorrência é mantida. Linhas
+    repetidas no meio das páginas (tecnologias, empresas) não são tocadas.
+    """
+    pages = []
+    for page in text.split(PAGE_BREAK):
+        lines = [_normalise_line(l) for l in page.splitlines()]
+        pages.append([
+            "" if _PAGE_NUMBER_RE.match(l) or _BOILERPLATE_RE.search(l) else l
+            for l in lines
+        ])
+    headers = _page_headers(pages)
+
+    seen_headers = set()
+    out = []
+    for lines in pages:
+        page_headers = _header_lines(lines, headers) if headers else {}
+        for i, line in enumerate(lines + [""]):  # linha em branco entre páginas
+            if not line:
+                if out and out[-1] != "":
+                    out.append("")
+                continue
+            if i in page_headers:
+                if page_headers[i] in seen_headers:
+                    continue
+                seen_headers.add(page_headers[i])
+            if out and out[-1].casefold() == line.casefold():
+                continue
+            out.append(line)
+
+    return "\n".join(out).strip()
+
+
+# ======================================================
+# 📑 Seções e priorização dentro do orçamento
+# ======================================================
+# Ordem = prioridade quando o currículo não cabe no orçamento
+SECTION_PRIORITY = [
+    ("experiencia", r"experi[eê]ncias?( profissional| profissionais)?|hist[oó]rico profissional|experience|work experience|employment"),
+    ("habilidades", r"habilidades|compet[eê]ncias|conhecimentos|skills|tecnologias"),
+    ("formacao", r"forma[cç][aã]o( acad[eê]mica)?|educa[cç][aã]o|escolaridade|education"),
+    ("resumo", r"resumo( profissional)?|perfil( profissional)?|objetivos?|sobre mim|summary|profile|about"),
+    ("idiomas", r"idiomas|l[ií]nguas|languages"),
+    ("certificacoes", r"certifica[cç][oõ]es|certificados|certifications"),
+    ("projetos", r"projetos|projects"),
+    ("cursos", r"cursos( complementares)?|courses|treinamentos"),
+]
+_SECTION_RES = [
+    (name, re.compile(rf"^\W*(?:{pattern})\W*$", re.IGNORECASE))
+    for name, pattern in SECTION_PRIORITY
+]
+_PRIORITY = {name: i for i, (name, _) in enumerate(SECTION_PRIORITY)}
+
+
+def _section_of(line: str) -> str | None:
+    if len(line) > 40:
+        return None
+    for name, regex in _SECTION_RES:
+        if regex.match(line):
+            return name
+    return None
+
+
+def split_sections(text: str) -> list[tuple[str, str]]:
+    """
+    Divide o texto em [(seção, conteúdo)]. O trecho antes do primeiro título
+    (nome e contato) fica em "cabecalho"; títulos não reconhecidos continuam
+    na seção anterior.
+    """
+    sections = [["cabecalho", []]]
+    for line in text.split("\n"):
+        name = _section_of(line)
+        if name:
+            sections.append([name, [line]])
+        else:
+            sections[-1][1].append(line)
+    return [(name, "\n".join(lines).strip()) for name, lines in sections if "\n".join(lines).strip()]
+
+
+def _priority(name: str) -> int:
+    if name == "cabecalho":
+        return -1
+    return _PRIORITY.get(name, len(_PRIORITY))
+
+
+def fit_to_budget(text: str, budget: int, model: str | None = None) -> str:
+    """
+    Mantém o texto dentro de `budget` tokens. As seções são atendidas por
+    prioridade (cabeçalho, experiência, habilidades, formação...); a última
+    que couber é truncada e as demais são descartadas. A ordem original
+    das seções é preservada na saída.
+    """
+    if count_tokens(text, model) <= budget:
+        return text
+
+    sections = split_sections(text)
+    sizes = [count_tokens(content, model) for _, content in sections]
+    allowed = [0] * len(sections)
+
+    remaining = budget
+    for i in sorted(range(len(sections)), key=lambda i: _priority(sections[i][0])):
+        if remaining <= 0:
+            break
+        allowed[i] = min(sizes[i], remaining)
+        remaining -= allowed[i] + 1  # +1 ≈ quebra de linha entre seções
+
+    parts = []
+    for (name, content), size, keep in zip(sections, sizes, allowed):
+        if keep <= 0:
+            continue
+        parts.append(content if keep >= size else truncate_tokens(content, keep, model))
+    return "\n\n".join(parts)
+
+
+# ======================================================
+# 🚀 Etapa de pré-processamento
+# ======================================================
+@dataclass
+class PreprocessedCV:
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+
+def preprocess_cv(raw_text: str, budget: int | None = None, model: str | None = None) -> PreprocessedCV:
+    """
+    Prepara o texto extraído do PDF para os prompts: limpeza + orçamento
+    de tokens (settings.CV_TOKEN_BUDGET).
+    """
+    budget = budget or settings.CV_TOKEN_BUDGET
+    raw_text = raw_text or ""
+
+    tokens_before = count_tokens(raw_text, model)
+    text = fit_to_budget(clean_text(raw_text), budget, model)
+    tokens_after = count_tokens(text, model)
+
+    logger.info(
+        f"✂️ [preprocess] Tokens do currículo: {tokens_before} → {tokens_after} "
+        f"(orçamento={budget})"
+    )
+    return PreprocessedCV(text=text, tokens_before=tokens_before, tokens_after=tokens_after)
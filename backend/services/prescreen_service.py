@@ -0,0 +1,202 @@
+import re
+import logging
+import unicodedata
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+from sqlalchemy.orm import Session
+
+from backend.database.models import Job, Resume
+
+logger = logging.getLogger(__name__)
+
+# Parâmetros clássicos do BM25
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Tamanho médio de referência de um currículo (tokens após tokenize).
+# Fixo para que o pré-score de um currículo não dependa do lote em que foi
+# calculado: o valor imediato (após o parse) e o do reprocessamento em lote
+# são iguais, e limiar/top-K comparam grandezas equivalentes.
+BM25_AVGDL = 400.0
+
+# Status que ainda podem ser barrados pela pré-triagem (antes da IA)
+PENDING_STATUSES = ("queued", "parsed", "screened_out")
+
+_STOPWORDS = {
+    # português
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na",
+    "nos", "nas", "um", "uma", "para", "por", "com", "sem", "que", "ou", "se",
+    "ao", "aos", "sua", "seu", "suas", "seus", "como", "mais", "ser", "ter",
+    "entre", "sobre", "pelo", "pela", "etc", "experiencia", "conhecimento",
+    # inglês
+    "the", "and", "of", "to", "in", "for", "with", "on", "at", "an", "or", "is",
+    "are", "be", "as", "by", "from", "experience", "knowledge",
+}
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+# ======================================================
+# 🔤 Tokenização
+# ======================================================
+def tokenize(text: str) -> list[str]:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(text) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def job_query_text(job: dict) -> str:
+    """Texto da vaga usado como consulta (atividades, requisitos, diferenciais e critérios)."""
+    parts = [
+        job.get("main_activities") or "",
+        job.get("prerequisites") or "",
+        job.get("differentials") or "",
+    ]
+    for c in job.get("criteria") or []:
+        parts.append(f"{c.get('criterio', '')} {c.get('descricao', '')}")
+    return "\n".join(parts)
+
+
+# ======================================================
+# 📐 BM25 vetorizado (matriz esparsa documentos × termos da vaga)
+# ======================================================
+def bm25_scores(
+    query: str,
+    docs: list[str],
+    k1: float = BM25_K1,
+    b: float = BM25_B,
+    avgdl: float = BM25_AVGDL,
+) -> np.ndarray:
+    """
+    Pontua todos os `docs` contra a consulta em uma única operação matricial.
+
+    Cada termo da vaga pesa pela sua frequência na vaga (sem IDF do lote,
+    ver BM25_AVGDL). O resultado é normalizado para 0..1 dividindo pelo
+    máximo teórico (cada termo da vaga com tf → ∞), então serve como
+    limiar configurável.
+    """
+    query_counts = Counter(tokenize(query))
+    if not docs or not query_counts:
+        return np.zeros(len(docs))
+
+    vocab = {term: i for i, term in enumerate(query_counts)}
+    qtf = np.array([query_counts[t] for t in vocab], dtype=np.float64)
+
+    rows, cols, data = [], [], []
+    doc_len = np.zeros(len(docs), dtype=np.float64)
+    for row, doc in enumerate(docs):
+        tokens = tokenize(doc)
+        doc_len[row] = len(tokens)
+        for term, count in Counter(t for t in tokens if t in vocab).items():
+            rows.append(row)
+            cols.append(vocab[term])
+            data.append(count)
+
+    tf = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float64), (rows, cols)),
+        shape=(len(docs), len(vocab)),
+    )
+
+    n_docs = len(docs)
+    row_of_entry = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+    norm = k1 * (1.0 - b + b * doc_len[row_of_entry] / avgdl)
+    tf.data = tf.data * (k1 + 1.0) / (tf.data + norm)
+
+    max_score = float(qtf.sum() * (k1 + 1.0))
+    if max_score <= 0:
+        return np.zeros(n_docs)
+    return np.asarray(tf @ qtf).ravel() / max_score
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "main_activities": job.main_activities or "",
+        "prerequisites": job.prerequisites or "",
+        "differentials": job.differentials or "",
+        "criteria": job.criteria or [],
+    }
+
+
+def score_resume(job: dict, raw_text: str) -> float:
+    """Pré-score imediato de um currículo recém-extraído."""
+    return round(float(bm25_scores(job_query_text(job), [raw_text or ""])[0]), 4)
+
+
+# ======================================================
+# 🚦 Corte por limiar / top-K
+# ======================================================
+def passes_prescreen(db: Session, job: Job, resume: Resume) -> bool:
+    """
+    Decide se o currículo segue para a IA. Sem limiar nem top-K na vaga,
+    tudo passa. No top-K, conta quantos currículos da vaga têm pré-score
+    maior; como os uploads chegam aos poucos, o corte é aproximado —
+    use prescreen_job para reclassificar o lote inteiro.
+    """
+    if resume.prescreen_score is None:
+        return True
+
+    if job.prescreen_threshold is not None and resume.prescreen_score < job.prescreen_threshold:
+        return False
+
+    if job.prescreen_top_k:
+        better = (
+            db.query(Resume.id)
+            .filter(
+                Resume.tenant_id == resume.tenant_id,
+                Resume.job_id == job.id,
+                Resume.id != resume.id,
+                Resume.prescreen_score > resume.prescreen_score,
+            )
+            .count()
+        )
+        if better >= job.prescreen_top_k:
+            return False
+
+    return True
+
+
+def prescreen_job(db: Session, job: Job) -> dict:
+    """
+    Recalcula o pré-score de todos os currículos extraídos da vaga em uma
+    única operação e aplica limiar/top-K aos que ainda não passaram pela IA.
+
+    Returns:
+        dict: {"ranking": [...] ordenado por pré-score,
+               "readmitted": ids que voltaram a passar no corte}
+    """
+    rows = (
+        db.query(Resume.id, Resume.raw_text, Resume.status)
+        .filter(
+            Resume.tenant_id == job.tenant_id,
+            Resume.job_id == job.id,
+            Resume.raw_text.isnot(None),
+        )
+        .all()
+    )
+    if not rows:
+        return {"ranking": [], "readmitted": []}
+
+    scores = bm25_scores(job_query_text(job_to_dict(job)), [r.raw_text for r in rows])
+    order = np.argsort(-scores, kind="stable")
+
+    cutoff_rank = job.prescreen_top_k or len(rows)
+    threshold = job.prescreen_threshold
+
+    updates, ranking, readmitted = [], [], []
+    for rank, idx in enumerate(order):
+        row = rows[idx]
+        score = round(float(scores[idx]), 4)
+        status = row.status
+        if status in PENDING_STATUSES:
+            passes = rank < cutoff_rank and (threshold is None or score >= threshold)
+            if not passes:
+                status = "screened_out"
+            elif status == "screened_out":
+                status = "parsed"
+                readmitted.append(row.id)
+        updates.append({"id": row.id, "prescreen_score": score, "status": status})
+        ranking.append({"resume_id": row.id, "prescreen_score": score, "status": status})
+
+    db.bulk_update_mappings(Resume, updates)
+    logger.info(f"📊 [prescreen] {len(rows)} currículos pontuados para job={job.id}")
+    return {"ranking": ranking, "readmitted": readmitted}
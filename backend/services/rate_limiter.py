@@ -0,0 +1,260 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from redis import Redis
+
+from backend.config import settings
+from backend.services.preprocess_service import count_tokens
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 🏷️ Tenant da chamada atual (propaga para threads/tasks asyncio)
+# ======================================================
+_current_tenant: ContextVar[Optional[str]] = ContextVar("llm_tenant_id", default=None)
+
+
+@contextmanager
+def tenant_scope(tenant_id: str | None):
+    """Associa as chamadas OpenAI dentro do bloco ao tenant informado."""
+    token = _current_tenant.set(tenant_id)
+    try:
+        yield
+    finally:
+        _current_tenant.reset(token)
+
+
+def current_tenant() -> Optional[str]:
+    return _current_tenant.get()
+
+
+def estimate_tokens(messages: list, max_tokens: int, model: str | None = None) -> int:
+    """Tokens de entrada (contagem local) + teto de saída."""
+    prompt = "\n".join(str(m.get("content", "")) for m in messages)
+    return count_tokens(prompt, model) + max_tokens
+
+
+class RateLimitTimeout(Exception):
+    """A capacidade não liberou dentro de OPENAI_RATE_LIMIT_MAX_WAIT."""
+
+
+# ======================================================
+# 🪣 Token buckets no Redis (atômico via Lua)
+# ======================================================
+# KEYS = buckets; ARGV = [n, (capacidade, taxa/s, custo) * n]
+# Tudo ou nada: só debita se todos os buckets tiverem saldo; senão
+# devolve o tempo de espera do bucket mais restritivo.
+_ACQUIRE_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local n = tonumber(ARGV[1])
+local levels = {}
+local wait = 0
+for i = 1, n do
+  local cap = tonumber(ARGV[2 + (i - 1) * 3])
+  local rate = tonumber(ARGV[3 + (i - 1) * 3])
+  local cost = math.min(tonumber(ARGV[4 + (i - 1) * 3]), cap)
+  local b = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+  local tokens = tonumber(b[1]) or cap
+  local ts = tonumber(b[2]) or now
+  tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+  levels[i] = tokens
+  if tokens < cost then
+    local w = (cost - tokens) / rate
+    if w > wait then wait = w end
+  end
+end
+if wait > 0 then
+  return {0, tostring(wait)}
+end
+for i = 1, n do
+  local cap = tonumber(ARGV[2 + (i - 1) * 3])
+  local cost = math.min(tonumber(ARGV[4 + (i - 1) * 3]), cap)
+  redis.call('HSET', KEYS[i], 'tokens', tostring(levels[i] - cost), 'ts', tostring(now))
+  redis.call('EXPIRE', KEYS[i], 3600)
+end
+return {1, '0'}
+"""
+
+# Ajuste após a resposta (estimado - real); pode deixar saldo negativo
+_ADJUST_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cap = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local delta = tonumber(ARGV[3])
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+tokens = math.min(cap, math.min(cap, tokens + math.max(0, now - ts) * rate) + delta)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], 3600)
+return tostring(tokens)
+"""
+
+
+class RedisRateLimiter:
+    """
+    Limitador distribuído de requisições/min e tokens/min, global e por
+    tenant, compartilhado por todos os workers. Quem não tem capacidade
+    espera (em vez de tomar 429 da OpenAI). Se o Redis falhar, libera a
+    chamada para não derrubar a análise.
+    """
+    prefix = "ratelimit"
+
+    def __init__(
+        self,
+        redis_conn: Redis,
+        global_rpm: int,
+        global_tpm: int,
+        tenant_rpm: int,
+        tenant_tpm: int,
+        max_wait: float,
+    ):
+        self.redis = redis_conn
+        self.limits = {
+            "global": {"rpm": global_rpm, "tpm": global_tpm},
+            "tenant": {"rpm": tenant_rpm, "tpm": tenant_tpm},
+        }
+        self.max_wait = max_wait
+        self._acquire = self.redis.register_script(_ACQUIRE_LUA)
+        self._adjust = self.redis.register_script(_ADJUST_LUA)
+
+    # ---------- buckets ----------
+    def _buckets(self, tenant_id: str | None) -> list[tuple[str, int]]:
+        buckets = [
+            (f"{self.prefix}:global:rpm", self.limits["global"]["rpm"]),
+            (f"{self.prefix}:global:tpm", self.limits["global"]["tpm"]),
+        ]
+        if tenant_id:
+            buckets += [
+                (f"{self.prefix}:tenant:{tenant_id}:rpm", self.limits["tenant"]["rpm"]),
+                (f"{self.prefix}:tenant:{tenant_id}:tpm", self.limits["tenant"]["tpm"]),
+            ]
+        # limite <= 0 desativa o bucket
+        return [(key, cap) for key, cap in buckets if cap and cap > 0]
+
+    def _try_acquire(self, tenant_id: str | None, tokens: int) -> float:
+        """Retorna 0 se obteve capacidade, senão os segundos a esperar."""
+        buckets = self._buckets(tenant_id)
+        if not buckets:
+            return 0.0
+        args = [len(buckets)]
+        for key, cap in buckets:
+            cost = 1 if key.endswith(":rpm") else tokens
+            args += [cap, cap / 60.0, cost]
+        try:
+            allowed, wait = self._acquire(keys=[k for k, _ in buckets], args=args)
+        except Exception as e:
+            logger.warning(f"⚠️ [rate_limiter] Redis indisponível, liberando chamada: {e}")
+            return 0.0
+        return 0.0 if int(allowed) == 1 else float(wait)
+
+    def _sleep_for(self, wait: float) -> float:
+        # jitter evita que workers acordem todos juntos
+        return min(wait, 5.0) + random.uniform(0, 0.25)
+
+    # ---------- API ----------
+    def acquire(self, tokens: int, tenant_id: str | None = None):
+        tenant_id = tenant_id or current_tenant()
+        deadline = time.monotonic() + self.max_wait
+        waited = False
+        while True:
+            wait = self._try_acquire(tenant_id, tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(
+                    f"Sem capacidade OpenAI após {self.max_wait:.0f}s (tenant={tenant_id})"
+                )
+            if not waited:
+                logger.info(f"⏳ [rate_limiter] Aguardando capacidade (~{wait:.1f}s, tenant={tenant_id})")
+                waited = True
+            time.sleep(self._sleep_for(wait))
+
+    async def aacquire(self, tokens: int, tenant_id: str | None = None):
+        tenant_id = tenant_id or current_tenant()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = await asyncio.to_thread(self._try_acquire, tenant_id, tokens)
+            if wait <= 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(
+                    f"Sem capacidade OpenAI após {self.max_wait:.0f}s (tenant={tenant_id})"
+                )
+            await asyncio.sleep(self._sleep_for(wait))
+
+    def reconcile(self, estimated: int, actual: int | None, tenant_id: str | None = None):
+        """Devolve (ou cobra) a diferença entre tokens estimados e usados."""
+        if actual is None or actual == estimated:
+            return
+        tenant_id = tenant_id or current_tenant()
+        delta = estimated - actual
+        for key, cap in self._buckets(tenant_id):
+            if key.endswith(":tpm"):
+                try:
+                    self._adjust(keys=[key], args=[cap, cap / 60.0, delta])
+                except Exception:
+                    pass
+
+    def release(self, tokens: int, tenant_id: str | None = None):
+        """Devolve os tokens reservados por uma chamada que falhou."""
+        self.reconcile(tokens, 0, tenant_id)
+
+    def fill_levels(self, tenant_id: str | None = None) -> dict:
+        """Nível atual de cada bucket (0..1) — métrica de capacidade livre."""
+        levels = {}
+        try:
+            sec, usec = self.redis.time()
+            now = sec + usec / 1_000_000
+            for key, cap in self._buckets(tenant_id):
+                tokens, ts = self.redis.hmget(key, "tokens", "ts")
+                tokens = float(tokens) if tokens is not None else float(cap)
+                ts = float(ts) if ts is not None else now
+                tokens = min(cap, tokens + max(0.0, now - ts) * cap / 60.0)
+                name = key[len(self.prefix) + 1:]
+                if tenant_id:
+                    name = name.replace(f"tenant:{tenant_id}:", "tenant:")
+                levels[name] = {
+                    "available": round(tokens, 2),
+                    "capacity": cap,
+                    "fill": round(tokens / cap, 4),
+                }
+        except Exception as e:
+            logger.warning(f"⚠️ [rate_limiter] Falha ao ler níveis: {e}")
+        return levels
+
+
+# ======================================================
+# 🏭 Instância por processo
+# ======================================================
+_limiter: Optional[RedisRateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> Optional[RedisRateLimiter]:
+    """Retorna o limitador configurado ou None se desativado."""
+    global _limiter
+    if not settings.OPENAI_RATE_LIMIT_ENABLED:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RedisRateLimiter(
+                    Redis.from_url(settings.REDIS_URL),
+                    global_rpm=settings.OPENAI_RPM_LIMIT,
+                    global_tpm=settings.OPENAI_TPM_LIMIT,
+                    tenant_rpm=settings.TENANT_RPM_LIMIT,
+                    tenant_tpm=settings.TENANT_TPM_LIMIT,
+                    max_wait=settings.OPENAI_RATE_LIMIT_MAX_WAIT,
+                )
+                logger.info("✅ [rate_limiter] Limitador OpenAI ativo (Redis)")
+    return _limiter
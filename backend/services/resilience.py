@@ -0,0 +1,433 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import openai
+from redis import Redis
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+# ======================================================
+# 🔍 Classificação de erros da OpenAI
+# ======================================================
+def _status_of(exc: Exception) -> Optional[int]:
+    return getattr(exc, "status_code", None)
+
+
+def is_throttle(exc: Exception) -> bool:
+    return isinstance(exc, openai.RateLimitError) or _status_of(exc) == 429
+
+
+def is_provider_failure(exc: Exception) -> bool:
+    """Falhas do provedor (5xx, timeout, conexão) — contam para o circuit breaker."""
+    if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError)):
+        return True
+    status = _status_of(exc)
+    return status is not None and status >= 500
+
+
+def is_retryable(exc: Exception) -> bool:
+    return is_throttle(exc) or is_provider_failure(exc) or _status_of(exc) in RETRYABLE_STATUS
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Lê Retry-After / retry-after-ms da resposta, se houver."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, hint: Optional[float] = None) -> float:
+    """Backoff exponencial com full jitter; respeita o Retry-After como piso."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if hint is not None:
+        delay = max(delay, min(hint, cap))
+    return delay
+
+
+# ======================================================
+# 🔌 Circuit breaker compartilhado (Redis)
+# ======================================================
+class CircuitBreaker:
+    """
+    closed → open após N falhas do provedor dentro da janela; enquanto
+    aberto, todos os workers aguardam (a fila fica pausada). Passado o
+    cooldown, um único worker faz a chamada de teste (half-open): sucesso
+    fecha o circuito, falha reabre.
+    """
+
+    def __init__(self, redis_conn: Redis, name: str, threshold: int, window: int, cooldown: float):
+        self.redis = redis_conn
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._failures = f"circuit:{name}:failures"
+        self._open_until = f"circuit:{name}:open_until"
+        self._probe = f"circuit:{name}:probe"
+
+    def _open_until_ts(self) -> Optional[float]:
+        value = self.redis.get(self._open_until)
+        return float(value) if value is not None else None
+
+    def state(self) -> str:
+        try:
+            open_until = self._open_until_ts()
+        except Exception:
+            return "unknown"
+        if open_until is None:
+            return "closed"
+        return "open" if time.time() < open_until else "half_open"
+
+    def check(self) -> tuple[float, bool]:
+        """
+        Retorna (segundos_para_esperar, é_probe). 0 = pode chamar.
+        Falhas do Redis liberam a chamada.
+        """
+        try:
+            open_until = self._open_until_ts()
+            if open_until is None:
+                return 0.0, False
+            now = time.time()
+            if now < open_until:
+                return open_until - now, False
+            if self.redis.set(self._probe, "1", nx=True, px=int(self.cooldown * 1000)):
+                return 0.0, True
+            return 1.0, False
+        except Exception as e:
+            logger.warning(f"⚠️ [circuit] Redis indisponível, liberando chamada: {e}")
+            return 0.0, False
+
+    def release_probe(self):
+        try:
+            self.redis.delete(self._probe)
+        except Exception:
+            pass
+
+    def record_success(self, probe: bool = False):
+        try:
+            pipe = self.redis.pipeline()
+            pipe.delete(self._failures)
+            if probe:
+                pipe.delete(self._open_until, self._probe)
+            pipe.execute()
+            if probe:
+                logger.info("✅ [circuit] Provedor respondeu, circuito fechado")
+        except Exception:
+            pass
+
+    def record_failure(self, probe: bool = False):
+        try:
+            if not probe:
+                pipe = self.redis.pipeline()
+                pipe.incr(self._failures)
+                pipe.expire(self._failures, self.window)
+                failures = pipe.execute()[0]
+                if failures < self.threshold:
+                    return
+            self.redis.set(self._open_until, time.time() + self.cooldown)
+            self.redis.delete(self._failures, self._probe)
+            logger.error(f"🔴 [circuit] Provedor indisponível, circuito aberto por {self.cooldown:.0f}s")
+        except Exception:
+            pass
+
+
+# ======================================================
+# 📈 Concorrência adaptativa (AIMD) compartilhada (Redis)
+# ======================================================
+_AIMD_ACQUIRE_LUA = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[2])
+if redis.call('ZCARD', KEYS[2]) < math.floor(limit) then
+  redis.call('ZADD', KEYS[2], now + tonumber(ARGV[3]), ARGV[4])
+  return 1
+end
+return 0
+"""
+
+_AIMD_ADJUST_LUA = """
+local limit = tonumber(redis.call('GET', KEYS[1]) or ARGV[1])
+if ARGV[2] == 'increase' then
+  limit = limit + 1 / limit
+else
+  limit = limit * tonumber(ARGV[3])
+end
+limit = math.max(tonumber(ARGV[4]), math.min(tonumber(ARGV[5]), limit))
+redis.call('SET', KEYS[1], tostring(limit))
+return tostring(limit)
+"""
+
+
+class AIMDConcurrency:
+    """
+    Limite global de chamadas simultâneas que cresce +1/limite a cada
+    sucesso com latência saudável e cai pela metade em throttling ou
+    latência alta. As vagas são leases com expiração (worker que morre
+    não prende capacidade).
+    """
+
+    def __init__(
+        self,
+        redis_conn: Redis,
+        name: str,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        latency_target: float,
+        decrease_factor: float,
+        lease_ttl: float = 300.0,
+    ):
+        self.redis = redis_conn
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.lease_ttl = lease_ttl
+        self._limit = f"aimd:{name}:limit"
+        self._leases = f"aimd:{name}:leases"
+        self._acquire = self.redis.register_script(_AIMD_ACQUIRE_LUA)
+        self._adjust = self.redis.register_script(_AIMD_ADJUST_LUA)
+
+    def try_acquire(self) -> Optional[str]:
+        """Retorna o id da lease ("" se o Redis falhou) ou None se não há vaga."""
+        lease = uuid.uuid4().hex
+        try:
+            ok = self._acquire(
+                keys=[self._limit, self._leases],
+                args=[time.time(), self.initial, self.lease_ttl, lease],
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ [aimd] Redis indisponível, liberando chamada: {e}")
+            return ""
+        return lease if int(ok) == 1 else None
+
+    def release(self, lease: str):
+        if not lease:
+            return
+        try:
+            self.redis.zrem(self._leases, lease)
+        except Exception:
+            pass
+
+    def _change(self, direction: str):
+        try:
+            limit = self._adjust(
+                keys=[self._limit],
+                args=[self.initial, direction, self.decrease_factor, self.minimum, self.maximum],
+            )
+            if direction == "decrease":
+                logger.warning(f"📉 [aimd] Concorrência OpenAI reduzida para {float(limit):.1f}")
+        except Exception:
+            pass
+
+    def on_success(self, latency: float):
+        self._change("increase" if latency <= self.latency_target else "decrease")
+
+    def on_throttle(self):
+        self._change("decrease")
+
+    def snapshot(self) -> dict:
+        try:
+            self.redis.zremrangebyscore(self._leases, "-inf", time.time())
+            limit = self.redis.get(self._limit)
+            return {
+                "limit": round(float(limit), 2) if limit is not None else self.initial,
+                "in_flight": self.redis.zcard(self._leases),
+            }
+        except Exception:
+            return {}
+
+
+# ======================================================
+# 🛡️ Camada de resiliência
+# ======================================================
+class Resilience:
+    """
+    Envolve uma chamada ao provedor com: circuit breaker → vaga AIMD →
+    chamada → retry com backoff exponencial + jitter (respeitando
+    Retry-After) para erros transitórios (429, 5xx, timeout, conexão).
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        concurrency: AIMDConcurrency,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        max_wait: float,
+    ):
+        self.breaker = breaker
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+
+    def _handle_error(self, exc: Exception, attempt: int, probe: bool) -> float:
+        """Registra o erro e devolve o atraso até a próxima tentativa (ou relança)."""
+        if is_throttle(exc):
+            self.concurrency.on_throttle()
+        if is_provider_failure(exc):
+            self.breaker.record_failure(probe=probe)
+        elif probe:
+            # 429/4xx no probe: o provedor está de pé
+            self.breaker.record_success(probe=True)
+
+        if not is_retryable(exc) or attempt >= self.max_retries:
+            raise exc
+
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after(exc))
+        logger.warning(
+            f"🔁 [resilience] Tentativa {attempt + 1}/{self.max_retries} falhou "
+            f"({type(exc).__name__}); nova tentativa em {delay:.1f}s"
+        )
+        return delay
+
+    # ---------- síncrono ----------
+    def _wait_for_slot(self) -> tuple[str, bool]:
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait, probe = self.breaker.check()
+            if wait <= 0:
+                lease = self.concurrency.try_acquire()
+                if lease is not None:
+                    return lease, probe
+                if probe:
+                    self.breaker.release_probe()
+                wait = 0.2 + random.uniform(0, 0.2)
+            if time.monotonic() + wait > deadline:
+                raise TimeoutError("OpenAI indisponível (circuito aberto / sem concorrência livre)")
+            time.sleep(min(wait, 5.0))
+
+    def call(self, fn: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            lease, probe = self._wait_for_slot()
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                self.concurrency.release(lease)
+                delay = self._handle_error(e, attempt, probe)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.concurrency.release(lease)
+            self.concurrency.on_success(time.monotonic() - started)
+            self.breaker.record_success(probe=probe)
+            return result
+
+    # ---------- assíncrono ----------
+    async def _await_slot(self) -> tuple[str, bool]:
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait, probe = await asyncio.to_thread(self.breaker.check)
+            if wait <= 0:
+                lease = await asyncio.to_thread(self.concurrency.try_acquire)
+                if lease is not None:
+                    return lease, probe
+                if probe:
+                    await asyncio.to_thread(self.breaker.release_probe)
+                wait = 0.2 + random.uniform(0, 0.2)
+            if time.monotonic() + wait > deadline:
+                raise TimeoutError("OpenAI indisponível (circuito aberto / sem concorrência livre)")
+            await asyncio.sleep(min(wait, 5.0))
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            lease, probe = await self._await_slot()
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                await asyncio.to_thread(self.concurrency.release, lease)
+                delay = await asyncio.to_thread(self._handle_error, e, attempt, probe)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            latency = time.monotonic() - started
+            await asyncio.to_thread(self.concurrency.release, lease)
+            await asyncio.to_thread(self.concurrency.on_success, latency)
+            await asyncio.to_thread(self.breaker.record_success, probe)
+            return result
+
+    def snapshot(self) -> dict:
+        return {
+            "circuit": self.breaker.state(),
+            "concurrency": self.concurrency.snapshot(),
+        }
+
+
+# ======================================================
+# 🏭 Instância por processo
+# ======================================================
+_resilience: Optional[Resilience] = None
+_resilience_lock = threading.Lock()
+
+
+def get_resilience() -> Optional[Resilience]:
+    global _resilience
+    if not settings.OPENAI_RESILIENCE_ENABLED:
+        return None
+    if _resilience is None:
+        with _resilience_lock:
+            if _resilience is None:
+                redis_conn = Redis.from_url(settings.REDIS_URL)
+                _resilience = Resilience(
+                    breaker=CircuitBreaker(
+                        redis_conn,
+                        "openai",
+                        threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                        window=settings.CIRCUIT_FAILURE_WINDOW,
+                        cooldown=settings.CIRCUIT_COOLDOWN,
+                    ),
+                    concurrency=AIMDConcurrency(
+                        redis_conn,
+                        "openai",
+                        initial=settings.AIMD_INITIAL_CONCURRENCY,
+                        minimum=settings.AIMD_MIN_CONCURRENCY,
+                        maximum=settings.AIMD_MAX_CONCURRENCY,
+                        latency_target=settings.AIMD_LATENCY_TARGET,
+                        decrease_factor=settings.AIMD_DECREASE_FACTOR,
+                    ),
+                    max_retries=settings.OPENAI_MAX_RETRIES,
+                    backoff_base=settings.OPENAI_BACKOFF_BASE,
+                    backoff_max=settings.OPENAI_BACKOFF_MAX,
+                    max_wait=settings.OPENAI_RATE_LIMIT_MAX_WAIT,
+                )
+                logger.info("✅ [resilience] Retry/circuit breaker/AIMD ativos")
+    return _resilience
@@ -0,0 +1,255 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+import zipfile
+from dataclasses import dataclass
+from typing import BinaryIO, Iterator, Optional
+from urllib.parse import urlparse
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+
+
+class BlobTooLarge(Exception):
+    """O arquivo passou de settings.UPLOAD_MAX_BYTES."""
+
+
+@dataclass
+class StoredBlob:
+    ref: str            # referência persistida em Resume.file_url (local://... ou s3://...)
+    size: int
+    sha256: str
+
+
+class _HashingReader:
+    """Lê o arquivo em blocos calculando SHA-256 e tamanho no caminho."""
+
+    def __init__(self, fileobj: BinaryIO, max_bytes: int | None):
+        self._f = fileobj
+        self._max = max_bytes
+        self.size = 0
+        self.hasher = hashlib.sha256()
+
+    def read(self, n: int = -1) -> bytes:
+        chunk = self._f.read(CHUNK_SIZE if n is None or n < 0 else n)
+        self.size += len(chunk)
+        if self._max and self.size > self._max:
+            raise BlobTooLarge(f"Arquivo maior que {self._max} bytes")
+        self.hasher.update(chunk)
+        return chunk
+
+
+def new_blob_key(tenant_id: str, suffix: str = ".pdf") -> str:
+    return f"resumes/{tenant_id}/{uuid.uuid4().hex}{suffix}"
+
+
+# ======================================================
+# 🗂️ Backend em disco
+# ======================================================
+class LocalBlobStore:
+    """
+    Grava em BLOB_STORE_PATH. A API e os workers precisam enxergar o mesmo
+    diretório (volume compartilhado); fora disso, use o backend s3.
+    """
+    scheme = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Chave inválida: {key}")
+        return path
+
+    def save_fileobj(self, key: str, fileobj: BinaryIO, max_bytes: int | None = None) -> StoredBlob:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.part-{uuid.uuid4().hex[:8]}"
+        reader = _HashingReader(fileobj, max_bytes)
+        try:
+            with open(tmp, "wb") as out:
+                while True:
+                    chunk = reader.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return StoredBlob(ref=f"{self.scheme}://{key}", size=reader.size, sha256=reader.hasher.hexdigest())
+
+    def read_bytes(self, key: str) -> bytes:
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+# ======================================================
+# ☁️ Backend S3 compatível (AWS, MinIO, Supabase Storage S3...)
+# ======================================================
+class S3BlobStore:
+    scheme = "s3"
+
+    def __init__(self, bucket: str, endpoint_url: str | None = None, region: str | None = None,
+                 access_key: str | None = None, secret_key: str | None = None):
+        try:
+            import boto3
+        except ImportError as e:
+            raise RuntimeError("BLOB_STORE_BACKEND=s3 requer o pacote boto3") from e
+
+        self.bucket = bucket
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url or None,
+            region_name=region or None,
+            aws_access_key_id=access_key or None,
+            aws_secret_access_key=secret_key or None,
+        )
+
+    def save_fileobj(self, key: str, fileobj: BinaryIO, max_bytes: int | None = None) -> StoredBlob:
+        reader = _HashingReader(fileobj, max_bytes)
+        # upload_fileobj lê em blocos e usa multipart para arquivos grandes
+        self.client.upload_fileobj(reader, self.bucket, key, ExtraArgs={"ContentType": "application/pdf"})
+        return StoredBlob(
+            ref=f"{self.scheme}://{self.bucket}/{key}",
+            size=reader.size,
+            sha256=reader.hasher.hexdigest(),
+        )
+
+    def read_bytes(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+
+# ======================================================
+# 🏭 Instância por processo + resolução de referências
+# ======================================================
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_blob_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = settings.BLOB_STORE_BACKEND.lower()
+                if backend == "local":
+                    _store = LocalBlobStore(settings.BLOB_STORE_PATH)
+                elif backend == "s3":
+                    _store = S3BlobStore(
+                        bucket=settings.S3_BUCKET,
+                        endpoint_url=settings.S3_ENDPOINT_URL,
+                        region=settings.S3_REGION,
+                        access_key=settings.S3_ACCESS_KEY_ID,
+                        secret_key=settings.S3_SECRET_ACCESS_KEY,
+                    )
+                else:
+                    raise ValueError(f"BLOB_STORE_BACKEND inválido: {backend}")
+                logger.info(f"✅ [storage] Blob store ativo ({backend})")
+    return _store
+
+
+def _split_ref(ref: str) -> tuple[str, str]:
+    """'local://a/b.pdf' → ('local', 'a/b.pdf'); 's3://bucket/a.pdf' → ('s3', 'a.pdf')."""
+    parsed = urlparse(ref)
+    if parsed.scheme == "local":
+        return "local", f"{parsed.netloc}{parsed.path}"
+    if parsed.scheme == "s3":
+        return "s3", parsed.path.lstrip("/")
+    raise ValueError(f"Referência de arquivo não suportada: {ref}")
+
+
+def read_blob(ref: str) -> bytes:
+    scheme, key = _split_ref(ref)
+    store = get_blob_store()
+    if store.scheme != scheme:
+        raise ValueError(f"Referência {ref} não pertence ao backend atual ({store.scheme})")
+    return store.read_bytes(key)
+
+
+def save_upload(tenant_id: str, fileobj: BinaryIO, max_bytes: Optional[int] = None) -> StoredBlob:
+    """Grava o arquivo enviado em blocos e devolve referência, tamanho e SHA-256."""
+    store = get_blob_store()
+    max_bytes = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    blob = store.save_fileobj(new_blob_key(tenant_id), fileobj, max_bytes=max_bytes)
+    logger.info(f"💾 [storage] {blob.ref} gravado ({blob.size} bytes)")
+    return blob
+
+
+# ======================================================
+# 📦 Envio em lote (vários PDFs e/ou ZIPs)
+# ======================================================
+def _is_pdf_name(name: str) -> bool:
+    base = os.path.basename(name)
+    return base.lower().endswith(".pdf") and not base.startswith(".") and "__MACOSX" not in name
+
+
+def iter_pdf_files(filename: str, fileobj: BinaryIO) -> Iterator[tuple[str, BinaryIO]]:
+    """
+    Gera (nome, arquivo) para cada PDF: o próprio arquivo ou cada membro
+    .pdf de um ZIP, descompactado em streaming (um membro por vez).
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(fileobj) as zf:
+            for info in zf.infolist():
+                if info.is_dir() or not _is_pdf_name(info.filename):
+                    continue
+                with zf.open(info) as member:
+                    yield os.path.basename(info.filename), member
+    else:
+        yield filename, fileobj
+
+
+def save_bulk_uploads(tenant_id: str, uploads: list[tuple[str, BinaryIO]], max_files: int | None = None) -> dict:
+    """
+    Grava todos os PDFs enviados (soltos ou dentro de ZIPs).
+
+    Returns:
+        dict: {"stored": [{"filename", "file_ref", "content_hash", "size"}],
+               "rejected": [{"filename", "reason"}]}
+    """
+    max_files = max_files or settings.BULK_UPLOAD_MAX_FILES
+    stored, rejected = [], []
+
+    for filename, fileobj in uploads:
+        filename = filename or "arquivo"
+        if not (filename.lower().endswith(".pdf") or filename.lower().endswith(".zip")):
+            rejected.append({"filename": filename, "reason": "Formato não suportado (envie PDF ou ZIP)"})
+            continue
+        try:
+            for pdf_name, pdf_file in iter_pdf_files(filename, fileobj):
+                if len(stored) >= max_files:
+                    rejected.append({"filename": pdf_name, "reason": f"Limite de {max_files} arquivos por envio"})
+                    continue
+                try:
+                    blob = save_upload(tenant_id, pdf_file)
+                except BlobTooLarge as e:
+                    rejected.append({"filename": pdf_name, "reason": str(e)})
+                    continue
+                stored.append({
+                    "filename": pdf_name,
+                    "file_ref": blob.ref,
+                    "content_hash": blob.sha256,
+                    "size": blob.size,
+                })
+        except zipfile.BadZipFile:
+            rejected.append({"filename": filename, "reason": "ZIP inválido"})
+
+    return {"stored": stored, "rejected": rejected}
@@ -0,0 +1,87 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+
+from backend.config import settings
+
+# Palavras muito frequentes por idioma: currículos legíveis têm várias delas;
+# texto de fonte mal codificada ("Ã©ÂÂ...", glifos trocados) quase nenhuma
+_COMMON_WORDS = {
+    "pt": {
+        "de", "da", "do", "das", "dos", "em", "no", "na", "para", "com", "por",
+        "que", "uma", "um", "os", "as", "ao", "experiencia", "empresa", "atual",
+        "desenvolvimento", "formacao", "curso", "ensino", "superior", "ate",
+    },
+    "en": {
+        "the", "and", "of", "to", "in", "for", "with", "on", "at", "an", "by",
+        "experience", "education", "skills", "university", "work", "present",
+        "company", "development", "management", "project", "team",
+    },
+    "es": {
+        "el", "la", "los", "las", "del", "en", "con", "para", "por", "que", "una",
+        "experiencia", "empresa", "formacion", "universidad", "desarrollo",
+    },
+}
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+# ======================================================
+# 🔎 Qualidade do texto extraído
+# ======================================================
+@dataclass
+class TextQuality:
+    status: str                 # "ok", "needs_ocr" (imagem, sem texto) ou "unreadable" (texto ilegível)
+    chars_per_page: float
+    printable_ratio: float
+    language: str | None        # idioma provável ("pt", "en", "es") ou None
+    reason: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+def _printable_ratio(text: str) -> float:
+    """Fração dos caracteres (sem espaços) que são letras, números ou pontuação."""
+    chars = [c for c in text if not c.isspace()]
+    if not chars:
+        return 0.0
+    good = sum(1 for c in chars if unicodedata.category(c)[0] in "LNPS" and c != "�")
+    return good / len(chars)
+
+
+def detect_language(text: str) -> tuple[str | None, float]:
+    """Idioma com mais palavras frequentes e a fração de palavras que elas representam."""
+    text = unicodedata.normalize("NFKD", text[:20000].lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    words = _WORD_RE.findall(text)
+    if not words:
+        return None, 0.0
+    hits = {lang: sum(1 for w in words if w in common) for lang, common in _COMMON_WORDS.items()}
+    lang = max(hits, key=hits.get)
+    ratio = hits[lang] / len(words)
+    return (lang if hits[lang] else None), ratio
+
+
+def classify_text(text: str, pages: int) -> TextQuality:
+    """
+    Classifica o texto extraído de um PDF antes de qualquer chamada à IA:
+    - needs_ocr: poucos caracteres por página (PDF escaneado / só imagem)
+    - unreadable: há texto, mas com muitos caracteres inválidos ou sem
+      palavras comuns de nenhum idioma conhecido (fonte sem mapa Unicode)
+    """
+    stripped = (text or "").strip()
+    chars_per_page = len(stripped) / max(pages, 1)
+    printable = _printable_ratio(stripped)
+    language, common_ratio = detect_language(stripped)
+
+    def result(status: str, reason: str | None = None) -> TextQuality:
+        return TextQuality(status, round(chars_per_page, 1), round(printable, 3), language, reason)
+
+    if chars_per_page < settings.TEXT_MIN_CHARS_PER_PAGE:
+        return result("needs_ocr", f"{chars_per_page:.0f} caracteres por página")
+    if printable < settings.TEXT_MIN_PRINTABLE_RATIO:
+        return result("unreadable", f"{printable:.0%} de caracteres válidos")
+    if common_ratio < settings.TEXT_MIN_COMMON_WORD_RATIO:
+        return result("unreadable", "idioma não reconhecido")
+    return result("ok")
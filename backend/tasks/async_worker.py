@@ -0,0 +1,425 @@
+import asyncio
+import argparse
+import contextvars
+import functools
+import logging
+import signal
+import socket
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from redis import Redis
+from rq import Queue
+from rq.defaults import DEFAULT_JOB_MONITORING_INTERVAL, DEFAULT_MAINTENANCE_TASK_INTERVAL
+from rq.exceptions import NoSuchJobError
+from rq.executions import Execution
+from rq.job import Job, JobStatus
+from rq.registry import clean_registries
+
+from backend.config import settings
+from backend.tasks.fair_queue import FairScheduler, plan_weight
+from backend.tasks.stages import PIPELINES, DEFAULT_STAGE_TIMEOUT, PARSE_QUEUE, LLM_QUEUE, WORKER_QUEUES
+from backend.tasks.pools import (
+    StagePool,
+    init_parse_pool,
+    shutdown_parse_pool,
+    parse_pool_stats,
+    publish_utilisation,
+    clear_utilisation,
+)
+import backend.tasks.tasks  # noqa: F401  registra RESUME_PIPELINE em PIPELINES
+
+logger = logging.getLogger(__name__)
+
+# Cada job em andamento tem uma Execution no StartedJobRegistry, com
+# validade renovada a cada intervalo (como o Worker do RQ): se o processo
+# morrer, a limpeza de registros do RQ a encontra vencida e move o job
+# para os falhos
+HEARTBEAT_TTL = DEFAULT_JOB_MONITORING_INTERVAL + 60
+
+
+# ======================================================
+# ⚡ Worker assíncrono (muitos jobs de I/O por processo)
+# ======================================================
+class AsyncWorker:
+    """
+    Executa até `concurrency` jobs ao mesmo tempo em um único event loop,
+    sem fork por job. Jobs de pipelines com etapas async (ex.: análise com
+    AsyncOpenAIClient) esperam a OpenAI sem ocupar thread; o resto (banco,
+    jobs RQ comuns) roda em um pool de threads limitado, dividindo o pool
+    de conexões do SQLAlchemy e um único cliente HTTP da OpenAI. Os jobs
+    da fila parse, que esperam o pool de processos da extração, rodam em
+    threads próprias (uma por slot da fila).
+
+    Cada fila tem o seu limite de jobs simultâneos (`limits`): a fila
+    parse é dimensionada pelo pool de processos que extrai os PDFs (CPU,
+    fora da GIL deste processo) e a fila llm pela concorrência de chamadas
+    à OpenAI. A passagem entre elas é a própria fila no Redis, limitada:
+    com mais de STAGE_HANDOFF_MAX jobs esperando na fila seguinte, a
+    anterior deixa de ser consumida. A utilização de cada pool é publicada
+    no Redis a cada STAGE_METRICS_INTERVAL (ver /metrics/queues).
+
+    Consome as mesmas filas do FairWorker (sub-filas por tenant primeiro,
+    depois as filas base). SIGTERM/SIGINT param a retirada de jobs e esperam
+    os em andamento por até `drain_timeout`; os que não terminarem voltam
+    para o início da fila de origem. Um segundo sinal encerra na hora.
+
+    Os jobs em andamento ficam no StartedJobRegistry da fila com heartbeat,
+    e o worker faz a limpeza periódica dos registros das filas que consome
+    (inclusive sub-filas por tenant), como os workers do RQ.
+    """
+
+    def __init__(
+        self,
+        queues: list[str],
+        connection: Redis,
+        concurrency: int | None = None,
+        threads: int | None = None,
+        drain_timeout: float | None = None,
+        limits: dict[str, int] | None = None,
+    ):
+        self.queue_names = queues
+        self.connection = connection
+        self.concurrency = concurrency or settings.ASYNC_WORKER_CONCURRENCY
+        self.threads = threads or settings.ASYNC_WORKER_THREADS
+        self.drain_timeout = settings.ASYNC_WORKER_DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        self.scheduler = FairScheduler(connection, default_weight=plan_weight("free"))
+        self.name = f"async-{socket.gethostname()}-{os.getpid()}"
+        self._queues = {name: Queue(name, connection=connection) for name in queues}
+        limits = {**self._default_limits(), **(limits or {})}
+        self.pools = {name: StagePool(name, limits.get(name, self.concurrency)) for name in queues}
+        # a fila parse tem threads próprias, uma por slot: cada job fica
+        # bloqueado esperando o processo de extração, e no pool padrão
+        # tomaria as threads da fila llm, da retirada de jobs e do heartbeat
+        self._executors: dict[str, ThreadPoolExecutor] = {}
+        if PARSE_QUEUE in self.pools:
+            self._executors[PARSE_QUEUE] = ThreadPoolExecutor(
+                max_workers=self.pools[PARSE_QUEUE].capacity, thread_name_prefix="async-worker-parse"
+            )
+        # fila -> fila seguinte do pipeline (passagem limitada por STAGE_HANDOFF_MAX)
+        self.downstream = {a: b for p in PIPELINES.values() for a, b in p.handoffs()}
+        self._backlog: dict[str, tuple[float, int]] = {}
+        self._inflight: dict[asyncio.Task, tuple[Job, Queue, str, Optional[str]]] = {}
+        self._executions: dict[str, tuple[Job, Execution]] = {}
+        self._stopping: Optional[asyncio.Event] = None
+        self._signals = 0
+
+    @staticmethod
+    def _default_limits() -> dict[str, int]:
+        parse = settings.PARSE_QUEUE_CONCURRENCY or 2 * (settings.PARSE_POOL_PROCESSES or os.cpu_count() or 1)
+        return {PARSE_QUEUE: parse, LLM_QUEUE: settings.LLM_QUEUE_CONCURRENCY}
+
+    # ---------- retirada de jobs (síncrono, roda em thread) ----------
+    def _throttled(self, base: str) -> bool:
+        """
+        A fila seguinte já tem STAGE_HANDOFF_MAX jobs esperando. O Redis é
+        consultado no máximo a cada 1s; entre consultas, cada job retirado
+        de `base` conta como um a mais na fila seguinte.
+        """
+        down = self.downstream.get(base)
+        if down is None:
+            return False
+        checked, backlog = self._backlog.get(down, (0.0, 0))
+        if time.monotonic() - checked > 1:
+            backlog = self.scheduler.backlog(down)
+            self._backlog[down] = (time.monotonic(), backlog)
+        return backlog >= settings.STAGE_HANDOFF_MAX
+
+    def _pick(self, base: str) -> Optional[tuple[Job, Queue, str, Optional[str]]]:
+        """Próximo job da fila base: sub-filas por tenant primeiro, depois a própria fila."""
+        while True:
+            picked = self.scheduler.next_job(base)
+            if picked is None:
+                break
+            tenant_id, job_id = picked
+            try:
+                job = Job.fetch(job_id, connection=self.connection)
+            except NoSuchJobError:
+                continue
+            if job.enqueued_at:
+                waited = (datetime.now(timezone.utc) - _aware(job.enqueued_at)).total_seconds()
+                self.scheduler.record_wait(base, tenant_id, max(0.0, waited))
+            queue = Queue(self.scheduler.queue_name(base, tenant_id), connection=self.connection)
+            return job, queue, base, tenant_id
+
+        queue = self._queues[base]
+        while True:
+            job_id = self.connection.lpop(queue.key)
+            if job_id is None:
+                return None
+            try:
+                return Job.fetch(job_id.decode(), connection=self.connection), queue, base, None
+            except NoSuchJobError:
+                continue
+
+    def _dequeue(self, bases: list[str]) -> Optional[tuple[Job, Queue, str, Optional[str]]]:
+        """(job, fila, fila base, tenant) do próximo job das `bases`, ou None se vazias."""
+        for base in bases:
+            if self._throttled(base):
+                continue
+            picked = self._pick(base)
+            if picked is None:
+                # fila vazia: quem passa jobs para ela não precisa esperar a próxima consulta
+                self._backlog[base] = (time.monotonic(), 0)
+                continue
+            down = self.downstream.get(base)
+            if down in self._backlog:
+                checked, backlog = self._backlog[down]
+                self._backlog[down] = (checked, backlog + 1)
+            return picked
+        return None
+
+    # ---------- ciclo de vida do job no Redis ----------
+    def _mark_started(self, job: Job) -> Execution:
+        job.started_at = datetime.now(timezone.utc)
+        job.worker_name = self.name
+        with self.connection.pipeline() as pipe:
+            job.set_status(JobStatus.STARTED, pipeline=pipe)
+            job.save(pipeline=pipe, include_meta=False)
+            execution = Execution.create(job, HEARTBEAT_TTL, pipe, worker_name=self.name)
+            pipe.execute()
+        self._executions[job.id] = (job, execution)
+        return execution
+
+    def _end_execution(self, job: Job, execution: Execution, pipe):
+        execution.delete(job, pipeline=pipe)
+        self._executions.pop(job.id, None)
+
+    def _mark_finished(self, job: Job, queue: Queue, execution: Execution):
+        job.ended_at = datetime.now(timezone.utc)
+        with self.connection.pipeline() as pipe:
+            job.set_status(JobStatus.FINISHED, pipeline=pipe)
+            job.save(pipeline=pipe, include_meta=False)
+            self._end_execution(job, execution, pipe)
+            ttl = job.result_ttl if job.result_ttl is not None else 500
+            if ttl != 0:
+                queue.finished_job_registry.add(job, ttl, pipeline=pipe)
+            pipe.execute()
+
+    def _mark_failed(self, job: Job, queue: Queue, execution: Execution, exc_string: str):
+        job.ended_at = datetime.now(timezone.utc)
+        with self.connection.pipeline() as pipe:
+            job.set_status(JobStatus.FAILED, pipeline=pipe)
+            self._end_execution(job, execution, pipe)
+            queue.failed_job_registry.add(job, ttl=job.failure_ttl, exc_string=exc_string, pipeline=pipe)
+            pipe.execute()
+
+    def _requeue(self, job: Job, queue: Queue, execution: Execution, base: str, tenant_id: Optional[str]):
+        """Devolve ao início da fila um job interrompido pelo encerramento."""
+        with self.connection.pipeline() as pipe:
+            self._end_execution(job, execution, pipe)
+            pipe.execute()
+        queue.enqueue_job(job, at_front=True)
+        if tenant_id:
+            self.scheduler.register(base, tenant_id)
+
+    # ---------- execução ----------
+    async def _perform(self, job: Job, base: str):
+        executor = self._executors.get(base)
+        pipeline = PIPELINES.get(job.func_name)
+        if pipeline is not None:
+            return await pipeline.arun(*job.args, executor=executor, **job.kwargs)
+        call = functools.partial(contextvars.copy_context().run, job.perform)
+        return await asyncio.get_running_loop().run_in_executor(executor, call)
+
+    async def _execute(self, job: Job, queue: Queue, base: str, tenant_id: Optional[str]) -> bool:
+        """Executa o job e registra o resultado; retorna se terminou sem erro."""
+        execution = await asyncio.to_thread(self._mark_started, job)
+        timeout = job.timeout or DEFAULT_STAGE_TIMEOUT
+        try:
+            await asyncio.wait_for(self._perform(job, base), timeout=timeout if timeout > 0 else None)
+        except asyncio.CancelledError:
+            logger.warning(f"↩️ [async_worker] {job.id} interrompido no encerramento, devolvido à fila {queue.name}")
+            await asyncio.shield(asyncio.to_thread(self._requeue, job, queue, execution, base, tenant_id))
+            raise
+        except asyncio.TimeoutError:
+            # só a corrotina é cancelada: uma etapa já em thread termina sozinha,
+            # por isso a etapa persist é idempotente (ver tasks.persist_stage)
+            logger.error(f"⏱️ [async_worker] {job.id} excedeu {timeout}s")
+            await asyncio.to_thread(self._mark_failed, job, queue, execution, f"JobTimeoutException: {timeout}s")
+        except Exception:
+            exc_string = traceback.format_exc()
+            logger.error(f"❌ [async_worker] {job.id} falhou: {exc_string.splitlines()[-1]}")
+            await asyncio.to_thread(self._mark_failed, job, queue, execution, exc_string)
+        else:
+            await asyncio.to_thread(self._mark_finished, job, queue, execution)
+            return True
+        return False
+
+    def _job_done(self, task: asyncio.Task):
+        _, _, base, _ = self._inflight.pop(task)
+        ok = not task.cancelled() and task.exception() is None and task.result()
+        self.pools[base].release(ok)
+
+    # ---------- heartbeat e limpeza de registros ----------
+    def _heartbeat(self):
+        """Renova a validade das execuções em andamento no StartedJobRegistry."""
+        running = list(self._executions.values())
+        if not running:
+            return
+        with self.connection.pipeline() as pipe:
+            for job, execution in running:
+                execution.heartbeat(job.started_job_registry, HEARTBEAT_TTL, pipeline=pipe)
+            pipe.execute()
+
+    def _clean_registries(self):
+        """
+        Limpeza de registros do RQ nas filas consumidas e nas sub-filas por
+        tenant: jobs de workers mortos (heartbeat vencido) vão para falhos.
+        """
+        for base in self.queue_names:
+            tenants = [None] + self.scheduler.known_tenants(base)
+            for tenant_id in tenants:
+                name = self.scheduler.queue_name(base, tenant_id) if tenant_id else base
+                queue = Queue(name, connection=self.connection)
+                if queue.acquire_maintenance_lock():
+                    clean_registries(queue)
+                    queue.release_maintenance_lock()
+                if tenant_id and queue.count:
+                    # ex.: job abandonado com retry, recolocado na sub-fila
+                    self.scheduler.register(base, tenant_id)
+
+    async def _maintain(self):
+        last_clean = 0.0
+        while True:
+            try:
+                await asyncio.to_thread(self._heartbeat)
+                if time.monotonic() - last_clean >= DEFAULT_MAINTENANCE_TASK_INTERVAL:
+                    last_clean = time.monotonic()
+                    await asyncio.to_thread(self._clean_registries)
+            except Exception as e:
+                logger.warning(f"⚠️ [async_worker] Falha no heartbeat/limpeza de registros: {e}")
+            await asyncio.sleep(DEFAULT_JOB_MONITORING_INTERVAL)
+
+    # ---------- utilização dos pools ----------
+    def _publish(self):
+        pools = list(self.pools.values())
+        if parse_pool_stats():
+            pools.append(parse_pool_stats())
+        ttl = int(settings.STAGE_METRICS_INTERVAL * 3) + 1
+        publish_utilisation(self.connection, self.name, pools, ttl)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(settings.STAGE_METRICS_INTERVAL)
+            try:
+                await asyncio.to_thread(self._publish)
+            except Exception as e:
+                logger.warning(f"⚠️ [async_worker] Falha ao publicar utilização dos pools: {e}")
+
+    # ---------- laço principal ----------
+    def request_stop(self):
+        self._signals += 1
+        if self._signals == 1:
+            logger.info(
+                f"🛑 [async_worker] Encerrando: aguardando {len(self._inflight)} jobs "
+                f"(até {self.drain_timeout:.0f}s)"
+            )
+            self._stopping.set()
+        else:
+            logger.warning("🛑 [async_worker] Segundo sinal: interrompendo jobs em andamento")
+            for task in list(self._inflight):
+                task.cancel()
+
+    async def run(self, burst: bool = False):
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="async-worker"))
+        self._stopping = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+
+        if PARSE_QUEUE in self.pools:
+            await asyncio.to_thread(init_parse_pool)
+        logger.info(
+            f"🚀 [async_worker] {self.name} ouvindo {self.queue_names} "
+            f"(limites={ {name: p.capacity for name, p in self.pools.items()} }, threads={self.threads})"
+        )
+
+        reporter = asyncio.create_task(self._report())
+        maintenance = asyncio.create_task(self._maintain())
+        stop = asyncio.ensure_future(self._stopping.wait())
+        waiter = None
+        while not self._stopping.is_set():
+            ready = [name for name in self.queue_names if self.pools[name].free > 0]
+            picked = await asyncio.to_thread(self._dequeue, ready) if ready else None
+            if picked is None:
+                if burst:
+                    if not self._inflight:
+                        break
+                    # burst: só espera os jobs em andamento (podem enfileirar continuações)
+                    await asyncio.wait(list(self._inflight), return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                # acorda com o fim de um job, o sinal e, havendo slot livre,
+                # com um enfileiramento ou o timeout (ex.: fila seguinte esvaziou)
+                wait_on = [stop, *self._inflight]
+                if ready:
+                    if waiter is None or waiter.done():
+                        waiter = asyncio.ensure_future(asyncio.to_thread(
+                            self.scheduler.wait, self.queue_names, settings.FAIR_QUEUE_POLL_SECONDS
+                        ))
+                    wait_on.append(waiter)
+                await asyncio.wait(wait_on, return_when=asyncio.FIRST_COMPLETED)
+                continue
+
+            job, queue, base, tenant_id = picked
+            self.pools[base].acquire()
+            task = asyncio.create_task(self._execute(job, queue, base, tenant_id))
+            self._inflight[task] = picked
+            task.add_done_callback(self._job_done)
+
+        stop.cancel()
+        reporter.cancel()
+        maintenance.cancel()
+        await self._drain()
+
+    async def _drain(self):
+        if self._inflight:
+            done, pending = await asyncio.wait(list(self._inflight), timeout=self.drain_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        from backend.tasks.tasks import _async_ai
+        if _async_ai is not None:
+            await _async_ai.aclose()
+        await asyncio.to_thread(shutdown_parse_pool)
+        for executor in self._executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        try:
+            await asyncio.to_thread(clear_utilisation, self.connection, self.name)
+        except Exception:
+            pass
+        logger.info(f"✅ [async_worker] {self.name} encerrado")
+
+
+def _aware(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker assíncrono (N jobs de I/O por processo)")
+    parser.add_argument("queues", nargs="*", default=WORKER_QUEUES)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--burst", action="store_true", help="encerra quando as filas esvaziarem")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    worker = AsyncWorker(
+        args.queues,
+        Redis.from_url(settings.REDIS_URL),
+        concurrency=args.concurrency,
+        threads=args.threads,
+    )
+    asyncio.run(worker.run(burst=args.burst))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark do overhead por job: fork por job (RQ Worker) x processo
+pré-aquecido (PrewarmedWorker).
+
+    python -m backend.tasks.bench_worker --jobs 200
+    python -m backend.tasks.bench_worker --jobs 50 --db-url "$SUPABASE_DB_URL" --openai
+
+Cada "job" cria o cliente OpenAI, extrai o texto de um PDF de 2 páginas
+e, opcionalmente, faz SELECT 1 no Postgres (--db-url) e uma chamada leve
+à OpenAI (--openai, models.list). Modos:
+
+    fork-cold       fork por job e imports no filho (rq worker padrão: o
+                    work horse importa backend.tasks.tasks a cada job)
+    fork-preloaded  fork por job com imports feitos no pai (conexões
+                    continuam sendo abertas a cada job)
+    in-process      tudo importado/conectado uma vez (PrewarmedWorker)
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+
+def _sample_pdf() -> bytes:
+    """Gera o PDF de teste em um processo filho, sem importar fitz neste processo."""
+    r, w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        import fitz
+        doc = fitz.open()
+        for i in range(2):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"Página {i + 1}\nExperiência profissional\nPython, SQL, FastAPI\n" * 10)
+        with os.fdopen(w, "wb") as out:
+            out.write(doc.tobytes())
+        os._exit(0)
+    os.close(w)
+    with os.fdopen(r, "rb") as inp:
+        data = inp.read()
+    os.waitpid(pid, 0)
+    return data
+
+
+class _Job:
+    """Estado que o worker pré-aquecido mantém entre jobs."""
+
+    def __init__(self, pdf: bytes, db_url: str | None, openai: bool):
+        import fitz  # noqa: F401
+        from openai import OpenAI
+        self.pdf = pdf
+        self.engine = None
+        # o cliente é sempre criado (como o `ai = OpenAIClient()` de tasks.py);
+        # a chamada de rede só acontece com --openai
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY") or "bench")
+        self.call_openai = openai
+        if db_url:
+            from sqlalchemy import create_engine
+            self.engine = create_engine(db_url)
+
+    def run(self):
+        import io
+        import fitz
+        with fitz.open(stream=io.BytesIO(self.pdf), filetype="pdf") as doc:
+            "".join(p.get_text() for p in doc)
+        if self.engine is not None:
+            from sqlalchemy import text
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        if self.call_openai:
+            self.client.models.list()
+
+
+def _fork_job(pdf: bytes, db_url, openai) -> None:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            _Job(pdf, db_url, openai).run()
+        except Exception:
+            code = 1
+        os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    if status != 0:
+        raise RuntimeError("job falhou no processo filho")
+
+
+def bench(mode: str, jobs: int, db_url, openai) -> list[float]:
+    """Roda em um interpretador novo (ver main), então fork-cold começa sem imports."""
+    pdf = _sample_pdf()
+    if mode == "fork-preloaded":
+        _Job(pdf, db_url, openai)  # só importa/configura no pai
+    warm = _Job(pdf, db_url, openai) if mode == "in-process" else None
+    if warm is not None:
+        warm.run()  # abre as conexões uma vez (aquecimento)
+
+    times = []
+    for _ in range(jobs):
+        t = time.perf_counter()
+        if warm is not None:
+            warm.run()
+        else:
+            _fork_job(pdf, db_url, openai)
+        times.append((time.perf_counter() - t) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100)
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--openai", action="store_true")
+    parser.add_argument("--modes", default="fork-cold,fork-preloaded,in-process")
+    parser.add_argument("--run-mode", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_mode:
+        print(json.dumps(bench(args.run_mode, args.jobs, args.db_url, args.openai)))
+        return
+
+    results = {}
+    for mode in args.modes.split(","):
+        cmd = [sys.executable, "-m", "backend.tasks.bench_worker", "--run-mode", mode, "--jobs", str(args.jobs)]
+        if args.db_url:
+            cmd += ["--db-url", args.db_url]
+        if args.openai:
+            cmd.append("--openai")
+        out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    base = statistics.median(results["in-process"]) if "in-process" in results else None
+    print(f"{'modo':<16}{'p50 ms':>10}{'p95 ms':>10}{'overhead p50':>15}")
+    for mode, times in results.items():
+        p50 = statistics.median(times)
+        p95 = sorted(times)[max(0, int(len(times) * 0.95) - 1)]
+        overhead = f"{p50 - base:+.1f} ms" if base is not None else "-"
+        print(f"{mode:<16}{p50:>10.1f}{p95:>10.1f}{overhead:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Optional
+
+from redis import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rq import Queue, Worker
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.registry import clean_registries
+from rq.worker import WorkerStatus
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 🧮 Scripts Lua (atômicos entre todos os workers)
+# ======================================================
+# KEYS = [ring, active, weights, known, wake]
+# ARGV = [tenant, peso ('' mantém o atual), peso padrão, tamanho máx. do wake]
+_REGISTER_LUA = """
+if redis.call('SADD', KEYS[2], ARGV[1]) == 1 then
+  redis.call('RPUSH', KEYS[1], ARGV[1])
+end
+redis.call('SADD', KEYS[4], ARGV[1])
+if ARGV[2] ~= '' then
+  redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+else
+  redis.call('HSETNX', KEYS[3], ARGV[1], ARGV[3])
+end
+redis.call('LPUSH', KEYS[5], '1')
+redis.call('LTRIM', KEYS[5], 0, tonumber(ARGV[4]) - 1)
+return 1
+"""
+
+# Deficit round-robin: o tenant na frente do anel ganha `peso` de crédito
+# ao chegar à frente e consome 1 por job; sem crédito, vai para o fim.
+# Tenants com fila vazia saem do anel (e perdem o crédito acumulado).
+# KEYS = [ring, active, weights, deficit]
+# ARGV = [prefixo das filas por tenant, peso padrão, máx. de iterações]
+_NEXT_LUA = """
+for i = 1, tonumber(ARGV[3]) do
+  local t = redis.call('LINDEX', KEYS[1], 0)
+  if not t then
+    return nil
+  end
+  local q = ARGV[1] .. t
+  if redis.call('LLEN', q) == 0 then
+    redis.call('LPOP', KEYS[1])
+    redis.call('SREM', KEYS[2], t)
+    redis.call('HDEL', KEYS[4], t)
+  else
+    local d = tonumber(redis.call('HGET', KEYS[4], t)) or 0
+    if d < 1 then
+      d = d + (tonumber(redis.call('HGET', KEYS[3], t)) or tonumber(ARGV[2]))
+    end
+    if d >= 1 then
+      local job_id = redis.call('LPOP', q)
+      d = d - 1
+      redis.call('HSET', KEYS[4], t, tostring(d))
+      if d < 1 or redis.call('LLEN', q) == 0 then
+        redis.call('RPUSH', KEYS[1], redis.call('LPOP', KEYS[1]))
+      end
+      return {t, job_id}
+    end
+    redis.call('HSET', KEYS[4], t, tostring(d))
+    redis.call('RPUSH', KEYS[1], redis.call('LPOP', KEYS[1]))
+  end
+end
+return nil
+"""
+
+
+# ======================================================
+# ⚖️ Escalonador justo entre tenants
+# ======================================================
+class FairScheduler:
+    """
+    Cada tenant tem a sua sub-fila RQ por fila base ("default:tenant:<id>").
+    Um anel de tenants com jobs pendentes é servido por deficit round-robin
+    ponderado pelo plano (settings.TENANT_PLAN_WEIGHTS): um tenant com peso 3
+    recebe 3 jobs por rodada contra 1 de um tenant com peso 1, e um lote de
+    5.000 currículos não atrasa os envios avulsos dos demais.
+    """
+    prefix = "fairq"
+    wake_cap = 100
+
+    def __init__(self, redis_conn: Redis, default_weight: float = 1.0):
+        self.redis = redis_conn
+        self.default_weight = default_weight
+        self._register = self.redis.register_script(_REGISTER_LUA)
+        self._next = self.redis.register_script(_NEXT_LUA)
+
+    # ---------- chaves ----------
+    def _key(self, base: str, name: str) -> str:
+        return f"{self.prefix}:{base}:{name}"
+
+    @staticmethod
+    def queue_name(base: str, tenant_id: str) -> str:
+        return f"{base}:tenant:{tenant_id}"
+
+    def _queue_key_prefix(self, base: str) -> str:
+        return f"{Queue.redis_queue_namespace_prefix}{base}:tenant:"
+
+    # ---------- produtor ----------
+    def register(self, base: str, tenant_id: str, weight: float | None = None, pipeline=None):
+        """
+        Coloca o tenant no anel da fila base (chamar DEPOIS de enfileirar o
+        job, no mesmo pipeline). `weight=None` mantém o peso já gravado.
+        """
+        keys = [
+            self._key(base, "ring"),
+            self._key(base, "active"),
+            self._key(base, "weights"),
+            self._key(base, "tenants"),
+            self._key(base, "wake"),
+        ]
+        arg_weight = "" if weight is None else str(max(float(weight), 0.01))
+        self._register(
+            keys=keys,
+            args=[tenant_id, arg_weight, self.default_weight, self.wake_cap],
+            client=pipeline or self.redis,
+        )
+
+    # ---------- consumidor ----------
+    def next_job(self, base: str) -> Optional[tuple[str, str]]:
+        """Retira o próximo job (tenant_id, job_id) da fila base, ou None."""
+        keys = [
+            self._key(base, "ring"),
+            self._key(base, "active"),
+            self._key(base, "weights"),
+            self._key(base, "deficit"),
+        ]
+        result = self._next(keys=keys, args=[self._queue_key_prefix(base), self.default_weight, 1000])
+        if not result:
+            return None
+        tenant_id, job_id = (v.decode() if isinstance(v, bytes) else v for v in result)
+        return tenant_id, job_id
+
+    def wait(self, bases: list[str], timeout: int):
+        """Bloqueia até algum enfileiramento (ou `timeout` segundos)."""
+        self.redis.blpop([self._key(b, "wake") for b in bases], timeout=max(1, timeout))
+
+    def record_wait(self, base: str, tenant_id: str, seconds: float):
+        key = self._key(base, f"wait:{tenant_id}")
+        with self.redis.pipeline() as pipe:
+            pipe.hincrbyfloat(key, "sum", seconds)
+            pipe.hincrby(key, "count", 1)
+            pipe.hset(key, "last", round(seconds, 3))
+            pipe.expire(key, 7 * 24 * 3600)
+            pipe.execute()
+
+    def known_tenants(self, base: str) -> list[str]:
+        return sorted(
+            t.decode() if isinstance(t, bytes) else t
+            for t in self.redis.smembers(self._key(base, "tenants"))
+        )
+
+    # ---------- métricas ----------
+    def tenant_stats(self, base: str, tenant_id: str) -> dict:
+        """Profundidade da sub-fila, espera do job mais antigo e espera média."""
+        queue = Queue(self.queue_name(base, tenant_id), connection=self.redis)
+        depth = queue.count
+        oldest_wait = None
+        if depth:
+            head = self.redis.lindex(queue.key, 0)
+            try:
+                job = Job.fetch(head.decode(), connection=self.redis) if head else None
+                if job and job.enqueued_at:
+                    oldest_wait = round(_seconds_since(job.enqueued_at), 1)
+            except NoSuchJobError:
+                pass
+
+        waits = self.redis.hgetall(self._key(base, f"wait:{tenant_id}"))
+        waits = {k.decode(): float(v) for k, v in waits.items()}
+        count = int(waits.get("count", 0))
+        weight = self.redis.hget(self._key(base, "weights"), tenant_id)
+        return {
+            "depth": depth,
+            "oldest_wait_seconds": oldest_wait,
+            "avg_wait_seconds": round(waits["sum"] / count, 1) if count else None,
+            "last_wait_seconds": waits.get("last"),
+            "dequeued": count,
+            "weight": float(weight) if weight is not None else self.default_weight,
+        }
+
+    def backlog(self, base: str) -> int:
+        """Jobs esperando na fila base somados aos das sub-filas dos tenants."""
+        names = [base] + [self.queue_name(base, t) for t in self.known_tenants(base)]
+        with self.redis.pipeline() as pipe:
+            for name in names:
+                pipe.llen(Queue(name, connection=self.redis).key)
+            return sum(pipe.execute())
+
+    def stats(self, base: str, tenant_id: str | None = None) -> dict:
+        tenants = [tenant_id] if tenant_id else self.known_tenants(base)
+        return {
+            "active_tenants": self.redis.scard(self._key(base, "active")),
+            "tenants": {t: self.tenant_stats(base, t) for t in tenants},
+        }
+
+
+def _seconds_since(dt: datetime) -> float:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return max(0.0, (datetime.now(timezone.utc) - dt).total_seconds())
+
+
+def plan_weight(plan: str | None) -> float:
+    weights = settings.TENANT_PLAN_WEIGHTS
+    return float(weights.get(plan or "", weights.get("free", 1.0)))
+
+
+# ======================================================
+# 🏭 Instância por processo
+# ======================================================
+_scheduler: Optional[FairScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_fair_scheduler() -> Optional[FairScheduler]:
+    """Retorna o escalonador ou None se FAIR_SCHEDULING_ENABLED=false."""
+    global _scheduler
+    if not settings.FAIR_SCHEDULING_ENABLED:
+        return None
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler(
+                    Redis.from_url(settings.REDIS_URL),
+                    default_weight=plan_weight("free"),
+                )
+    return _scheduler
+
+
+# ======================================================
+# 👷 Worker que consome pelo escalonador
+# ======================================================
+class FairWorker(Worker):
+    """
+    Worker RQ que pega o próximo job pelo FairScheduler das filas base que
+    escuta (ex.: "default") e só depois olha as filas base em si (jobs sem
+    tenant ou enfileirados antes do escalonador). Uso:
+
+        rq worker -w backend.tasks.fair_queue.FairWorker default
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fair_scheduler = FairScheduler(self.connection, default_weight=plan_weight("free"))
+        self.poll_interval = settings.FAIR_QUEUE_POLL_SECONDS
+
+    def _fair_dequeue(self) -> Optional[tuple[Job, Queue]]:
+        for base in self.queue_names():
+            while True:
+                picked = self.fair_scheduler.next_job(base)
+                if picked is None:
+                    break
+                tenant_id, job_id = picked
+                queue = Queue(
+                    self.fair_scheduler.queue_name(base, tenant_id),
+                    connection=self.connection,
+                    job_class=self.job_class,
+                    serializer=self.serializer,
+                )
+                try:
+                    job = self.job_class.fetch(job_id, connection=self.connection, serializer=self.serializer)
+                except NoSuchJobError:
+                    continue
+                if job.enqueued_at:
+                    self.fair_scheduler.record_wait(base, tenant_id, _seconds_since(job.enqueued_at))
+                return job, queue
+        return None
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int | None, max_idle_time: int | None = None):
+        self.set_state(WorkerStatus.IDLE)
+        self.procline("Listening (fair) on " + ",".join(self.queue_names()))
+        idle_since = time.monotonic()
+        # mesmo retry do Worker base: queda do Redis espera e reconecta
+        connection_wait_time = 1.0
+
+        while True:
+            try:
+                self.heartbeat()
+                if self.should_run_maintenance_tasks:
+                    self.run_maintenance_tasks()
+
+                result = self._fair_dequeue()
+                if result is None:
+                    result = self.queue_class.dequeue_any(
+                        self._ordered_queues,
+                        None,
+                        connection=self.connection,
+                        job_class=self.job_class,
+                        serializer=self.serializer,
+                    )
+                if result is not None:
+                    job, queue = result
+                    job.redis_server_version = self.get_redis_server_version()
+                    self.log.info(f"Worker {self.name}: {queue.name}: {job.id}")
+                    self.heartbeat()
+                    return result
+
+                # burst: fila vazia encerra o worker
+                if timeout is None:
+                    return None
+                if max_idle_time is not None and time.monotonic() - idle_since >= max_idle_time:
+                    return None
+                self.fair_scheduler.wait(self.queue_names(), min(self.poll_interval, timeout))
+                connection_wait_time = 1.0
+            except RedisConnectionError as conn_err:
+                self.log.error(
+                    f"Worker {self.name}: could not connect to Redis instance: {conn_err} "
+                    f"retrying in {connection_wait_time:.0f} seconds..."
+                )
+                time.sleep(connection_wait_time)
+                connection_wait_time = min(
+                    connection_wait_time * self.exponential_backoff_factor,
+                    self.max_connection_wait_time,
+                )
+
+    def clean_registries(self):
+        """Também limpa os registros das sub-filas e recoloca no anel tenants com fila pendente."""
+        super().clean_registries()
+        for base in self.queue_names():
+            for tenant_id in self.fair_scheduler.known_tenants(base):
+                queue = Queue(self.fair_scheduler.queue_name(base, tenant_id), connection=self.connection)
+                if queue.acquire_maintenance_lock():
+                    clean_registries(queue, self._exc_handlers)
+                    queue.release_maintenance_lock()
+                if queue.count:
+                    # ex.: job de tenant reenfileirado pelo painel do RQ
+                    self.fair_scheduler.register(base, tenant_id)
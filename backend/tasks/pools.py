@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import logging
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from redis import Redis
+
+from backend.config import settings
+from backend.services.pdf_service import PdfText, extract_text, ocr_text
+
+logger = logging.getLogger(__name__)
+
+# Utilização publicada por worker: hash por worker (com TTL) + índice dos workers
+_POOLS_KEY = "stage_pools:{worker}"
+_POOLS_INDEX = "stage_pools:workers"
+
+
+# ======================================================
+# 📊 Pool de uma etapa (capacidade + utilização)
+# ======================================================
+class StagePool:
+    """
+    Contador de ocupação de um pool (slots de fila no AsyncWorker ou
+    processos de extração). A utilização é a área sob a curva de slots
+    ocupados dividida por capacidade x tempo, na janela desde o último
+    `snapshot`: 1.0 = pool saturado o tempo todo.
+    """
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self.busy = 0
+        self.completed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+        self._area = 0.0
+        self._last = self._window = time.monotonic()
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.busy
+
+    def _tick(self, now: float):
+        self._area += self.busy * (now - self._last)
+        self._last = now
+
+    def acquire(self):
+        with self._lock:
+            self._tick(time.monotonic())
+            self.busy += 1
+
+    def release(self, ok: bool = True):
+        with self._lock:
+            self._tick(time.monotonic())
+            self.busy -= 1
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    @contextmanager
+    def track(self):
+        self.acquire()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.release(ok)
+
+    def snapshot(self) -> dict:
+        """Estado atual e utilização da janela (que é reiniciada)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tick(now)
+            elapsed = now - self._window
+            utilisation = self._area / (self.capacity * elapsed) if elapsed > 0 else 0.0
+            self._area, self._window = 0.0, now
+            return {
+                "capacity": self.capacity,
+                "busy": self.busy,
+                "utilisation": round(min(utilisation, 1.0), 3),
+                "completed": self.completed,
+                "failed": self.failed,
+            }
+
+
+# ======================================================
+# 🧮 Pool de processos para extração de PDF (CPU)
+# ======================================================
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_stats: Optional[StagePool] = None
+_parse_lock = threading.Lock()
+
+
+def _warm_parse_process():
+    import fitz  # noqa: F401  evita pagar o import no primeiro PDF
+
+
+def init_parse_pool(processes: int | None = None) -> StagePool:
+    """
+    Cria o pool de processos da extração (uma vez por processo). Só o
+    AsyncWorker chama: nos workers de um job por vez o pool não ganha
+    nada e a extração continua no próprio processo.
+    """
+    global _parse_pool, _parse_stats
+    with _parse_lock:
+        if _parse_pool is None:
+            size = processes or settings.PARSE_POOL_PROCESSES or os.cpu_count() or 1
+            # spawn: o processo pai tem threads e event loop, que não sobrevivem a fork
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_parse_process,
+            )
+            _parse_stats = StagePool("pdf_processes", size)
+            logger.info(f"🧮 [pools] Pool de extração de PDF com {size} processos")
+    return _parse_stats
+
+
+def shutdown_parse_pool():
+    global _parse_pool, _parse_stats
+    with _parse_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=True, cancel_futures=True)
+            _parse_pool = _parse_stats = None
+
+
+def _in_parse_pool(func, data: bytes) -> PdfText:
+    pool, stats = _parse_pool, _parse_stats
+    if pool is None:
+        return func(data)
+    with stats.track():
+        return pool.submit(func, data).result()
+
+
+def extract_pdf_text(data: bytes) -> PdfText:
+    """
+    Extrai o texto do PDF no pool de processos, se houver (o PyMuPDF segura
+    a GIL e travaria as demais threads do worker); senão, aqui mesmo.
+    """
+    return _in_parse_pool(extract_text, data)
+
+
+def ocr_pdf_text(data: bytes) -> PdfText:
+    """OCR do PDF, no mesmo pool da extração."""
+    return _in_parse_pool(ocr_text, data)
+
+
+def parse_pool_stats() -> Optional[StagePool]:
+    return _parse_stats
+
+
+# ======================================================
+# 📡 Publicação da utilização (lida por /metrics/queues)
+# ======================================================
+def publish_utilisation(redis_conn: Redis, worker: str, pools: list[StagePool], ttl: int):
+    """Grava o snapshot dos pools do worker; expira se o worker parar de publicar."""
+    key = _POOLS_KEY.format(worker=worker)
+    with redis_conn.pipeline() as pipe:
+        pipe.delete(key)
+        pipe.hset(key, mapping={p.name: json.dumps(p.snapshot()) for p in pools})
+        pipe.expire(key, ttl)
+        pipe.sadd(_POOLS_INDEX, worker)
+        pipe.execute()
+
+
+def clear_utilisation(redis_conn: Redis, worker: str):
+    with redis_conn.pipeline() as pipe:
+        pipe.delete(_POOLS_KEY.format(worker=worker))
+        pipe.srem(_POOLS_INDEX, worker)
+        pipe.execute()
+
+
+def read_utilisation(redis_conn: Redis) -> dict:
+    """{worker: {pool: snapshot}} dos workers ativos; remove do índice os expirados."""
+    result = {}
+    for raw in redis_conn.smembers(_POOLS_INDEX):
+        worker = raw.decode() if isinstance(raw, bytes) else raw
+        data = redis_conn.hgetall(_POOLS_KEY.format(worker=worker))
+        if not data:
+            redis_conn.srem(_POOLS_INDEX, worker)
+            continue
+        result[worker] = {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in data.items()
+        }
+    return result
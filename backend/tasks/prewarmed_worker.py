@@ -0,0 +1,167 @@
+import os
+import time
+import signal
+import logging
+import multiprocessing
+from typing import Optional
+
+from redis import Redis
+from rq import Queue, SimpleWorker
+
+from backend.config import settings
+from backend.tasks.fair_queue import FairWorker
+
+logger = logging.getLogger(__name__)
+
+
+# ======================================================
+# 🔥 Pré-aquecimento (uma vez por processo)
+# ======================================================
+def warm_up(redis_conn: Redis) -> dict:
+    """
+    Carrega e inicializa tudo que os jobs usam, para que nenhum job pague
+    import/conexão: PyMuPDF, pool do SQLAlchemy, Redis e clientes OpenAI
+    (o pool HTTP abre na primeira chamada e é reaproveitado depois).
+
+    Returns:
+        dict: tempo (ms) de cada etapa
+    """
+    timings = {}
+
+    t = time.perf_counter()
+    import fitz
+    fitz.open().close()
+    timings["fitz"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    from sqlalchemy import text
+    from backend.database.connection import engine
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.warning(f"⚠️ [prewarm] Banco indisponível no aquecimento: {e}")
+    timings["db_pool"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    redis_conn.ping()
+    timings["redis"] = (time.perf_counter() - t) * 1000
+
+    t = time.perf_counter()
+    import backend.tasks.tasks  # noqa: F401  cria OpenAIClient, pipeline, limitador etc.
+    timings["tasks"] = (time.perf_counter() - t) * 1000
+
+    logger.info(
+        "🔥 [prewarm] Processo aquecido: "
+        + ", ".join(f"{k}={v:.0f}ms" for k, v in timings.items())
+    )
+    return timings
+
+
+# ======================================================
+# 👷 Worker sem fork (jobs no próprio processo)
+# ======================================================
+class PrewarmedWorker(FairWorker):
+    """
+    FairWorker que executa os jobs no próprio processo, como o SimpleWorker
+    do RQ: conexões do banco, do Redis e da OpenAI sobrevivem entre jobs.
+    O isolamento de falhas fica com o WorkerSupervisor, que reinicia o
+    processo se ele morrer (ex.: segfault no PyMuPDF) e o recicla após
+    `max_jobs` jobs.
+    """
+    execute_job = SimpleWorker.execute_job
+    get_heartbeat_ttl = SimpleWorker.get_heartbeat_ttl
+
+
+def _run_worker(queues: list[str], max_jobs: Optional[int]):
+    """Alvo do processo filho (spawn: começa limpo, sem herdar conexões)."""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    conn = Redis.from_url(settings.REDIS_URL)
+    warm_up(conn)
+    worker = PrewarmedWorker([Queue(name, connection=conn) for name in queues], connection=conn)
+    worker.work(with_scheduler=True, max_jobs=max_jobs)
+
+
+# ======================================================
+# 🛡️ Supervisor (isolamento de falhas)
+# ======================================================
+class WorkerSupervisor:
+    """
+    Mantém `processes` PrewarmedWorkers vivos. Um processo que sai é
+    recriado: saída limpa (reciclagem após max_jobs) na hora; queda, com
+    backoff exponencial (até WORKER_RESTART_BACKOFF_MAX) se cair logo após
+    subir. SIGTERM/SIGINT são repassados aos filhos (o RQ termina o job
+    atual antes de sair) e o supervisor espera todos encerrarem.
+    """
+
+    def __init__(
+        self,
+        queues: list[str],
+        processes: int | None = None,
+        max_jobs: int | None = None,
+    ):
+        self.queues = queues
+        self.processes = processes or settings.WORKER_PROCESSES
+        self.max_jobs = settings.WORKER_MAX_JOBS if max_jobs is None else max_jobs
+        self.ctx = multiprocessing.get_context("spawn")
+        self._children: dict[int, tuple[multiprocessing.Process, float]] = {}
+        self._backoff: dict[int, float] = {}
+        self._stopping = False
+
+    def _spawn(self, slot: int):
+        proc = self.ctx.Process(
+            target=_run_worker,
+            args=(self.queues, self.max_jobs or None),
+            name=f"prewarmed-worker-{slot}",
+        )
+        proc.start()
+        self._children[slot] = (proc, time.monotonic())
+        logger.info(f"🚀 [supervisor] Worker {slot} iniciado (pid={proc.pid})")
+
+    def _stop(self, signum, frame):
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info("🛑 [supervisor] Encerrando workers (aguardando jobs em andamento)...")
+        for proc, _ in self._children.values():
+            if proc.is_alive():
+                os.kill(proc.pid, signal.SIGTERM)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+        restart_at: dict[int, float] = {}
+        while not self._stopping:
+            time.sleep(1)
+            now = time.monotonic()
+            for slot, (proc, started) in list(self._children.items()):
+                if proc.is_alive() or self._stopping:
+                    continue
+                if slot not in restart_at:
+                    if proc.exitcode == 0:
+                        self._backoff[slot] = 0
+                        logger.info(f"♻️ [supervisor] Worker {slot} reciclado (max_jobs)")
+                    else:
+                        crashed_fast = now - started < 30
+                        delay = min(
+                            max(1.0, self._backoff.get(slot, 0) * 2) if crashed_fast else 1.0,
+                            settings.WORKER_RESTART_BACKOFF_MAX,
+                        )
+                        self._backoff[slot] = delay
+                        logger.error(
+                            f"💥 [supervisor] Worker {slot} caiu (exit={proc.exitcode}); "
+                            f"reiniciando em {delay:.0f}s"
+                        )
+                    restart_at[slot] = now + self._backoff[slot]
+                if now >= restart_at[slot]:
+                    restart_at.pop(slot)
+                    self._spawn(slot)
+
+        for proc, _ in self._children.values():
+            proc.join(timeout=settings.ANALYSIS_JOB_TIMEOUT)
+            if proc.is_alive():
+                proc.kill()
+        logger.info("✅ [supervisor] Workers encerrados")
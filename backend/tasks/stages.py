@@ -0,0 +1,305 @@
+import os
+import uuid
+import asyncio
+import logging
+import contextvars
+import functools
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from redis import Redis
+from rq import Queue
+
+from backend.tasks.fair_queue import get_fair_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Timeout padrão do RQ para etapas sem timeout próprio (segundos)
+DEFAULT_STAGE_TIMEOUT = 180
+
+# Filas por tipo de trabalho: CPU (extração de PDF) e I/O (chamadas à IA)
+PARSE_QUEUE = "parse"
+LLM_QUEUE = "llm"
+# Filas escutadas pelos workers; as de etapas finais primeiro, para que um
+# worker de um job por vez esvazie o que já foi extraído antes de extrair mais
+# ("default" recebe jobs antigos e os sem etapa)
+WORKER_QUEUES = [LLM_QUEUE, PARSE_QUEUE, "default"]
+
+
+class StageStop(Exception):
+    """
+    Interrompe o pipeline sem ser erro (ex.: currículo barrado na
+    pré-triagem). As etapas seguintes não são executadas.
+    """
+
+
+def get_queue(name: str = "default") -> Queue:
+    redis_conn = Redis.from_url(os.getenv("REDIS_URL"))
+    return Queue(name, connection=redis_conn)
+
+
+# Pipelines por caminho da função do worker (usado pelo AsyncWorker)
+PIPELINES: dict[str, "StagePipeline"] = {}
+
+
+# ======================================================
+# 🧩 Etapa
+# ======================================================
+@dataclass
+class Stage:
+    """
+    Uma etapa recebe o contexto (dict) e o complementa para as seguintes.
+
+    Chaves iniciadas por "_" só existem em memória: valem para etapas do
+    mesmo job (ex.: texto extraído) e são descartadas quando o pipeline
+    continua em outro job. As demais precisam ser serializáveis e pequenas,
+    pois vão para o Redis.
+    """
+    name: str
+    func: Callable[[dict], None]
+    depends_on: tuple[str, ...] = ()
+    queue: str = "default"
+    timeout: Optional[int] = None
+    afunc: Optional[Callable[[dict], Awaitable[None]]] = None  # versão async (AsyncWorker)
+
+
+# ======================================================
+# 🔗 Pipeline de etapas com dependências explícitas
+# ======================================================
+class StagePipeline:
+    """
+    Encadeia etapas respeitando `depends_on`. Etapas consecutivas da mesma
+    fila rodam no mesmo job, passando o contexto em memória; ao mudar de
+    fila, o restante é enfileirado como um novo job ao fim do anterior.
+    Se uma etapa falha (ou levanta StageStop), nada depois dela é executado
+    nem enfileirado.
+
+    Args:
+        name: nome usado nos logs
+        stages: etapas (em qualquer ordem; são ordenadas pelas dependências)
+        task: caminho importável da função do worker que chama `run`
+        on_failure: callback(stage, ctx, exc) chamado quando uma etapa falha
+    """
+
+    def __init__(
+        self,
+        name: str,
+        stages: list[Stage],
+        task: str,
+        on_failure: Optional[Callable[[Stage, dict, Exception], None]] = None,
+    ):
+        self.name = name
+        self.task = task
+        self.on_failure = on_failure
+        self.stages = self._ordered(stages)
+        self._by_name = {s.name: s for s in self.stages}
+        PIPELINES[task] = self
+
+    @staticmethod
+    def _ordered(stages: list[Stage]) -> list[Stage]:
+        """Ordenação topológica estável; rejeita dependências ausentes ou cíclicas."""
+        by_name = {s.name: s for s in stages}
+        for stage in stages:
+            for dep in stage.depends_on:
+                if dep not in by_name:
+                    raise ValueError(f"Etapa '{stage.name}' depende de '{dep}', que não existe")
+
+        ordered, done = [], set()
+        pending = list(stages)
+        while pending:
+            ready = [s for s in pending if set(s.depends_on) <= done]
+            if not ready:
+                raise ValueError(f"Dependência cíclica entre: {[s.name for s in pending]}")
+            for stage in ready:
+                ordered.append(stage)
+                done.add(stage.name)
+                pending.remove(stage)
+        return ordered
+
+    # ---------- planejamento ----------
+    def handoffs(self) -> set[tuple[str, str]]:
+        """Pares (fila, fila seguinte) em que o pipeline passa para outro job."""
+        return {
+            (a.queue, b.queue)
+            for a, b in zip(self.stages, self.stages[1:])
+            if a.queue != b.queue
+        }
+
+    def _remaining(self, start: str | None = None) -> list[Stage]:
+        if start is None:
+            return list(self.stages)
+        if start not in self._by_name:
+            raise ValueError(f"Etapa desconhecida: {start}")
+        return self.stages[self.stages.index(self._by_name[start]):]
+
+    @staticmethod
+    def _first_segment(stages: list[Stage]) -> list[Stage]:
+        """Etapas iniciais que rodam no mesmo job (mesma fila)."""
+        segment = stages[:1]
+        for stage in stages[1:]:
+            if stage.queue != segment[0].queue:
+                break
+            segment.append(stage)
+        return segment
+
+    def _job_data(self, ctx: dict, stages: list[Stage]):
+        segment = self._first_segment(stages)
+        timeout = sum(s.timeout or DEFAULT_STAGE_TIMEOUT for s in segment)
+        payload = {k: v for k, v in ctx.items() if not k.startswith("_")}
+        return segment[0].queue, Queue.prepare_data(
+            self.task,
+            ([s.name for s in segment], payload),
+            timeout=timeout,
+        )
+
+    def _initial_ctx(self, ctx: dict, start: str | None) -> dict:
+        skipped = self.stages[: len(self.stages) - len(self._remaining(start))]
+        # run_id identifica esta execução do pipeline em todos os seus jobs:
+        # um job repetido (reenfileirado, timeout) grava o mesmo resultado
+        return {
+            **ctx,
+            "completed": [s.name for s in skipped],
+            "run_id": ctx.get("run_id") or uuid.uuid4().hex,
+        }
+
+    # ---------- enfileiramento ----------
+    def _enqueue(self, jobs: list[tuple[dict, list[Stage]]], weight: float | None = None) -> list[str]:
+        """
+        Enfileira o próximo trecho de cada contexto em um único pipeline do
+        Redis. Com o escalonador justo ativo, cada job vai para a sub-fila
+        do seu tenant e o tenant é registrado no anel da fila base.
+        """
+        scheduler = get_fair_scheduler()
+        by_queue: dict[str, list] = {}
+        tenants = set()
+        for ctx, stages in jobs:
+            base, data = self._job_data(ctx, stages)
+            name = base
+            tenant_id = ctx.get("tenant_id")
+            if scheduler and tenant_id:
+                name = scheduler.queue_name(base, tenant_id)
+                tenants.add((base, tenant_id))
+            by_queue.setdefault(name, []).append(data)
+
+        queues = {name: get_queue(name) for name in by_queue}
+        first = next(iter(queues.values()))
+        with first.connection.pipeline() as pipe:
+            for name, job_datas in by_queue.items():
+                queues[name].enqueue_many(job_datas, pipeline=pipe)
+            # registra depois dos jobs: o anel nunca aponta para fila vazia
+            for base, tenant_id in tenants:
+                scheduler.register(base, tenant_id, weight, pipeline=pipe)
+            pipe.execute()
+        return list(queues)
+
+    def enqueue_many(self, ctxs: list[dict], start: str | None = None, weight: float | None = None):
+        """
+        Enfileira o primeiro job de cada contexto em um único pipeline do
+        Redis. `start` pula as etapas anteriores (tratadas como concluídas);
+        `weight` é o peso do tenant no escalonador (None mantém o atual).
+        """
+        if not ctxs:
+            return
+        remaining = self._remaining(start)
+        self._enqueue([(self._initial_ctx(ctx, start), remaining) for ctx in ctxs], weight)
+
+    # ---------- execução (no worker) ----------
+    def _missing_deps(self, stage: Stage, ctx: dict) -> list[str]:
+        missing = [d for d in stage.depends_on if d not in ctx["completed"]]
+        if missing:
+            logger.error(
+                f"❌ [{self.name}] Etapa '{stage.name}' sem dependências concluídas: {missing}"
+            )
+        return missing
+
+    def _failed(self, stage: Stage, ctx: dict, exc: Exception):
+        logger.error(f"❌ [{self.name}] Falha na etapa '{stage.name}': {exc}")
+        if self.on_failure:
+            try:
+                self.on_failure(stage, ctx, exc)
+            except Exception as cb_error:
+                logger.error(f"❌ [{self.name}] Falha ao registrar erro: {cb_error}")
+
+    def _follow(self, ctx: dict):
+        remaining = [s for s in self.stages if s.name not in ctx["completed"]]
+        if remaining:
+            queue_names = self._enqueue([(ctx, remaining)])
+            logger.info(
+                f"➡️ [{self.name}] Próximas etapas enfileiradas em {queue_names}: "
+                f"{[st.name for st in self._first_segment(remaining)]}"
+            )
+
+    def run(self, stage_names: list[str], ctx: dict, follow: bool = True) -> dict:
+        """
+        Executa as etapas do job atual e, se todas concluírem, enfileira
+        o restante do pipeline (quando `follow`).
+        """
+        ctx.setdefault("completed", [])
+        for name in stage_names:
+            stage = self._by_name[name]
+            if self._missing_deps(stage, ctx):
+                return ctx
+            try:
+                stage.func(ctx)
+            except StageStop as e:
+                logger.info(f"🛑 [{self.name}] Pipeline interrompido em '{name}': {e}")
+                return ctx
+            except Exception as e:
+                self._failed(stage, ctx, e)
+                return ctx
+            ctx["completed"].append(name)
+
+        if follow:
+            self._follow(ctx)
+        return ctx
+
+    def run_from_start(self, ctx: dict) -> dict:
+        """
+        Executa aqui o primeiro trecho do pipeline e enfileira o restante
+        (ex.: jobs antigos, enfileirados antes de o pipeline existir).
+        """
+        first = self._first_segment(self._remaining())
+        return self.run([s.name for s in first], self._initial_ctx(ctx, None))
+
+    async def arun(
+        self,
+        stage_names: list[str],
+        ctx: dict,
+        follow: bool = True,
+        executor: Optional[Executor] = None,
+    ) -> dict:
+        """
+        Mesmo contrato de `run`, para o AsyncWorker: etapas com `afunc`
+        rodam no event loop; as demais (e os acessos síncronos ao Redis e
+        ao callback de falha) vão para `executor` (None = pool de threads
+        padrão do event loop).
+        """
+        loop = asyncio.get_running_loop()
+
+        def in_thread(func, *args):
+            # como asyncio.to_thread: a thread enxerga os contextvars do job
+            call = functools.partial(contextvars.copy_context().run, func, *args)
+            return loop.run_in_executor(executor, call)
+
+        ctx.setdefault("completed", [])
+        for name in stage_names:
+            stage = self._by_name[name]
+            if self._missing_deps(stage, ctx):
+                return ctx
+            try:
+                if stage.afunc:
+                    await stage.afunc(ctx)
+                else:
+                    await in_thread(stage.func, ctx)
+            except StageStop as e:
+                logger.info(f"🛑 [{self.name}] Pipeline interrompido em '{name}': {e}")
+                return ctx
+            except Exception as e:
+                await in_thread(self._failed, stage, ctx, e)
+                return ctx
+            ctx["completed"].append(name)
+
+        if follow:
+            await in_thread(self._follow, ctx)
+        return ctx
@@ -1,15 +1,24 @@
-import os
+import io
 import uuid
+import asyncio
 import traceback
 import logging
-from redis import Redis
-from rq import Queue
-from sqlalchemy.orm import Session
 from contextlib import contextmanager
+from sqlalchemy.exc import IntegrityError
 from backend.database.connection import SessionLocal
-from backend.database.models import Resume, Job, Analysis
-from backend.services.pdf_service import read_pdf_bytes
-from backend.services.ai_service import OpenAIClient
+from backend.database.models import Resume, Job, Analysis, Tenant
+from backend.services.storage_service import read_blob, get_blob_store, new_blob_key
+from backend.services.ai_service import OpenAIClient, AsyncOpenAIClient
+from backend.services.preprocess_service import preprocess_cv
+from backend.services.fingerprint import get_fingerprint, save_fingerprint
+from backend.services.rate_limiter import tenant_scope
+from backend.services.prescreen_service import score_resume, passes_prescreen, job_to_dict
+from backend.services.text_quality import classify_text, TextQuality
+from backend.services.analysis_stats import invalidate_stats
+from backend.services.job_stats import record_analysis
+from backend.tasks.stages import Stage, StagePipeline, StageStop, PARSE_QUEUE, LLM_QUEUE
+from backend.tasks.pools import extract_pdf_text, ocr_pdf_text
+from backend.tasks.fair_queue import plan_weight
 from backend.config import settings
 
 logger = logging.getLogger(__name__)
@@ -34,142 +43,443 @@ def get_db():
         db.close()
 
 
+@contextmanager
+def stage_db():
+    """
+    Sessão das etapas do pipeline: ao contrário de get_db, propaga o erro
+    para que o pipeline pare. StageStop não é erro — grava o que a etapa
+    alterou (ex.: status "screened_out") antes de interromper.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except StageStop:
+        db.commit()
+        raise
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _load(db, ctx: dict) -> tuple[Resume, Job | None]:
+    resume = (
+        db.query(Resume)
+        .filter(Resume.id == ctx["resume_id"], Resume.tenant_id == ctx["tenant_id"])
+        .first()
+    )
+    if not resume:
+        raise StageStop(f"Resume {ctx['resume_id']} não encontrado para tenant {ctx['tenant_id']}")
+    job = (
+        db.query(Job)
+        .filter(Job.id == resume.job_id, Job.tenant_id == ctx["tenant_id"])
+        .first()
+    )
+    return resume, job
+
+
 # ======================================================
-# 📄 Task 1 — Extrair texto do PDF
+# 📄 Etapa 1 — Extrair texto do PDF
 # ======================================================
-def parse_pdf_task(resume_id: str, tenant_id: str, pdf_bytes: bytes):
+def _save_text(db, resume: Resume, job: Job | None, text: str, ctx: dict):
+    """Grava o texto extraído e calcula o pré-score local (BM25)."""
+    resume.raw_text = text
+    resume.status = "parsed"
+    if job:
+        resume.prescreen_score = score_resume(job_to_dict(job), text)
+        logger.info(f"📊 [parse] Pré-score de {resume.id}: {resume.prescreen_score:.4f}")
+    ctx["_raw_text"] = text
+
+
+def _reject_text(resume: Resume, quality: TextQuality):
+    """Currículo sem texto utilizável: status próprio e o pipeline para antes da IA."""
+    resume.status = quality.status
+    resume.opinion = (
+        "PDF sem texto (provavelmente escaneado)" if quality.status == "needs_ocr"
+        else "Texto do PDF ilegível"
+    ) + f": {quality.reason}"
+    raise StageStop(f"{resume.id} com texto inutilizável ({quality.status}: {quality.reason})")
+
+
+def parse_stage(ctx: dict):
     """
-    Extrai texto do PDF e atualiza o currículo.
+    Extrai texto do PDF (lido do blob store por `file_ref`) e atualiza o currículo.
+    PDFs já vistos no tenant (mesmo SHA-256) reaproveitam o texto extraído
+    sem nem baixar o arquivo.
+    O texto é classificado antes de seguir: PDFs escaneados (needs_ocr) e
+    textos ilegíveis (unreadable) param aqui, salvo quando o tenant tem OCR
+    local ativo — aí a etapa ocr tenta de novo.
+    Calcula o pré-score local (BM25) contra a vaga logo após a extração.
     """
-    with get_db() as db:
-        resume = (
-            db.query(Resume)
-            .filter(Resume.id == resume_id, Resume.tenant_id == tenant_id)
-            .first()
+    resume_id, tenant_id = ctx["resume_id"], ctx["tenant_id"]
+    with stage_db() as db:
+        resume, job = _load(db, ctx)
+
+        fingerprint = get_fingerprint(db, tenant_id, resume.content_hash)
+        if fingerprint and fingerprint.raw_text:
+            logger.info(f"♻️ [parse] PDF repetido, texto reaproveitado para {resume_id}")
+            _save_text(db, resume, job, fingerprint.raw_text, ctx)
+            return
+
+        data = read_blob(ctx.get("file_ref") or resume.file_url)
+        extracted = extract_pdf_text(data)
+        quality = classify_text(extracted.text, extracted.pages)
+        logger.info(
+            f"✅ [parse] Texto extraído para {resume_id}: {extracted.pages}/{extracted.total_pages} "
+            f"páginas, {len(extracted.text)} caracteres em {extracted.seconds * 1000:.0f}ms"
+            + (" (truncado)" if extracted.truncated else "")
+            + f" — {quality.status}, idioma={quality.language}"
         )
-        if not resume:
-            logger.warning(
-                f"⚠️ [parse_pdf_task] Resume {resume_id} não encontrado "
-                f"para tenant {tenant_id}"
-            )
+        if quality.ok:
+            save_fingerprint(db, tenant_id, resume.content_hash, raw_text=extracted.text)
+            _save_text(db, resume, job, extracted.text, ctx)
+            return
+
+        ocr_enabled = db.query(Tenant.ocr_enabled).filter(Tenant.id == tenant_id).scalar()
+        if quality.status == "needs_ocr" and ocr_enabled:
+            resume.status = "ocr_pending"
+            ctx["ocr"] = True
+            ctx["_pdf"] = data  # a etapa ocr roda no mesmo job
             return
+        _reject_text(resume, quality)
 
+
+# ======================================================
+# 🔠 Etapa 1b — OCR local (só tenants com ocr_enabled)
+# ======================================================
+def ocr_stage(ctx: dict):
+    """Passa pelo OCR os PDFs que a etapa parse marcou; nos demais não faz nada."""
+    if not ctx.get("ocr"):
+        return
+    resume_id = ctx["resume_id"]
+    with stage_db() as db:
+        resume, job = _load(db, ctx)
+        data = ctx.get("_pdf") or read_blob(ctx.get("file_ref") or resume.file_url)
         try:
-            text = read_pdf_bytes(pdf_bytes)
-            resume.raw_text = text
-            resume.status = "parsed"
-            logger.info(f"✅ [parse_pdf_task] Texto extraído para {resume_id}")
-        except Exception as e:
-            resume.status = "failed"
-            resume.opinion = f"Erro ao extrair PDF: {str(e)}"
-            logger.error(f"❌ [parse_pdf_task] Erro ao processar {resume_id}: {e}")
-            traceback.print_exc()
+            extracted = ocr_pdf_text(data)
+        except RuntimeError as e:  # Tesseract ausente no worker
+            logger.warning(f"⚠️ [ocr] OCR indisponível para {resume_id}: {e}")
+            _reject_text(resume, TextQuality("needs_ocr", 0.0, 0.0, None, "OCR indisponível"))
+
+        quality = classify_text(extracted.text, extracted.pages)
+        logger.info(
+            f"🔠 [ocr] {resume_id}: {extracted.pages} páginas, {len(extracted.text)} caracteres "
+            f"em {extracted.seconds:.1f}s — {quality.status}"
+        )
+        if not quality.ok:
+            # nem o OCR achou texto utilizável
+            quality.status = "unreadable"
+            _reject_text(resume, quality)
+        save_fingerprint(db, ctx["tenant_id"], resume.content_hash, raw_text=extracted.text)
+        _save_text(db, resume, job, extracted.text, ctx)
 
 
 # ======================================================
-# 🤖 Task 2 — Analisar currículo com IA
+# ✂️ Etapa 2 — Pré-triagem + pré-processamento
 # ======================================================
-def analyse_resume_task(resume_id: str, tenant_id: str):
+def preprocess_stage(ctx: dict):
+    """Barra currículos fora do limiar/top-K da vaga e aplica o orçamento de tokens."""
+    resume_id = ctx["resume_id"]
+    with stage_db() as db:
+        resume, job = _load(db, ctx)
+        if not job:
+            raise StageStop(f"Job {resume.job_id} não encontrado para tenant {ctx['tenant_id']}")
+
+        # Pré-triagem local: abaixo do limiar/top-K da vaga não gasta IA
+        if not passes_prescreen(db, job, resume):
+            resume.status = "screened_out"
+            raise StageStop(
+                f"{resume_id} barrado na pré-triagem (pré-score={resume.prescreen_score:.4f})"
+            )
+
+        text = ctx.get("_raw_text") or resume.raw_text or ""
+        if not text.strip():
+            raise ValueError("Currículo sem texto extraído; análise não executada")
+
+        # Limpeza + orçamento de tokens antes dos prompts
+        prepared = preprocess_cv(text)
+        resume.tokens_raw = prepared.tokens_before
+        resume.tokens_prompt = prepared.tokens_after
+
+    ctx["_prompt_text"] = prepared.text
+
+
+# ======================================================
+# 🤖 Etapa 3 — Analisar currículo com IA
+# ======================================================
+def _analysis_inputs(ctx: dict) -> tuple[str, dict, str | None]:
+    """Texto do prompt, dados da vaga e resumo reaproveitável (sessão fechada ao retornar)."""
+    with stage_db() as db:
+        resume, job = _load(db, ctx)
+        if not job:
+            raise StageStop(f"Job {resume.job_id} não encontrado para tenant {ctx['tenant_id']}")
+        job_data = job_to_dict(job)
+
+        # Resumo independe da vaga: reaproveita se o PDF já foi resumido
+        fingerprint = get_fingerprint(db, ctx["tenant_id"], resume.content_hash)
+        cached_summary = fingerprint.summary if fingerprint else None
+
+        prompt_text = ctx.get("_prompt_text")
+        if prompt_text is None:
+            # Etapa anterior rodou em outro job: refaz o pré-processamento (local, barato)
+            prompt_text = preprocess_cv(resume.raw_text or "").text
+
+    if not prompt_text.strip():
+        raise ValueError("Currículo sem texto extraído; análise não executada")
+    if cached_summary:
+        logger.info(f"♻️ [analyse] Resumo reaproveitado para {ctx['resume_id']}")
+    ctx["summary_cached"] = bool(cached_summary)
+    return prompt_text, job_data, cached_summary
+
+
+def analyse_stage(ctx: dict):
     """
-    Executa IA (resumo, opinião, score) e grava no banco.
+    Executa IA (resumo, opinião, score) via OpenAIClient.analyse (chamada
+    única ou três chamadas, conforme settings.AI_ANALYSIS_MODE). A sessão
+    do banco é fechada antes da chamada à OpenAI.
     """
-    with get_db() as db:
+    prompt_text, job_data, cached_summary = _analysis_inputs(ctx)
+    logger.info(f"🤖 [analyse] Iniciando análise IA para {ctx['resume_id']}")
+    with tenant_scope(ctx["tenant_id"]):
+        ctx["result"] = ai.analyse(prompt_text, job_data, summary=cached_summary)
+
+
+_async_ai: AsyncOpenAIClient | None = None
+
+
+def get_async_ai() -> AsyncOpenAIClient:
+    """Cliente async único por processo: todas as análises do AsyncWorker dividem o pool HTTP."""
+    global _async_ai
+    if _async_ai is None:
+        _async_ai = AsyncOpenAIClient()
+    return _async_ai
+
+
+async def analyse_stage_async(ctx: dict):
+    """Versão da etapa 3 para o AsyncWorker (banco no pool de threads, OpenAI no event loop)."""
+    prompt_text, job_data, cached_summary = await asyncio.to_thread(_analysis_inputs, ctx)
+    logger.info(f"🤖 [analyse] Iniciando análise IA (async) para {ctx['resume_id']}")
+    with tenant_scope(ctx["tenant_id"]):
+        ctx["result"] = await get_async_ai().analyse(prompt_text, job_data, summary=cached_summary)
+
+
+# ======================================================
+# 💾 Etapa 4 — Persistir resultado
+# ======================================================
+def _analysis_id(ctx: dict) -> str:
+    """Id da análise derivado da execução do pipeline (aleatório em jobs antigos, sem run_id)."""
+    if ctx.get("run_id"):
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"analysis:{ctx['resume_id']}:{ctx['run_id']}"))
+    return str(uuid.uuid4())
+
+
+def persist_stage(ctx: dict):
+    """
+    Grava o resultado da IA. Idempotente por execução do pipeline: o id da
+    análise vem do run_id, então uma segunda gravação do mesmo resultado
+    (job reenfileirado, ou etapa que continuou em thread depois do timeout
+    do AsyncWorker) é descartada inteira, sem duplicar a análise nem somar
+    de novo no job_stats.
+    """
+    resume_id, tenant_id = ctx["resume_id"], ctx["tenant_id"]
+    result = ctx["result"]
+    score = result["score"]
+    analysis_id = _analysis_id(ctx)
+    with stage_db() as db:
+        if db.get(Analysis, analysis_id) is not None:
+            raise StageStop(f"Análise de {resume_id} já gravada nesta execução")
+        resume, _ = _load(db, ctx)
+
+        if not ctx.get("summary_cached"):
+            save_fingerprint(db, tenant_id, resume.content_hash, summary=result["summary"])
+
+        resume.summary = result["summary"]
+        resume.opinion = result["opinion"]
+        resume.score = score
+        resume.status = "done"
+
+        # Criar registro detalhado de análise (e somar ao rollup da vaga, no mesmo commit)
+        record_analysis(db, tenant_id, resume.job_id, resume.id, score)
+        analysis = Analysis(
+            id=analysis_id,
+            tenant_id=tenant_id,
+            job_id=resume.job_id,
+            resume_id=resume.id,
+            candidate_name="(extraído pela IA futuramente)",
+            skills=[],
+            education=[],
+            languages=[],
+            score=score,
+        )
+        db.add(analysis)
+        try:
+            db.flush()
+        except IntegrityError:
+            # gravação concorrente da mesma execução: ela fica, esta é desfeita
+            db.rollback()
+            raise StageStop(f"Análise de {resume_id} já gravada nesta execução")
+    invalidate_stats(tenant_id)
+    logger.info(f"✅ [persist] Análise concluída para {resume_id} (score={score:.2f})")
+
+
+# ======================================================
+# 🔗 Pipeline do currículo: parse → ocr → preprocess → analyse → persist
+# ======================================================
+# parse+ocr+preprocess rodam em um job da fila parse e analyse+persist em um
+# job da fila llm, para que cada fila tenha o seu pool (ver AsyncWorker).
+_FAILURE_MESSAGES = {
+    "parse": "Erro ao extrair PDF",
+    "ocr": "Erro no OCR do PDF",
+}
+
+
+def _mark_failed(stage: Stage, ctx: dict, exc: Exception):
+    """Marca o currículo como "failed"; as etapas seguintes não rodam."""
+    traceback.print_exc()
+    with stage_db() as db:
         resume = (
             db.query(Resume)
-            .filter(Resume.id == resume_id, Resume.tenant_id == tenant_id)
+            .filter(Resume.id == ctx["resume_id"], Resume.tenant_id == ctx["tenant_id"])
             .first()
         )
-        if not resume:
-            logger.warning(
-                f"⚠️ [analyse_resume_task] Resume {resume_id} não encontrado"
-            )
-            return
+        if resume:
+            resume.status = "failed"
+            resume.opinion = f"{_FAILURE_MESSAGES.get(stage.name, 'Erro na análise')}: {exc}"
+
+
+RESUME_PIPELINE = StagePipeline(
+    "resume_pipeline",
+    [
+        # CPU (PyMuPDF, tokenização): fila parse
+        Stage("parse", parse_stage, queue=PARSE_QUEUE),
+        Stage("ocr", ocr_stage, depends_on=("parse",), queue=PARSE_QUEUE),
+        Stage("preprocess", preprocess_stage, depends_on=("ocr",), queue=PARSE_QUEUE),
+        # I/O (OpenAI, banco): fila llm
+        Stage(
+            "analyse",
+            analyse_stage,
+            depends_on=("preprocess",),
+            queue=LLM_QUEUE,
+            timeout=settings.ANALYSIS_JOB_TIMEOUT,
+            afunc=analyse_stage_async,
+        ),
+        Stage("persist", persist_stage, depends_on=("analyse",), queue=LLM_QUEUE),
+    ],
+    task="backend.tasks.tasks.run_resume_pipeline",
+    on_failure=_mark_failed,
+)
+
+
+def run_resume_pipeline(stage_names: list[str], ctx: dict):
+    """Job do RQ: executa um trecho do pipeline do currículo."""
+    RESUME_PIPELINE.run(stage_names, ctx)
 
-        job = (
-            db.query(Job)
-            .filter(Job.id == resume.job_id, Job.tenant_id == tenant_id)
+
+# Jobs no formato antigo (parse e IA enfileirados separadamente) que ainda
+# estejam no Redis durante um deploy. O de parse roda o pipeline inteiro,
+# encadeando as etapas seguintes; o de IA não faz nada, pois correria
+# contra o de parse e a análise já sai do encadeamento.
+def _legacy_file_ref(resume_id: str, tenant_id: str, pdf: str | bytes) -> str:
+    """Jobs anteriores ao blob store levam os bytes do PDF: grava-os e aponta o currículo para lá."""
+    if isinstance(pdf, str):
+        return pdf
+    blob = get_blob_store().save_fileobj(new_blob_key(tenant_id), io.BytesIO(pdf))
+    with stage_db() as db:
+        resume = (
+            db.query(Resume)
+            .filter(Resume.id == resume_id, Resume.tenant_id == tenant_id)
             .first()
         )
-        if not job:
-            logger.warning(
-                f"⚠️ [analyse_resume_task] Job {resume.job_id} não encontrado "
-                f"para tenant {tenant_id}"
-            )
-            return
+        if resume:
+            resume.file_url = blob.ref
+            resume.content_hash = resume.content_hash or blob.sha256
+    logger.info(f"💾 [parse_pdf_task] PDF de job antigo gravado em {blob.ref}")
+    return blob.ref
 
-        try:
-            text = resume.raw_text or ""
-             # Prepara dados da vaga para a IA
-            job_data = {
-                "main_activities": job.main_activities or "",
-                "prerequisites": job.prerequisites or "",
-                "differentials": job.differentials or "",
-                "criteria": job.criteria or []
-            }
-            
-            # 3️⃣ Chama OpenAI para análise
-            logger.info(f"🤖 [analyse_resume_task] Iniciando análise IA para {resume_id}")
-
-            summary = ai.resume_cv(text)
-            opinion = ai.generate_opinion(text, job_data)
-            score = ai.generate_score(text, job_data)
-
-            resume.summary = summary
-            resume.opinion = opinion
-            resume.score = score
-            resume.status = "done"
-
-            # Criar registro detalhado de análise
-            analysis = Analysis(
-                id=str(uuid.uuid4()),
-                tenant_id=tenant_id,
-                job_id=job.id,
-                resume_id=resume.id,
-                candidate_name="(extraído pela IA futuramente)",
-                skills=[],
-                education=[],
-                languages=[],
-                score=score,
-            )
-            db.add(analysis)
-            logger.info(
-                f"✅ [analyse_resume_task] Análise concluída para {resume_id} "
-                f"(score={score:.2f})"
-            )
-        except Exception as e:
-            resume.status = "failed"
-            resume.opinion = f"Erro na análise: {str(e)}"
-            logger.error(f"❌ [analyse_resume_task] Erro ao analisar {resume_id}: {e}")
-            traceback.print_exc()
+
+def parse_pdf_task(resume_id: str, tenant_id: str, pdf: str | bytes):
+    file_ref = _legacy_file_ref(resume_id, tenant_id, pdf)
+    RESUME_PIPELINE.run_from_start({"resume_id": resume_id, "tenant_id": tenant_id, "file_ref": file_ref})
+
+
+def analyse_resume_task(resume_id: str, tenant_id: str):
+    logger.info(f"⏭️ [analyse_resume_task] {resume_id}: análise encadeada pelo job de parse")
 
 
 # ======================================================
 # 🚀 Função principal — Enfileirar processamento
 # ======================================================
-def enqueue_analysis(job_id: str, tenant_id: str, pdf_bytes: bytes) -> str:
+def enqueue_bulk_analysis(job_id: str, tenant_id: str, files: list[dict]) -> list[str]:
     """
-    Cria registro no DB e enfileira as tarefas de PDF e IA.
+    Cria todos os currículos com um único INSERT em lote e enfileira o
+    pipeline de todos eles em um único pipeline do Redis.
+
+    Args:
+        files: [{"file_ref": ..., "content_hash": ..., "candidate_name": opcional}]
+
+    Returns:
+        list[str]: ids dos currículos, na mesma ordem de `files`
     """
-    with get_db() as db:
-        resume_id = str(uuid.uuid4())
-        resume = Resume(
-            id=resume_id,
-            tenant_id=tenant_id,
-            job_id=job_id,
-            status="queued",
-        )
-        db.add(resume)
-        logger.info(
-            f"📝 [enqueue_analysis] Resume criado: {resume_id} "
-            f"(tenant={tenant_id}, job={job_id})"
-        )
+    if not files:
+        return []
+
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "tenant_id": tenant_id,
+            "job_id": job_id,
+            "candidate_name": f.get("candidate_name"),
+            "file_url": f["file_ref"],
+            "content_hash": f["content_hash"],
+            "status": "queued",
+        }
+        for f in files
+    ]
+    # stage_db relança o erro: sem commit, nada é enfileirado (get_db
+    # engoliria a falha e o cliente receberia ids que não existem)
+    with stage_db() as db:
+        db.bulk_insert_mappings(Resume, rows)
+        plan = db.query(Tenant.plan).filter(Tenant.id == tenant_id).scalar()
+    logger.info(
+        f"📝 [enqueue_bulk_analysis] {len(rows)} currículos criados "
+        f"(tenant={tenant_id}, job={job_id})"
+    )
 
-    redis_conn = Redis.from_url(os.getenv("REDIS_URL"))
-    q = Queue("default", connection=redis_conn)
+    # Sub-fila do tenant, servida com o peso do plano (ver fair_queue)
+    RESUME_PIPELINE.enqueue_many(
+        [
+            {"resume_id": row["id"], "tenant_id": tenant_id, "file_ref": row["file_url"]}
+            for row in rows
+        ],
+        weight=plan_weight(plan),
+    )
 
-    # Enfileira as duas etapas com tenant_id
-    q.enqueue(parse_pdf_task, resume_id, tenant_id, pdf_bytes)
-    q.enqueue(analyse_resume_task, resume_id, tenant_id)
+    logger.info(f"✅ [enqueue_bulk_analysis] Pipeline enfileirado para {len(rows)} currículos")
+    return [row["id"] for row in rows]
 
-    logger.info(f"✅ [enqueue_analysis] Tarefas enfileiradas para {resume_id}")
-    return resume_id
+
+def enqueue_analysis(job_id: str, tenant_id: str, file_ref: str, content_hash: str) -> str:
+    """
+    Cria registro no DB e enfileira o pipeline do currículo.
+    Os jobs levam só a referência do arquivo no blob store (nunca os bytes),
+    para não ocupar memória do Redis.
+    """
+    return enqueue_bulk_analysis(
+        job_id, tenant_id, [{"file_ref": file_ref, "content_hash": content_hash}]
+    )[0]
+
+
+def requeue_analysis(resume_ids: list[str], tenant_id: str):
+    """
+    Reenfileira o pipeline a partir do pré-processamento (texto já
+    extraído), ex.: currículos que voltaram a passar na pré-triagem.
+    """
+    if not resume_ids:
+        return
+    RESUME_PIPELINE.enqueue_many(
+        [{"resume_id": resume_id, "tenant_id": tenant_id} for resume_id in resume_ids],
+        start="preprocess",
+    )
+    logger.info(f"🔁 [requeue_analysis] {len(resume_ids)} análises reenfileiradas (tenant={tenant_id})")
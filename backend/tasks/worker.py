@@ -1,11 +1,16 @@
 import os
+import asyncio
 from redis import Redis
-from rq import Worker, Queue, Connection
+from rq import Queue
 from dotenv import load_dotenv
 
 load_dotenv()
 
-listen = ["default"]
+from backend.config import settings
+from backend.tasks.fair_queue import FairWorker
+from backend.tasks.stages import WORKER_QUEUES
+
+listen = WORKER_QUEUES
 redis_url = os.getenv("REDIS_URL")
 
 if not redis_url:
@@ -14,7 +19,18 @@ if not redis_url:
 conn = Redis.from_url(redis_url)
 
 if __name__ == "__main__":
-    print("🚀 Worker iniciado, aguardando tarefas...")
-    with Connection(conn):
-        worker = Worker(map(Queue, listen))
+    if settings.WORKER_MODE == "prewarmed":
+        # Supervisor + workers sem fork: conexões e imports reaproveitados entre jobs
+        from backend.tasks.prewarmed_worker import WorkerSupervisor
+        print(f"🚀 Supervisor iniciado ({settings.WORKER_PROCESSES} workers pré-aquecidos)...")
+        WorkerSupervisor(listen).run()
+    elif settings.WORKER_MODE == "async":
+        # AsyncWorker: vários jobs de I/O por processo, sem fork
+        from backend.tasks.async_worker import AsyncWorker
+        print("🚀 Worker async iniciado (pool de processos para parse, concorrência de I/O para llm)...")
+        asyncio.run(AsyncWorker(listen, conn).run())
+    else:
+        print("🚀 Worker iniciado, aguardando tarefas...")
+        # FairWorker: consome as sub-filas por tenant (deficit round-robin)
+        worker = FairWorker([Queue(name, connection=conn) for name in listen], connection=conn)
         worker.work(with_scheduler=True)
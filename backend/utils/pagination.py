@@ -0,0 +1,92 @@
+import json
+import base64
+import binascii
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.sql import ColumnElement, Select
+
+from backend.config import settings
+
+
+# ======================================================
+# 📑 Paginação por cursor (keyset em <chave de ordenação>, id)
+# ======================================================
+@dataclass(frozen=True)
+class SortKey:
+    name: str                       # vai no cursor: um cursor só vale para a mesma ordenação
+    expression: ColumnElement       # expressão do ORDER BY (sem NULLs, para a comparação do keyset)
+    value: Callable[[Any], Any]     # o mesmo valor a partir do objeto carregado
+
+
+def by_created_at(model) -> SortKey:
+    return SortKey("created_at", model.created_at, lambda row: row.created_at)
+
+
+def page_size(limit: int | None) -> int:
+    """Tamanho da página pedido, limitado a PAGE_SIZE_MAX."""
+    if limit is None:
+        return settings.PAGE_SIZE_DEFAULT
+    return max(1, min(limit, settings.PAGE_SIZE_MAX))
+
+
+def encode_cursor(key: str, value: Any, id_: str) -> str:
+    """Cursor opaco com a posição do último item da página."""
+    if isinstance(value, datetime):
+        value = {"ts": value.isoformat()}
+    payload = json.dumps([key, value, id_])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: str) -> tuple[Any, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_key, value, id_ = json.loads(raw)
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["ts"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido.")
+    if cursor_key != key:
+        raise HTTPException(status_code=400, detail="Cursor de outra ordenação; recomece da primeira página.")
+    return value, str(id_)
+
+
+def keyset_page(
+    query: Select,
+    model,
+    cursor: str | None,
+    limit: int,
+    sort: SortKey | None = None,
+    descending: bool = True,
+) -> Select:
+    """
+    Ordena por (chave, id) e continua a partir do cursor. Diferente de
+    OFFSET, o custo não cresce com a profundidade da página: com um índice
+    (tenant_id, ..., chave, id) a continuação começa direto na posição do
+    cursor. Busca um item a mais para saber se há próxima página.
+    """
+    sort = sort or by_created_at(model)
+    position = tuple_(sort.expression, model.id)
+    if cursor:
+        value, id_ = decode_cursor(cursor, sort.name)
+        after = tuple_(value, id_)
+        query = query.where(position < after if descending else position > after)
+    if descending:
+        query = query.order_by(sort.expression.desc(), model.id.desc())
+    else:
+        query = query.order_by(sort.expression.asc(), model.id.asc())
+    return query.limit(limit + 1)
+
+
+def split_page(rows: list, limit: int, sort: SortKey | None = None) -> tuple[list, str | None]:
+    """Separa o item extra de `keyset_page` e devolve (itens, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    if sort is None:
+        return rows, encode_cursor("created_at", last.created_at, last.id)
+    return rows, encode_cursor(sort.name, sort.value(last), last.id)
@@ -1,22 +1,14 @@
 from fastapi import HTTPException, Request, Depends
-from sqlalchemy.orm import Session
-from backend.database.connection import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database.connection import get_async_db
 from backend.database.models import Membership
 from backend.utils.auth import get_current_user_claims
 
 
-def get_db():
-    """Cria e fecha sessão SQLAlchemy automaticamente."""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-def get_tenant_id(
+async def get_tenant_id(
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     claims: dict = Depends(get_current_user_claims)
 ) -> str:
     """
@@ -34,13 +26,13 @@ def get_tenant_id(
     # ========================================
     # 👑 VERIFICA SE É ADMIN
     # ========================================
-    admin_membership = (
-        db.query(Membership)
-        .filter(
+    admin_membership = await db.scalar(
+        select(Membership)
+        .where(
             Membership.user_id == user_id,
             Membership.role == "admin"
         )
-        .first()
+        .limit(1)
     )
     
     # ✅ Admin pode acessar QUALQUER tenant
@@ -49,10 +41,10 @@ def get_tenant_id(
         return tenant_id
 
     # 🔍 Validação de membership via ORM
-    member = (
-        db.query(Membership)
-        .filter(Membership.tenant_id == tenant_id, Membership.user_id == user_id)
-        .first()
+    member = await db.scalar(
+        select(Membership)
+        .where(Membership.tenant_id == tenant_id, Membership.user_id == user_id)
+        .limit(1)
     )
 
     if not member:
@@ -35,6 +35,9 @@ def init_state():
     ss.setdefault("jobs_cache", [])
     ss.setdefault("resumes_cache", [])
     ss.setdefault("analysis_cache", [])
+    ss.setdefault("analysis_query_cache", {})
+    ss.setdefault("stats_cache", {})
+    ss.setdefault("ranking_cache", {})
 
 init_state()
 
@@ -174,7 +177,7 @@ def register_user(
 def logout():
     """Limpa sessão e desloga usuário."""
     for key in ["token", "tenant_id", "user_email", "authenticated", 
-                "jobs_cache", "resumes_cache", "analysis_cache"]:  # ✅ Adicionado resumes_cache
+                "jobs_cache", "resumes_cache", "analysis_cache", "analysis_query_cache", "stats_cache", "ranking_cache"]:  # ✅ Adicionado resumes_cache
         if key in st.session_state:
             del st.session_state[key]
     st.rerun()
@@ -385,6 +388,9 @@ with st.sidebar:
         st.session_state.jobs_cache = []
         st.session_state.resumes_cache = []
         st.session_state.analysis_cache = []
+        st.session_state.analysis_query_cache = {}
+        st.session_state.stats_cache = {}
+        st.session_state.ranking_cache = {}
         st.rerun()
 
 
@@ -427,6 +433,24 @@ def api_get(path, params=None):
         raise RuntimeError(f"❌ Erro de conexão: API pode estar offline")
 
 
+def api_get_all(path, key, params=None, max_items=5000):
+    """
+    Percorre as páginas de uma listagem paginada por cursor (`next_cursor`)
+    e junta os itens de `key`, até `max_items`.
+    """
+    params = dict(params or {})
+    items = []
+    while True:
+        data = api_get(path, params=params)
+        if not isinstance(data, dict):
+            return data
+        items.extend(data.get(key, []))
+        cursor = data.get("next_cursor")
+        if not cursor or len(items) >= max_items:
+            return items[:max_items]
+        params["cursor"] = cursor
+
+
 def api_post(path, json_payload=None, files=None, data=None):
     """Faz requisição POST à API."""
     base = st.session_state.api_url.rstrip("/")
@@ -463,8 +487,7 @@ def api_post(path, json_payload=None, files=None, data=None):
 def load_jobs():
     """Carrega vagas do backend (com cache)."""
     if not st.session_state.jobs_cache:
-        data = api_get("/jobs")
-        st.session_state.jobs_cache = data.get("jobs", data)
+        st.session_state.jobs_cache = api_get_all("/jobs", "jobs")
     return st.session_state.jobs_cache
 
 
@@ -475,8 +498,7 @@ def load_resumes():
     """
     if not st.session_state.resumes_cache:
         try:
-            data = api_get("/analysis")
-            df = pd.DataFrame(data.get("items", data)) if isinstance(data, dict) else pd.DataFrame(data)
+            df = pd.DataFrame(api_get_all("/analysis", "items"))
             if not df.empty:
                 st.session_state.analysis_cache = df.to_dict("records")
         except Exception:
@@ -484,12 +506,46 @@ def load_resumes():
     return st.session_state.resumes_cache
 
 
-def load_analysis():
-    """Carrega análises de currículos (com cache)."""
-    if not st.session_state.analysis_cache:
-        data = api_get("/analysis")
-        st.session_state.analysis_cache = data.get("items", data) if isinstance(data, dict) else data
-    return st.session_state.analysis_cache
+# Ordenações da aba Análises: rótulo -> (sort, order) de GET /analysis
+ANALYSIS_SORT_OPTIONS = {
+    "Mais recentes": ("created_at", "desc"),
+    "Mais antigas": ("created_at", "asc"),
+    "Maior score": ("score", "desc"),
+    "Menor score": ("score", "asc"),
+    "Nome (A-Z)": ("candidate_name", "asc"),
+}
+# A listagem é de análises, gravadas só quando a IA conclui: currículos
+# barrados na pré-triagem ou com falha não têm análise para filtrar
+RESUME_STATUS_LABELS = {
+    "done": "Concluído",
+}
+ANALYSIS_MAX_ROWS = 2000
+
+
+def query_analysis(params):
+    """Análises filtradas e ordenadas pelo backend (cache por combinação de filtros)."""
+    key = json.dumps(params, sort_keys=True)
+    cache = st.session_state.analysis_query_cache
+    if key not in cache:
+        cache[key] = api_get_all("/analysis", "items", params=params, max_items=ANALYSIS_MAX_ROWS)
+    return cache[key]
+
+
+def load_ranking(job_id, k=20, include_summary=False):
+    """Top-K currículos da vaga por score, ordenados pelo backend (com cache)."""
+    key = f"{job_id}:{k}:{include_summary}"
+    cache = st.session_state.ranking_cache
+    if key not in cache:
+        data = api_get(f"/jobs/{job_id}/ranking", params={"k": k, "include_summary": include_summary})
+        cache[key] = data.get("ranking", [])
+    return cache[key]
+
+
+def load_stats():
+    """KPIs e histograma do painel, agregados no backend (com cache)."""
+    if not st.session_state.stats_cache:
+        st.session_state.stats_cache = api_get("/analysis/stats")
+    return st.session_state.stats_cache
 
 # ========================================
 # 🎨 Interface Principal do App
@@ -514,78 +570,53 @@ with tabs[0]:
         jobs = []
 
     try:
-        analysis = load_analysis()
+        stats = load_stats()
     except Exception as e:
-        st.error(f"❌ Erro ao carregar análises: {e}")
-        analysis = []
+        st.error(f"❌ Erro ao carregar estatísticas: {e}")
+        stats = {}
 
     # KPIs principais
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Vagas Ativas", len(jobs))
     
-    # Métricas de análises
-    df = pd.DataFrame(analysis)
-    
-    if not df.empty:
-        # ✅ Verifica se colunas existem antes de usar
-        if "resume_id" in df.columns:
-            col2.metric("Currículos Analisados", df["resume_id"].nunique())
-        else:
-            col2.metric("Currículos Analisados", 0)
+    # Métricas de análises (agregadas pelo backend em /analysis/stats)
+    if stats.get("total"):
+        by_job = pd.DataFrame(stats.get("by_job", []))
         
-        if "score" in df.columns and not df["score"].dropna().empty:
-            avg_score = round(df["score"].dropna().mean(), 2)
-            col3.metric("Média de Score", avg_score)
-        else:
-            col3.metric("Média de Score", 0)
+        col2.metric("Currículos Analisados", stats.get("resumes", 0))
+        col3.metric("Média de Score", stats.get("avg_score") or 0)
         
-        # Vaga com mais currículos
-        if "job_id" in df.columns and "resume_id" in df.columns:
-            by_job = (
-                df.groupby("job_id")["resume_id"]
-                .nunique()
-                .reset_index()
-                .rename(columns={"resume_id": "curriculos"})
-            )
-            
-            if not by_job.empty:
-                max_curriculos = by_job.sort_values("curriculos", ascending=False).head(1)["curriculos"].iloc[0]
-                col4.metric("Vaga com Mais Currículos", max_curriculos)
-            else:
-                col4.metric("Vaga com Mais Currículos", 0)
+        # Vaga com mais currículos (by_job vem ordenado por currículos)
+        if not by_job.empty:
+            col4.metric("Vaga com Mais Currículos", int(by_job["resumes"].iloc[0]))
         else:
             col4.metric("Vaga com Mais Currículos", 0)
 
         st.markdown("---")
 
         # ✅ Gráficos (somente se houver dados)
-        if "score" in df.columns and not df["score"].dropna().empty:
+        histogram = pd.DataFrame(stats.get("histogram", []))
+        if stats.get("scored") and not histogram.empty:
             st.markdown("### 📈 Curva de Scores")
-            fig = px.histogram(
-                df,
-                x="score",
-                nbins=20,
+            histogram["faixa"] = histogram["start"].map("{:.1f}".format) + "–" + histogram["end"].map("{:.1f}".format)
+            fig = px.bar(
+                histogram,
+                x="faixa",
+                y="count",
                 title="Distribuição de Scores dos Currículos",
-                labels={"score": "Score (0-10)", "count": "Quantidade"}
+                labels={"faixa": "Score (0-10)", "count": "Quantidade"}
             )
-            fig.update_layout(showlegend=False)
+            fig.update_layout(showlegend=False, bargap=0.05)
             st.plotly_chart(fig, use_container_width=True)
 
-        if "job_id" in df.columns and "resume_id" in df.columns:
+        if not by_job.empty:
             st.markdown("### 📊 Currículos por Vaga")
-            cnt = (
-                df.groupby("job_id")["resume_id"]
-                .nunique()
-                .reset_index()
-                .rename(columns={"resume_id": "qtd"})
-            )
-            
             fig2 = px.bar(
-                cnt,
+                by_job,
                 x="job_id",
-                y="qtd",
+                y="resumes",
                 title="Número de Currículos por Vaga",
-                labels={"job_id": "ID da Vaga", "qtd": "Quantidade de Currículos"}
+                labels={"job_id": "ID da Vaga", "resumes": "Quantidade de Currículos"}
             )
             st.plotly_chart(fig2, use_container_width=True)
     
@@ -771,6 +802,44 @@ with tabs[1]:
             
     except Exception as e:
         st.error(f"❌ Erro ao listar vagas: {e}")
+        jobs = []
+    
+    # ========================================
+    # 🏆 MELHORES CANDIDATOS DA VAGA
+    # ========================================
+    if jobs:
+        st.markdown("---")
+        st.markdown("#### 🏆 Melhores Candidatos")
+        
+        col_rank1, col_rank2, col_rank3 = st.columns([3, 1, 1])
+        with col_rank1:
+            ranking_job = st.selectbox(
+                "Vaga",
+                options=[j["id"] for j in jobs],
+                format_func=lambda job_id: next((j.get("title") or job_id for j in jobs if j["id"] == job_id), job_id),
+                key="ranking_job"
+            )
+        with col_rank2:
+            ranking_k = st.number_input("Top", min_value=1, max_value=100, value=20, step=5)
+        with col_rank3:
+            ranking_summary = st.checkbox("Incluir resumo", value=False)
+        
+        try:
+            ranking = load_ranking(ranking_job, int(ranking_k), ranking_summary)
+            if ranking:
+                df_rank = pd.DataFrame(ranking).rename(columns={
+                    "rank": "#",
+                    "candidate_name": "Candidato",
+                    "score": "Score",
+                    "created_at": "Enviado em",
+                    "summary": "Resumo",
+                })
+                cols_rank = [c for c in ["#", "Candidato", "Score", "Enviado em", "Resumo"] if c in df_rank.columns]
+                st.dataframe(df_rank[cols_rank], use_container_width=True, hide_index=True)
+            else:
+                st.info("📭 Nenhum currículo analisado nesta vaga ainda.")
+        except Exception as e:
+            st.error(f"❌ Erro ao carregar ranking: {e}")
 
 
 # ========================================
@@ -805,35 +874,47 @@ with tabs[2]:
             help="Escolha para qual vaga você está enviando o currículo"
         )
         
-        pdf = st.file_uploader(
-            "Arquivo do Currículo (PDF) *",
-            type=["pdf"],
-            help="Envie apenas arquivos PDF"
+        pdfs = st.file_uploader(
+            "Arquivos dos Currículos (PDF ou ZIP) *",
+            type=["pdf", "zip"],
+            accept_multiple_files=True,
+            help="Envie um ou vários PDFs, ou um ZIP com os PDFs"
         )
         
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            enviar = st.button("📤 Enviar Currículo", use_container_width=True, type="primary")
+            enviar = st.button("📤 Enviar Currículos", use_container_width=True, type="primary")
         
         # ========================================
         # ✅ PROCESSAMENTO DO UPLOAD
         # ========================================
         if enviar:
             # Validações
-            if not pdf:
-                st.error("❌ Selecione um arquivo PDF antes de enviar.")
-            elif not pdf.name.lower().endswith(".pdf"):
-                st.error("❌ O arquivo deve ser um PDF.")
+            if not pdfs:
+                st.error("❌ Selecione ao menos um arquivo PDF ou ZIP antes de enviar.")
+            elif any(not f.name.lower().endswith((".pdf", ".zip")) for f in pdfs):
+                st.error("❌ Os arquivos devem ser PDF ou ZIP.")
             else:
                 try:
                     job_id = job_map[job_name]
+                    data = {"job_id": job_id}
                     
-                    with st.spinner("🔄 Enviando currículo..."):
-                        files = {"pdf": (pdf.name, pdf, "application/pdf")}
-                        data = {"job_id": job_id}
-                        resp = api_post("/resumes/upload", files=files, data=data)
+                    with st.spinner("🔄 Enviando currículos..."):
+                        if len(pdfs) == 1 and pdfs[0].name.lower().endswith(".pdf"):
+                            files = {"pdf": (pdfs[0].name, pdfs[0], "application/pdf")}
+                            resp = api_post("/resumes/upload", files=files, data=data)
+                            count = 1
+                        else:
+                            files = [
+                                ("files", (f.name, f, "application/zip" if f.name.lower().endswith(".zip") else "application/pdf"))
+                                for f in pdfs
+                            ]
+                            resp = api_post("/resumes/bulk", files=files, data=data)
+                            count = resp.get("count", 0)
                     
-                    st.success("✅ Currículo enviado e enfileirado com sucesso!")
+                    st.success(f"✅ {count} currículo(s) enviado(s) e enfileirado(s) com sucesso!")
+                    if resp.get("rejected"):
+                        st.warning(f"⚠️ {len(resp['rejected'])} arquivo(s) ignorado(s). Veja os detalhes abaixo.")
                     st.info("⏳ O processamento pode levar de 2 a 5 minutos. Acompanhe na aba **Análises**.")
                     
                     # Mostra resposta
@@ -874,10 +955,98 @@ with tabs[3]:
     st.subheader("🔎 Resultados das Análises")
     
     try:
-        analysis = load_analysis()
-        df = pd.DataFrame(analysis)
+        # ========================================
+        # 🔍 FILTROS (aplicados pelo backend)
+        # ========================================
+        st.markdown("#### 🔍 Filtros")
+        
+        jobs = load_jobs()
+        job_titles = {j["id"]: j.get("title") or j["id"] for j in jobs}
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        # Filtro por vaga
+        with col1:
+            job_filter = st.multiselect(
+                "Vagas",
+                options=list(job_titles),
+                format_func=lambda job_id: job_titles.get(job_id, job_id),
+                placeholder="Todas"
+            )
+        
+        # Filtro por nome
+        with col2:
+            name_filter = st.text_input(
+                "Nome do Candidato",
+                placeholder="Digite para buscar..."
+            )
+        
+        # Filtro por score mínimo
+        with col3:
+            score_min = st.number_input(
+                "Score Mínimo",
+                min_value=0.0,
+                max_value=10.0,
+                value=0.0,
+                step=0.5
+            )
+        
+        # Filtro por score máximo
+        with col4:
+            score_max = st.number_input(
+                "Score Máximo",
+                min_value=0.0,
+                max_value=10.0,
+                value=10.0,
+                step=0.5
+            )
+        
+        col5, col6, col7 = st.columns(3)
+        
+        # Filtro por status do currículo
+        with col5:
+            status_filter = st.multiselect(
+                "Status do Currículo",
+                options=list(RESUME_STATUS_LABELS),
+                format_func=lambda s: RESUME_STATUS_LABELS.get(s, s),
+                placeholder="Todos"
+            )
+        
+        # Filtro por período
+        with col6:
+            period = st.date_input("Período", value=(), format="DD/MM/YYYY")
+        
+        # Ordenação
+        with col7:
+            sort_label = st.selectbox("Ordenar por", list(ANALYSIS_SORT_OPTIONS))
         
-        if df.empty:
+        # ========================================
+        # ✅ APLICAR FILTROS
+        # ========================================
+        params = {}
+        if job_filter:
+            params["job_id"] = job_filter
+        if status_filter:
+            params["status"] = status_filter
+        if name_filter.strip():
+            params["search"] = name_filter.strip()
+        # limites padrão não filtram (incluem análises ainda sem score)
+        if score_min > 0:
+            params["score_min"] = score_min
+        if score_max < 10:
+            params["score_max"] = score_max
+        if len(period) >= 1:
+            params["created_from"] = period[0].isoformat()
+        if len(period) == 2:
+            params["created_to"] = (period[1] + pd.Timedelta(days=1)).isoformat()
+        params["sort"], params["order"] = ANALYSIS_SORT_OPTIONS[sort_label]
+        
+        df = pd.DataFrame(query_analysis(params))
+        has_filters = any(k not in ("sort", "order") for k in params)
+        
+        if df.empty and has_filters:
+            st.warning("⚠️ Nenhum resultado encontrado com os filtros aplicados.")
+        elif df.empty:
             st.info("📭 Ainda não há análises disponíveis.")
             st.markdown("""
             **Como funciona:**
@@ -888,15 +1057,20 @@ with tabs[3]:
             💡 **Dica:** Clique em **"🔄 Atualizar dados"** na barra lateral para verificar novos resultados.
             """)
         else:
+            df_filtered = df
+            
+            if len(df) >= ANALYSIS_MAX_ROWS:
+                st.info(f"🔍 Mostrando as primeiras {ANALYSIS_MAX_ROWS} análises; refine os filtros para ver as demais")
+            
             # ========================================
-            # 📊 KPIs Rápidos
+            # 📊 KPIs Rápidos (das análises filtradas)
             # ========================================
             col1, col2, col3, col4 = st.columns(4)
             
             total_analysis = len(df)
             col1.metric("Total de Análises", total_analysis)
             
-            if "score" in df.columns:
+            if "score" in df.columns and not df["score"].dropna().empty:
                 avg_score = round(df["score"].dropna().mean(), 2)
                 col2.metric("Score Médio", f"{avg_score}/10")
                 
@@ -908,75 +1082,6 @@ with tabs[3]:
             
             st.markdown("---")
             
-            # ========================================
-            # 🔍 FILTROS
-            # ========================================
-            st.markdown("#### 🔍 Filtros")
-            
-            col1, col2, col3, col4 = st.columns(4)
-            
-            # Filtro por vaga
-            with col1:
-                if "job_id" in df.columns:
-                    unique_jobs = ["Todas"] + sorted(df["job_id"].dropna().unique().tolist())
-                    job_filter = st.selectbox("Vaga", unique_jobs)
-                else:
-                    job_filter = "Todas"
-            
-            # Filtro por nome
-            with col2:
-                name_filter = st.text_input(
-                    "Nome do Candidato",
-                    placeholder="Digite para buscar..."
-                )
-            
-            # Filtro por score mínimo
-            with col3:
-                score_min = st.number_input(
-                    "Score Mínimo",
-                    min_value=0.0,
-                    max_value=10.0,
-                    value=0.0,
-                    step=0.5
-                )
-            
-            # Filtro por score máximo
-            with col4:
-                score_max = st.number_input(
-                    "Score Máximo",
-                    min_value=0.0,
-                    max_value=10.0,
-                    value=10.0,
-                    step=0.5
-                )
-            
-            # ========================================
-            # ✅ APLICAR FILTROS
-            # ========================================
-            df_filtered = df.copy()
-            
-            if job_filter != "Todas" and "job_id" in df_filtered.columns:
-                df_filtered = df_filtered[df_filtered["job_id"] == job_filter]
-            
-            if name_filter and "candidate_name" in df_filtered.columns:
-                df_filtered = df_filtered[
-                    df_filtered["candidate_name"]
-                    .astype(str)
-                    .str.contains(name_filter, case=False, na=False)
-                ]
-            
-            if "score" in df_filtered.columns:
-                df_filtered = df_filtered[
-                    (df_filtered["score"].fillna(0) >= score_min) &
-                    (df_filtered["score"].fillna(10) <= score_max)
-                ]
-            
-            # Mostra quantidade filtrada
-            if len(df_filtered) < len(df):
-                st.info(f"🔍 Mostrando {len(df_filtered)} de {len(df)} análises")
-            
-            st.markdown("---")
-            
             # ========================================
             # 📊 TABELA DE RESULTADOS
             # ========================================
@@ -1036,14 +1141,19 @@ with tabs[3]:
                         fig.update_layout(showlegend=False)
                         st.plotly_chart(fig, use_container_width=True)
                 
-                # Gráfico 2: Top Candidatos
+                # Gráfico 2: Top Candidatos (de uma vaga: ranking do backend)
                 with col_chart2:
                     if "score" in df_filtered.columns and "candidate_name" in df_filtered.columns:
                         st.markdown("##### Top 10 Candidatos")
-                        top_candidates = (
-                            df_filtered.nlargest(10, "score")[["candidate_name", "score"]]
-                            .reset_index(drop=True)
-                        )
+                        if len(job_filter) == 1:
+                            top_candidates = pd.DataFrame(
+                                load_ranking(job_filter[0], 10), columns=["candidate_name", "score"]
+                            )
+                        else:
+                            top_candidates = (
+                                df_filtered.nlargest(10, "score")[["candidate_name", "score"]]
+                                .reset_index(drop=True)
+                            )
                         fig2 = px.bar(
                             top_candidates,
                             x="score",
@@ -1139,7 +1249,7 @@ with tabs[4]:
         st.markdown(f"""
         **📦 Cache:**
         - Vagas: {len(st.session_state.jobs_cache)}
-        - Análises: {len(st.session_state.analysis_cache)}
+        - Análises: {st.session_state.stats_cache.get("total", 0)}
         """)
     
     st.markdown("---")
@@ -1231,6 +1341,9 @@ with tabs[4]:
         with col_clear2:
             if st.button("🗑️ Limpar Análises", use_container_width=True):
                 st.session_state.analysis_cache = []
+                st.session_state.analysis_query_cache = {}
+                st.session_state.stats_cache = {}
+                st.session_state.ranking_cache = {}
                 st.success("Cache de análises limpo!")
         
         with col_clear3:
@@ -1238,6 +1351,9 @@ with tabs[4]:
                 st.session_state.jobs_cache = []
                 st.session_state.resumes_cache = []
                 st.session_state.analysis_cache = []
+                st.session_state.analysis_query_cache = {}
+                st.session_state.stats_cache = {}
+                st.session_state.ranking_cache = {}
                 st.success("Todo cache limpo!")
         
         st.markdown("##### Testar Conexão com API")